@@ -7,6 +7,8 @@ import sys
 sys.path.append("src")
 
 from data_loader import DataLoader
+from chart_pipeline import ChartPipeline
+from dataset_cache import DatasetCache
 from market_analyzer import MarketAnalyzer
 from visualizer import MarketVisualizer
 from predictive_models import GDPPredictor, MarketClassifier
@@ -15,13 +17,13 @@ from predictive_models import GDPPredictor, MarketClassifier
 def main():
     print("=== ExportMap Demo ===\n")
 
-    # 1. Load data
+    # 1. Load data (reuses the cached merge when the CSVs are unchanged)
     loader = DataLoader()
-    data = loader.load_all_datasets()
+    analyzer = MarketAnalyzer.from_loader(loader, cache=DatasetCache())
+    charts = ChartPipeline()
     print()
 
     # 2. Analyze markets
-    analyzer = MarketAnalyzer(data)
     analyzer.calculate_mos()
     recommendations = analyzer.get_market_recommendations(top_n=15)
 
@@ -51,30 +53,40 @@ def main():
 
     # GDP Predictor
     print("\n1. Training GDP Prediction Model...")
-    gdp_predictor = GDPPredictor()
-    gdp_results = gdp_predictor.train(analyzer.merged_data)
+    gdp_predictor, gdp_results = GDPPredictor.load_or_train(
+        "models/gdp_predictor.joblib", analyzer.feature_store()
+    )
 
     if gdp_results:
         print(f"   R² Score: {gdp_results['r2_score']:.3f}")
-        gdp_predictor.plot_results(gdp_results)
+        gdp_predictor.plot_results(gdp_results, charts, background=True)
+    elif gdp_predictor.is_trained:
+        print(f"   R² Score: {gdp_predictor.metrics['r2_score']:.3f} (stored model)")
 
     # Market Classifier
     print("\n2. Training Market Classification Model...")
-    classifier = MarketClassifier()
-    class_results = classifier.train(analyzer.merged_data)
+    classifier, class_results = MarketClassifier.load_or_train(
+        "models/market_classifier.joblib", analyzer.feature_store()
+    )
 
     if class_results:
         print(f"   Accuracy: {class_results['accuracy']:.3f}")
         print(f"   ROC AUC: {class_results['roc_auc']:.3f}")
-        classifier.plot_results(class_results)
+        classifier.plot_results(class_results, charts, background=True)
+    elif classifier.is_trained:
+        print(f"   Accuracy: {classifier.metrics['accuracy']:.3f} (stored model)")
+        print(f"   ROC AUC: {classifier.metrics['roc_auc']:.3f} (stored model)")
 
     # 5. Create visualizations
     print("\n3. Generating market visualizations...")
-    viz = MarketVisualizer()
-    viz.plot_top_markets(recommendations[:10], metric="mos_score")
+    viz = MarketVisualizer(charts)
+    viz.plot_top_markets(recommendations[:10], metric="mos_score", background=True)
 
     if not analyzer.merged_data.empty:
-        viz.plot_regional_distribution(analyzer.merged_data)
+        viz.plot_regional_distribution(analyzer.merged_data, background=True)
+
+    # Unchanged charts are skipped; wait for the rest to finish rendering
+    charts.close()
 
     print("\n" + "=" * 95)
     print("✓ Analysis complete! Generated files:")
@@ -0,0 +1,270 @@
+"""
+Benchmark suite
+Times and memory-profiles each pipeline stage on synthetic data of growing
+size, writes the results as JSON and compares them against a stored baseline
+
+Run through `main.py bench`, which also checks the recommend import budget;
+running this file directly is the same command:
+
+    python src/main.py bench --sizes 1000 10000 100000 --output bench.json
+    python src/main.py bench --save-baseline
+    python src/benchmarks.py --threshold 0.2
+"""
+
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from chart_pipeline import render_chart
+from data_loader import COUNTRY_NUMERIC_COLUMNS, SCHEMAS, DataLoader
+from market_analyzer import MarketAnalyzer
+from synthetic_data import generate_datasets, write_datasets
+
+STAGES = ["load", "clean", "merge", "mos", "recommend", "train", "predict", "plot"]
+DEFAULT_SIZES = [1_000, 10_000]
+
+# Committed baseline for DEFAULT_SIZES, recorded on the reference machine in
+# its "meta"; re-save it with --save-baseline when benchmarking elsewhere
+BASELINE_PATH = Path(__file__).resolve().parents[1] / "benchmarks" / "baseline.json"
+
+# A stage regresses when it is this much slower (or larger) than the baseline
+# and the absolute difference is above the noise floor
+DEFAULT_TIME_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.25
+MIN_SECONDS = 0.005
+MIN_MEMORY_MB = 1.0
+
+
+def measure(fn, setup=None, repeats=3, memory=True):
+    """
+    Run fn(setup()) repeats times and return timing and peak-memory stats
+
+    setup runs outside the timed region. Peak memory comes from one extra
+    tracemalloc run, so tracing overhead never inflates the timings.
+    """
+    setup = setup or (lambda: None)
+    runs = []
+    result = None
+    for _ in range(repeats):
+        arg = setup()
+        start = time.perf_counter()
+        result = fn(arg)
+        runs.append(time.perf_counter() - start)
+
+    peak_mb = None
+    if memory:
+        arg = setup()
+        tracemalloc.start()
+        try:
+            fn(arg)
+            peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "seconds": statistics.median(runs),
+        "min_seconds": min(runs),
+        "runs": runs,
+        "peak_mb": peak_mb,
+    }, result
+
+
+def _raw_countries(path):
+    """Read the countries CSV without parsing numbers, as the cleaner sees it"""
+    return pd.read_csv(path, dtype={col: "str" for col in COUNTRY_NUMERIC_COLUMNS})
+
+
+def bench_size(n_rows, repeats=3, memory=True, seed=0, stages=None):
+    """Benchmark every stage for one synthetic dataset size"""
+    from predictive_models import GDPPredictor, MarketClassifier
+
+    stages = stages or STAGES
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="exportmap-bench-") as tmp:
+        write_datasets(generate_datasets(n_rows, seed=seed), tmp)
+        loader = DataLoader(tmp)
+
+        def run(stage, fn, setup=None):
+            if stage in stages:
+                results[stage], _ = measure(fn, setup, repeats, memory)
+
+        run("load", lambda _: loader.load_all_datasets())
+        data = loader.load_all_datasets()
+
+        countries_path = Path(tmp) / SCHEMAS["countries"].filename
+        run(
+            "clean",
+            lambda df: loader.clean_all_numeric_columns(df, COUNTRY_NUMERIC_COLUMNS),
+            lambda: _raw_countries(countries_path),
+        )
+
+        # The merge strips names in place, so every run gets fresh copies
+        run("merge", MarketAnalyzer, lambda: {k: v.copy() for k, v in data.items()})
+        analyzer = MarketAnalyzer(data)
+
+        run("mos", lambda _: analyzer.calculate_mos())
+        analyzer.calculate_mos()
+        run("recommend", lambda _: analyzer.get_market_recommendations(top_n=15))
+
+        store = analyzer.feature_store()
+        models = (GDPPredictor(), MarketClassifier())
+        run("train", lambda _: [model.train(store) for model in models])
+        gdp_results = [model.train(store) for model in models][0]
+
+        X = store.view(models[0].features)
+        run("predict", lambda _: (models[0].predict_many(X), models[1].predict_proba_many(X)))
+
+        if "plot" in stages and gdp_results is not None:
+            spec = models[0].results_spec(gdp_results)
+            run("plot", lambda _: render_chart(spec, tmp))
+    return results
+
+
+def run_suite(sizes=None, repeats=3, memory=True, seed=0, stages=None):
+    """Benchmark every size and return the JSON-ready report"""
+    import sklearn
+
+    sizes = sizes or DEFAULT_SIZES
+    rows = []
+    for n_rows in sizes:
+        print(f"Benchmarking {n_rows:,} rows...")
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = bench_size(n_rows, repeats, memory, seed, stages)
+        for stage, stats in results.items():
+            rows.append({"size": n_rows, "stage": stage, **stats})
+            peak = f"{stats['peak_mb']:>9.1f} MB" if stats["peak_mb"] is not None else ""
+            print(f"  {stage:<10} {stats['seconds'] * 1000:>10.1f} ms {peak}")
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "repeats": repeats,
+            "seed": seed,
+        },
+        "results": rows,
+    }
+
+
+def compare(report, baseline, time_threshold=DEFAULT_TIME_THRESHOLD,
+            memory_threshold=DEFAULT_MEMORY_THRESHOLD):
+    """
+    Compare a report with a baseline report
+
+    Returns one row per (size, stage) present in both, with ratios and a
+    regression flag for time or memory beyond the thresholds.
+    """
+    base = {(r["size"], r["stage"]): r for r in baseline["results"]}
+    rows = []
+    for current in report["results"]:
+        previous = base.get((current["size"], current["stage"]))
+        if previous is None:
+            continue
+        time_ratio = current["seconds"] / previous["seconds"] if previous["seconds"] else None
+        slower = (
+            time_ratio is not None
+            and time_ratio > 1 + time_threshold
+            and current["seconds"] - previous["seconds"] > MIN_SECONDS
+        )
+
+        memory_ratio = None
+        larger = False
+        if current.get("peak_mb") is not None and previous.get("peak_mb"):
+            memory_ratio = current["peak_mb"] / previous["peak_mb"]
+            larger = (
+                memory_ratio > 1 + memory_threshold
+                and current["peak_mb"] - previous["peak_mb"] > MIN_MEMORY_MB
+            )
+
+        rows.append({
+            "size": current["size"],
+            "stage": current["stage"],
+            "seconds": current["seconds"],
+            "baseline_seconds": previous["seconds"],
+            "time_ratio": time_ratio,
+            "memory_ratio": memory_ratio,
+            "regression": slower or larger,
+        })
+    return rows
+
+
+def print_comparison(rows):
+    print(f"\n{'Size':>10} {'Stage':<10} {'Time':>10} {'Baseline':>10} {'Ratio':>7} {'Memory':>7}")
+    print("-" * 60)
+    for row in rows:
+        status = "✗" if row["regression"] else "✓"
+        memory = f"{row['memory_ratio']:.2f}" if row["memory_ratio"] is not None else "-"
+        ratio = f"{row['time_ratio']:.2f}" if row["time_ratio"] is not None else "-"
+        print(
+            f"{row['size']:>10,} {row['stage']:<10} {row['seconds'] * 1000:>8.1f}ms "
+            f"{row['baseline_seconds'] * 1000:>8.1f}ms {ratio:>7} {memory:>7} {status}"
+        )
+
+
+def run(args):
+    """Run the suite for `main.py bench` arguments; returns the exit status"""
+    stages = args.stages or STAGES
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        print(f"✗ Unknown stages: {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+        return 1
+
+    report = run_suite(args.sizes, args.repeats, not args.no_memory, args.seed, stages)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Saved results: {args.output}")
+
+    baseline_path = Path(args.baseline) if args.baseline else BASELINE_PATH
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Saved baseline: {baseline_path}")
+        return 0
+    if args.no_compare:
+        return 0
+
+    if not baseline_path.exists():
+        print(f"✗ Baseline not found: {baseline_path} (create it with --save-baseline)")
+        return 1
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    if baseline["meta"].get("platform") != report["meta"]["platform"]:
+        print(f"Note: baseline recorded on {baseline['meta'].get('platform')}")
+    rows = compare(
+        report,
+        baseline,
+        DEFAULT_TIME_THRESHOLD if args.threshold is None else args.threshold,
+        DEFAULT_MEMORY_THRESHOLD if args.memory_threshold is None else args.memory_threshold,
+    )
+    if not rows:
+        print("✗ No sizes or stages in common with the baseline")
+        return 1
+    print_comparison(rows)
+    regressions = [row for row in rows if row["regression"]]
+    if regressions:
+        print(f"\n✗ {len(regressions)} regression(s) beyond the thresholds")
+        return 1
+    print("\n✓ No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    from main import main
+
+    sys.exit(main(["bench", *sys.argv[1:]]))
@@ -0,0 +1,406 @@
+"""
+Multi-tenant bulk scoring
+Scores thousands of client profiles (weights, category, region exclusions,
+top-N) against one merged dataset: the scaled feature matrix is built once,
+placed in shared memory for the worker processes, and results stream to
+JSONL or CSV with resumable checkpoints
+"""
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from multiprocessing import shared_memory
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from category_profiles import CATEGORY_PROFILES
+from compact_data import float64_values
+from market_index import CATEGORICAL_FILTERS, RANGE_FILTERS, category_key
+from scenarios import minmax_scale
+
+OUTPUT_FORMATS = (".jsonl", ".csv")
+
+# Record columns written per recommended market
+OUTPUT_FIELDS = {
+    "country": "Country/Territory",
+    "region": "Region",
+    "continent": "Continent",
+    "population": "2022 Population",
+    "gdp_per_capita": "GDP ($ per capita)",
+}
+
+CSV_COLUMNS = ["client_id", "category", "rank", "score", *OUTPUT_FIELDS]
+
+
+@dataclass
+class ClientProfile:
+    """
+    One client's scoring request
+
+    weights replace the category profile's weights when given; filters are
+    added to the profile's (same names as query_markets, e.g. min_gdp or
+    region). exclude_regions drops markets in those regions.
+    """
+
+    client_id: str
+    category: str = "children_clothing"
+    weights: dict = None
+    exclude_regions: list = field(default_factory=list)
+    filters: dict = field(default_factory=dict)
+    top_n: int = 10
+
+    def __post_init__(self):
+        if self.category not in CATEGORY_PROFILES:
+            raise ValueError(
+                f"Client {self.client_id!r}: unknown category {self.category!r}; "
+                f"choose from {sorted(CATEGORY_PROFILES)}"
+            )
+        if self.top_n < 1:
+            raise ValueError(f"Client {self.client_id!r}: top_n must be positive")
+
+    def resolved_weights(self):
+        return dict(self.weights or CATEGORY_PROFILES[self.category].weights)
+
+    def resolved_filters(self):
+        return {**CATEGORY_PROFILES[self.category].filters, **(self.filters or {})}
+
+
+def _cell(value, default=None):
+    """A CSV cell, with blanks (NaN) as default"""
+    return default if value is None or (isinstance(value, float) and np.isnan(value)) else value
+
+
+def load_profiles(path):
+    """
+    Read client profiles from JSONL (one object per line) or CSV
+
+    CSV columns: client_id, category, top_n, exclude_regions (";"-separated),
+    and weights / filters as JSON objects.
+    """
+    path = Path(path)
+    if path.suffix == ".csv":
+        rows = []
+        for row in pd.read_csv(path, dtype={"client_id": str}).to_dict("records"):
+            rows.append({
+                "client_id": row["client_id"],
+                "category": _cell(row.get("category"), "children_clothing"),
+                "top_n": int(_cell(row.get("top_n"), 10)),
+                "exclude_regions": [
+                    r for r in str(_cell(row.get("exclude_regions"), "")).split(";") if r.strip()
+                ],
+                "weights": json.loads(_cell(row.get("weights"), "null")),
+                "filters": json.loads(_cell(row.get("filters"), "{}")),
+            })
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+    return [ClientProfile(**{**row, "client_id": str(row["client_id"])}) for row in rows]
+
+
+class SharedMatrix:
+    """
+    A float64 matrix in a shared memory block
+
+    The owner creates and unlinks the block; workers attach() by name and
+    get a read-only view without copying.
+    """
+
+    def __init__(self, values):
+        values = np.ascontiguousarray(values, dtype=np.float64)
+        self.shape = values.shape
+        self._shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        self.name = self._shm.name
+        np.ndarray(self.shape, dtype=np.float64, buffer=self._shm.buf)[:] = values
+
+    @staticmethod
+    def attach(name, shape):
+        """Return (block, read-only view) for a block created elsewhere"""
+        shm = shared_memory.SharedMemory(name=name)
+        view = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        view.flags.writeable = False
+        return shm, view
+
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+
+class BulkScorer:
+    """
+    Score client profiles against one merged frame
+
+    The scaled matrix covers every registered profile feature plus any extra
+    features clients weight. It is laid out with its missing-value flags,
+    range-filter columns and categorical-filter codes in one float64 matrix,
+    which workers share through SharedMatrix.
+    """
+
+    def __init__(self, df, extra_features=()):
+        features = [f for p in CATEGORY_PROFILES.values() for f in p.weights] + list(extra_features)
+        self.features = [f for f in dict.fromkeys(features) if f in df.columns]
+        self.feature_index = {f: j for j, f in enumerate(self.features)}
+
+        scaled = minmax_scale(float64_values(df[self.features]))
+        missing = np.isnan(scaled)
+        blocks = [np.nan_to_num(scaled), missing.astype(np.float64)]
+
+        # Range filters read raw values; categorical filters read codes
+        self.ranges = {}
+        for name, col in RANGE_FILTERS.items():
+            if col in df.columns:
+                self.ranges[name] = len(self.features) * 2 + len(self.ranges)
+                blocks.append(float64_values(df[col])[:, None])
+        self.categories = {}
+        for name, col in CATEGORICAL_FILTERS.items():
+            if col in df.columns:
+                codes, uniques = pd.factorize(df[col].map(category_key, na_action="ignore"))
+                self.categories[name] = (
+                    len(self.features) * 2 + len(self.ranges) + len(self.categories),
+                    {key: code for code, key in enumerate(uniques)},
+                )
+                blocks.append(codes[:, None].astype(np.float64))
+        self.matrix = np.hstack(blocks)
+
+        self.labels = {
+            key: df[col].to_numpy(dtype=object) if col in df.columns else None
+            for key, col in OUTPUT_FIELDS.items()
+        }
+
+    @classmethod
+    def for_profiles(cls, df, profiles):
+        """Build a scorer covering every feature the profiles weight"""
+        extra = {f for p in profiles for f in p.resolved_weights()}
+        missing = sorted(f for f in extra if f not in df.columns)
+        if missing:
+            raise ValueError(f"Client weights use unknown features: {missing}")
+        return cls(df, sorted(extra))
+
+    def compile(self, profile):
+        """Turn a profile into a picklable scoring job"""
+        weights = np.zeros(len(self.features))
+        for feature, weight in profile.resolved_weights().items():
+            weights[self.feature_index[feature]] = weight
+
+        conditions = []
+        for name, value in profile.resolved_filters().items():
+            kind, _, base = name.partition("_")
+            if name in self.categories:
+                column, index = self.categories[name]
+                wanted = [value] if isinstance(value, str) else value
+                codes = [index[k] for k in map(category_key, wanted) if k in index]
+                conditions.append(("in", column, np.array(codes, dtype=np.float64)))
+            elif kind in ("min", "max") and base in self.ranges:
+                conditions.append((kind, self.ranges[base], float(value)))
+        if profile.exclude_regions and "region" in self.categories:
+            column, index = self.categories["region"]
+            codes = [index[k] for k in map(category_key, profile.exclude_regions) if k in index]
+            conditions.append(("not_in", column, np.array(codes, dtype=np.float64)))
+        return profile.client_id, weights, conditions, profile.top_n
+
+
+# Per-process view of the shared matrix, set once by the pool initializer
+_shm = None
+_matrix = None
+_n_features = 0
+
+
+def _init_worker(name, shape, n_features):
+    global _shm, _matrix, _n_features
+    _shm, _matrix = SharedMatrix.attach(name, shape)
+    _n_features = n_features
+
+
+def _use_matrix(matrix, n_features):
+    global _matrix, _n_features
+    _matrix, _n_features = matrix, n_features
+
+
+def _top_rows(scores, k):
+    """
+    The k highest finite scores, descending with ties in row order (like a
+    stable sort) without sorting every row
+    """
+    finite = np.isfinite(scores)
+    k = min(k, int(finite.sum()))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    kth = -np.partition(-np.where(finite, scores, -np.inf), k - 1)[k - 1]
+    above = np.flatnonzero(scores > kth)
+    tied = np.flatnonzero(scores == kth)[: k - len(above)]
+    rows = np.concatenate([above, tied])
+    return rows[np.lexsort((rows, -scores[rows]))]
+
+
+def _score_shard(jobs):
+    """Score one shard of compiled jobs; returns (client_id, rows, scores) each"""
+    f = _n_features
+    filled, missing = _matrix[:, :f], _matrix[:, f:2 * f]
+    W = np.array([weights for _, weights, _, _ in jobs])
+    scores = filled @ W.T
+    # A row is scored only if every feature the client weights exists
+    valid = (missing @ (W != 0).T.astype(np.float64)) == 0
+
+    results = []
+    for j, (client_id, _, conditions, top_n) in enumerate(jobs):
+        keep = valid[:, j].copy()
+        for kind, column, value in conditions:
+            values = _matrix[:, column]
+            if kind == "min":
+                keep &= values >= value
+            elif kind == "max":
+                keep &= values <= value
+            elif kind == "in":
+                keep &= np.isin(values, value)
+            else:
+                keep &= ~np.isin(values, value)
+        column_scores = np.where(keep, scores[:, j], -np.inf)
+        rows = _top_rows(column_scores, top_n)
+        results.append((client_id, rows, column_scores[rows]))
+    return results
+
+
+class ResultWriter:
+    """
+    Append client results to JSONL or CSV with a checkpoint log
+
+    Every flushed batch appends {"offset", "clients"} to <output>.ckpt, so a
+    restart truncates the output to the last checkpointed offset and skips
+    the clients already written.
+    """
+
+    def __init__(self, path, scorer, profiles, resume=True):
+        self.path = Path(path)
+        if self.path.suffix not in OUTPUT_FORMATS:
+            raise ValueError(f"Output must be one of {OUTPUT_FORMATS}, got {self.path.name!r}")
+        self.checkpoint_path = self.path.with_name(self.path.name + ".ckpt")
+        self.scorer = scorer
+        self.categories = {p.client_id: p.category for p in profiles}
+
+        self.done, offset = set(), 0
+        if resume and self.checkpoint_path.exists() and self.path.exists():
+            self.done, offset = self._read_checkpoint()
+        else:
+            self.checkpoint_path.unlink(missing_ok=True)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._out = open(self.path, "a+", encoding="utf-8", newline="")
+        self._out.truncate(offset)
+        self._out.seek(offset)
+        self._checkpoint = open(self.checkpoint_path, "a", encoding="utf-8")
+        self._csv = csv.writer(self._out) if self.path.suffix == ".csv" else None
+        if self._csv is not None and offset == 0:
+            self._csv.writerow(CSV_COLUMNS)
+
+    def _read_checkpoint(self):
+        done, offset = set(), 0
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # a torn final line from an interrupted run
+                done.update(entry["clients"])
+                offset = entry["offset"]
+        return done, offset
+
+    def _markets(self, rows, scores):
+        columns = [scores.tolist()]
+        for values in self.scorer.labels.values():
+            taken = [None] * len(rows) if values is None else values[rows].tolist()
+            columns.append([None if v != v else v for v in taken])  # NaN -> None
+        keys = ["score", *self.scorer.labels]
+        for rank, values in enumerate(zip(*columns), 1):
+            yield {"rank": rank, **dict(zip(keys, values))}
+
+    def write(self, results):
+        """Write one batch of (client_id, rows, scores) and checkpoint it"""
+        for client_id, rows, scores in results:
+            category = self.categories[client_id]
+            if self._csv is None:
+                record = {
+                    "client_id": client_id,
+                    "category": category,
+                    "markets": list(self._markets(rows, scores)),
+                }
+                self._out.write(json.dumps(record, default=str) + "\n")
+            else:
+                for market in self._markets(rows, scores):
+                    self._csv.writerow(
+                        [client_id, category, market["rank"], market["score"]]
+                        + [market[key] for key in OUTPUT_FIELDS]
+                    )
+        self._out.flush()
+        os.fsync(self._out.fileno())
+
+        ids = [client_id for client_id, _, _ in results]
+        self._checkpoint.write(json.dumps({"offset": self._out.tell(), "clients": ids}) + "\n")
+        self._checkpoint.flush()
+        self.done.update(ids)
+
+    def close(self):
+        self._out.close()
+        self._checkpoint.close()
+
+
+def run_bulk(df, profiles, output, n_jobs=None, shard_size=256, resume=True, verbose=True):
+    """
+    Score every profile and stream the results to output (.jsonl or .csv)
+
+    Profiles are split into shards of shard_size and spread over n_jobs
+    worker processes (default: all cores) that share the scaled matrix;
+    shards are written as they complete. With resume, clients recorded in
+    the checkpoint of an earlier run are skipped. Returns throughput stats.
+    """
+    start = time.perf_counter()
+    ids = [p.client_id for p in profiles]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Client ids must be unique")
+
+    scorer = BulkScorer.for_profiles(df, profiles)
+    writer = ResultWriter(output, scorer, profiles, resume=resume)
+    todo = [scorer.compile(p) for p in profiles if p.client_id not in writer.done]
+    shards = [todo[i:i + shard_size] for i in range(0, len(todo), shard_size)]
+    skipped = len(profiles) - len(todo)
+    if verbose and skipped:
+        print(f"✓ Resuming: {skipped:,} profiles already written to {output}")
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_features = len(scorer.features)
+    try:
+        if n_jobs == 1 or len(shards) <= 1:
+            _use_matrix(scorer.matrix, n_features)
+            for shard in shards:
+                writer.write(_score_shard(shard))
+        else:
+            shared = SharedMatrix(scorer.matrix)
+            try:
+                with ProcessPoolExecutor(
+                    max_workers=min(n_jobs, len(shards)),
+                    initializer=_init_worker,
+                    initargs=(shared.name, shared.shape, n_features),
+                ) as pool:
+                    futures = [pool.submit(_score_shard, shard) for shard in shards]
+                    for future in as_completed(futures):
+                        writer.write(future.result())
+            finally:
+                shared.close()
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - start
+    stats = {
+        "profiles": len(todo),
+        "skipped": skipped,
+        "seconds": seconds,
+        "profiles_per_sec": len(todo) / seconds if seconds else 0.0,
+    }
+    if verbose:
+        print(
+            f"✓ Scored {len(todo):,} profiles in {seconds:.2f}s "
+            f"({stats['profiles_per_sec']:,.0f} profiles/sec) -> {output}"
+        )
+    return stats
@@ -0,0 +1,199 @@
+"""
+Product-category scoring profiles
+Each profile is a weight vector over a shared scaled feature matrix, so every
+category can be scored in one batched pass
+"""
+
+from collections.abc import Mapping
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+from compact_data import float64_values
+from market_index import CATEGORICAL_FILTERS, RANGE_FILTERS, category_key
+from scenarios import minmax_scale
+
+
+@dataclass(frozen=True)
+class CategoryProfile:
+    """Feature weights and optional filters for one product category"""
+
+    name: str
+    weights: dict
+    description: str = ""
+    filters: dict = field(default_factory=dict)
+
+
+class ProfileRegistry(Mapping):
+    """
+    Read-only mapping of category name -> profile
+
+    Profiles are added with register(), which bumps version so caches keyed
+    on it see every change.
+    """
+
+    def __init__(self):
+        self._profiles = {}
+        self.version = 0
+
+    def __getitem__(self, name):
+        return self._profiles[name]
+
+    def __iter__(self):
+        return iter(self._profiles)
+
+    def __len__(self):
+        return len(self._profiles)
+
+    def register(self, profile):
+        """Add or replace a profile"""
+        self._profiles[profile.name] = profile
+        self.version += 1
+
+
+CATEGORY_PROFILES = ProfileRegistry()
+
+# Feature that stands for market size; horizon scoring swaps in a projection
+MARKET_SIZE_FEATURE = "2022 Population"
+
+
+def register_profile(profile):
+    """Add or replace a category profile"""
+    CATEGORY_PROFILES.register(profile)
+
+
+def registry_version():
+    """Counter that changes whenever the registry does, for cache keys"""
+    return CATEGORY_PROFILES.version
+
+
+for _profile in [
+    CategoryProfile(
+        "children_clothing",
+        {
+            "GDP ($ per capita)": 0.4,
+            "Literacy (%)": 0.2,
+            "Phones (per 1000)": 0.2,
+            "Birthrate": 0.2,
+        },
+        "Purchasing power plus a young population (the original MOS)",
+    ),
+    CategoryProfile(
+        "workwear",
+        {
+            "Industry": 0.4,
+            "2022 Population": 0.2,
+            "GDP ($ per capita)": 0.2,
+            "Phones (per 1000)": 0.2,
+        },
+        "Large industrial workforces",
+        filters={"min_population": 1_000_000},
+    ),
+    CategoryProfile(
+        "luxury",
+        {
+            "GDP ($ per capita)": 0.6,
+            "Phones (per 1000)": 0.2,
+            "Literacy (%)": 0.2,
+        },
+        "High-income consumers",
+        filters={"min_gdp": 15_000},
+    ),
+    CategoryProfile(
+        "basics",
+        {
+            "2022 Population": 0.4,
+            "Growth Rate": 0.2,
+            "GDP ($ per capita)": 0.2,
+            "Birthrate": 0.2,
+        },
+        "Volume markets with growing populations",
+    ),
+]:
+    register_profile(_profile)
+
+
+def at_horizon(profile, column):
+    """Return the profile with its market-size weight moved to column"""
+    if MARKET_SIZE_FEATURE not in profile.weights:
+        return profile
+    weights = {
+        column if f == MARKET_SIZE_FEATURE else f: w for f, w in profile.weights.items()
+    }
+    return replace(profile, weights=weights)
+
+
+def filter_mask(df, filters):
+    """Evaluate recommendation filters as one boolean mask over df"""
+    mask = np.ones(len(df), dtype=bool)
+    for name, col in CATEGORICAL_FILTERS.items():
+        wanted = filters.get(name)
+        if wanted is None or col not in df.columns:
+            continue
+        if isinstance(wanted, str):
+            wanted = [wanted]
+        keys = df[col].map(category_key, na_action="ignore")
+        mask &= keys.isin([category_key(w) for w in wanted]).to_numpy()
+    for name, col in RANGE_FILTERS.items():
+        low, high = filters.get(f"min_{name}"), filters.get(f"max_{name}")
+        if (low is None and high is None) or col not in df.columns:
+            continue
+        values = float64_values(df[col])
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+    return mask
+
+
+class CategoryScores:
+    """
+    Scores and filtered rankings of every profile over one frame
+
+    All profiles are compiled into a (profiles x features) weight matrix over
+    the union of their features and scored with a single matrix multiply.
+    """
+
+    def __init__(self, df, profiles):
+        self.frame = df
+        self.profiles = list(profiles)
+        self.features = list(
+            dict.fromkeys(f for p in self.profiles for f in p.weights if f in df.columns)
+        )
+        self.missing = {
+            p.name: [f for f in p.weights if f not in df.columns] for p in self.profiles
+        }
+
+        W = np.array(
+            [[p.weights.get(f, 0.0) for f in self.features] for p in self.profiles]
+        ).reshape(len(self.profiles), len(self.features))
+        scaled = minmax_scale(float64_values(df[self.features]))
+        missing = np.isnan(scaled)
+
+        # A row is scored by a profile only if every feature it weights exists
+        used = (W != 0).astype(np.float64)
+        valid = (missing.astype(np.float64) @ used.T) == 0
+        self.scores = np.where(valid, np.nan_to_num(scaled) @ W.T, np.nan)
+
+        self.rankings = {}
+        for j, profile in enumerate(self.profiles):
+            keep = valid[:, j] & filter_mask(df, profile.filters)
+            rows = np.flatnonzero(keep)
+            self.rankings[profile.name] = rows[
+                np.argsort(-self.scores[rows, j], kind="stable")
+            ]
+
+    def score_frame(self):
+        """Return the country x category score matrix"""
+        return pd.DataFrame(
+            self.scores,
+            index=self.frame["Country/Territory"].to_numpy(),
+            columns=[p.name for p in self.profiles],
+        )
+
+    def top(self, category, top_n):
+        """Return the top rows for a category with its score as 'MOS'"""
+        j = [p.name for p in self.profiles].index(category)
+        rows = self.rankings[category][:top_n]
+        return self.frame.take(rows).assign(MOS=self.scores[rows, j])
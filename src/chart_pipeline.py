@@ -0,0 +1,276 @@
+"""
+Chart rendering pipeline
+Charts are described by picklable specs, rendered headless with the
+object-oriented Matplotlib API (no pyplot state) and skipped when an output
+file with the same content hash already exists
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from instrumentation import count, span
+
+# Bump when a renderer changes so existing outputs are re-rendered
+RENDER_VERSION = 1
+MANIFEST_NAME = ".chart_manifest.json"
+
+
+@dataclass
+class ChartSpec:
+    """Everything needed to render one chart: renderer kind, data and output"""
+
+    kind: str
+    data: dict
+    output: str
+    dpi: int = 300
+    fmt: str = "png"
+    label: str = field(default="", compare=False)
+
+    @property
+    def filename(self):
+        return f"{self.output}.{self.fmt}"
+
+    def content_hash(self):
+        """Hash of the renderer kind, data and output settings"""
+        payload = json.dumps(
+            [RENDER_VERSION, self.kind, _jsonable(self.data), self.dpi, self.fmt],
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _jsonable(value):
+    """Convert arrays, Series and NumPy scalars to plain JSON values"""
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if hasattr(value, "tolist"):
+        return _jsonable(value.tolist())
+    if isinstance(value, float) and value != value:
+        return "NaN"
+    return value
+
+
+def _render_top_markets(fig, data):
+    import seaborn as sns
+
+    colors = sns.color_palette("husl", 10)
+    with sns.axes_style("whitegrid"):
+        ax = fig.subplots()
+        ax.barh(data["countries"], data["scores"], color=colors)
+        ax.set_xlabel(data["metric"].replace("_", " ").title())
+        ax.set_ylabel("Country")
+        ax.set_title("Top Export Markets")
+
+
+def _render_regional_distribution(fig, data):
+    import seaborn as sns
+
+    with sns.axes_style("whitegrid"):
+        ax = fig.subplots()
+        ax.pie(data["counts"], labels=data["regions"], autopct="%1.1f%%")
+        ax.set_title("Market Distribution by Region")
+
+
+def _render_gdp_results(fig, data):
+    axes = fig.subplots(1, 2)
+    y_test, y_pred = np.asarray(data["y_test"]), np.asarray(data["y_pred"])
+
+    # Actual vs Predicted
+    axes[0].scatter(y_test, y_pred, alpha=0.6)
+    axes[0].plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()], "r--", lw=2)
+    axes[0].set_xlabel("Actual GDP per Capita")
+    axes[0].set_ylabel("Predicted GDP per Capita")
+    axes[0].set_title(f'GDP Prediction (R² = {data["r2_score"]:.3f})')
+    axes[0].grid(True, alpha=0.3)
+
+    # Feature Importance
+    axes[1].barh(data["features"], np.abs(data["coefficients"]))
+    axes[1].set_xlabel("Absolute Coefficient Value")
+    axes[1].set_title("Feature Importance (Linear Regression)")
+    axes[1].grid(True, alpha=0.3, axis="x")
+
+
+def _render_classification_results(fig, data):
+    import seaborn as sns
+
+    axes = fig.subplots(1, 2)
+
+    # Confusion Matrix
+    sns.heatmap(
+        np.asarray(data["confusion_matrix"]),
+        annot=True,
+        fmt="d",
+        cmap="Blues",
+        ax=axes[0],
+        cbar=False,
+    )
+    axes[0].set_xlabel("Predicted")
+    axes[0].set_ylabel("Actual")
+    axes[0].set_title(f'Confusion Matrix (Acc = {data["accuracy"]:.3f})')
+    axes[0].set_xticklabels(["Low MOS", "High MOS"])
+    axes[0].set_yticklabels(["Low MOS", "High MOS"])
+
+    # ROC Curve
+    axes[1].plot(data["fpr"], data["tpr"], label=f'AUC = {data["roc_auc"]:.3f}', lw=2)
+    axes[1].plot([0, 1], [0, 1], "r--", lw=2, label="Random")
+    axes[1].set_xlabel("False Positive Rate")
+    axes[1].set_ylabel("True Positive Rate")
+    axes[1].set_title("ROC Curve - Market Classification")
+    axes[1].legend(loc="lower right")
+    axes[1].grid(True, alpha=0.3)
+
+
+RENDERERS = {
+    "top_markets": (_render_top_markets, (12, 6)),
+    "regional_distribution": (_render_regional_distribution, (10, 8)),
+    "gdp_results": (_render_gdp_results, (14, 5)),
+    "classification_results": (_render_classification_results, (14, 5)),
+}
+
+
+def render_chart(spec, output_dir="."):
+    """Render one spec to disk without touching pyplot's global state"""
+    from matplotlib.figure import Figure
+
+    render, figsize = RENDERERS[spec.kind]
+    fig = Figure(figsize=figsize)
+    render(fig, spec.data)
+    fig.tight_layout()
+    path = Path(output_dir) / spec.filename
+    fig.savefig(path, dpi=spec.dpi, format=spec.fmt, bbox_inches="tight")
+    return str(path)
+
+
+def _init_worker():
+    os.environ["MPLBACKEND"] = "Agg"
+
+
+class ChartPipeline:
+    """
+    Render chart specs concurrently in a process pool
+
+    Specs whose content hash matches the manifest entry of an existing output
+    file are skipped. submit() returns immediately, so analysis can continue
+    while charts render; call wait() (or use the pipeline as a context
+    manager) to collect results and update the manifest.
+    """
+
+    def __init__(self, output_dir=".", max_workers=None, dpi=None, fmt=None):
+        self.output_dir = Path(output_dir)
+        self.max_workers = max_workers
+        self.dpi = dpi
+        self.fmt = fmt
+        self._pool = None
+        self._pending = []
+        self.manifest_path = self.output_dir / MANIFEST_NAME
+        self.manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        tmp.replace(self.manifest_path)
+
+    def _apply_overrides(self, spec):
+        if self.dpi is not None:
+            spec.dpi = self.dpi
+        if self.fmt is not None:
+            spec.fmt = self.fmt
+        return spec
+
+    def is_current(self, spec):
+        """Whether the output file exists and was rendered from identical content"""
+        return (
+            (self.output_dir / spec.filename).exists()
+            and self.manifest.get(spec.filename) == spec.content_hash()
+        )
+
+    def submit(self, spec):
+        """Queue a spec for background rendering; returns a Future of its path"""
+        spec = self._apply_overrides(spec)
+        if self.is_current(spec):
+            print(f"✓ Up to date: {spec.filename}")
+            count("charts_skipped")
+            done = Future()
+            done.set_result(None)
+            return done
+
+        if self._pool is None:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_init_worker
+            )
+        future = self._pool.submit(render_chart, spec, str(self.output_dir))
+        self._pending.append((spec, future))
+        return future
+
+    def render_now(self, spec):
+        """Render a spec in this process unless its output is current"""
+        spec = self._apply_overrides(spec)
+        if self.is_current(spec):
+            print(f"✓ Up to date: {spec.filename}")
+            count("charts_skipped")
+            return None
+        with span("plot", chart=spec.filename):
+            path = render_chart(spec, self.output_dir)
+        self.manifest[spec.filename] = spec.content_hash()
+        self._write_manifest()
+        print(f"✓ Saved{' ' + spec.label if spec.label else ''}: {spec.filename}")
+        return path
+
+    def wait(self):
+        """Wait for submitted charts, record their hashes and return the paths"""
+        paths = []
+        if not self._pending:
+            return paths
+        with span("plot", charts=len(self._pending)):
+            for spec, future in self._pending:
+                try:
+                    paths.append(future.result())
+                    self.manifest[spec.filename] = spec.content_hash()
+                    print(f"✓ Saved{' ' + spec.label if spec.label else ''}: {spec.filename}")
+                except Exception as e:
+                    print(f"✗ Error rendering {spec.filename}: {e}")
+        self._pending = []
+        if paths:
+            self._write_manifest()
+        return paths
+
+    def close(self):
+        """Wait for outstanding work and shut the pool down"""
+        self.wait()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def render_spec(spec, pipeline=None, background=False):
+    """Render a spec now, or submit it when background is set (needs a pipeline)"""
+    if background and pipeline is None:
+        raise ValueError("Background rendering needs a ChartPipeline to wait on")
+    pipeline = pipeline or ChartPipeline()
+    if background:
+        return pipeline.submit(spec)
+    return pipeline.render_now(spec)
@@ -0,0 +1,147 @@
+"""
+Compact in-memory representation for merged data
+Categorical labels, dropped duplicate name columns and downcast numerics,
+plus before/after memory reporting for frames and recommendation records
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Low-cardinality label columns held as (trimmed) categoricals
+CATEGORICAL_COLUMNS = ["Region", "Continent", "Climate"]
+
+# The countries dataset's own name column duplicates Country/Territory after
+# the merge
+DUPLICATE_COLUMNS = ["Country"]
+
+# Decimal digits float32 reliably round-trips; values recorded with more
+# keep their column in float64
+SIGNIFICANT_DIGITS = 7
+
+# frame.attrs key naming the columns compact_frame stored as float32; only
+# those are widened back, so callers' own float32 data is read as is
+FLOAT32_ATTR = "compact_float32"
+
+
+def frame_memory(df):
+    """Bytes held by a frame, string payloads included"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def widen(values):
+    """
+    float64 copy of (float32) values rounded to SIGNIFICANT_DIGITS, which
+    restores the decimals they were recorded as
+    """
+    x = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        exponent = np.floor(np.log10(np.abs(x)))
+    decimals = SIGNIFICANT_DIGITS - 1 - np.where(np.isfinite(exponent), exponent, 0)
+    scale = 10.0 ** np.abs(decimals)
+    # Integer over (or times) an exact power of ten rounds like parsing the decimal
+    return np.where(decimals >= 0, np.rint(x * scale) / scale, np.rint(x / scale) * scale)
+
+
+def float32_exact(values):
+    """True when every value survives float32 at the precision it was recorded with"""
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[~np.isnan(values)]
+    if not np.isfinite(finite).all() or (np.abs(finite) > np.finfo(np.float32).max).any():
+        return False
+    return np.array_equal(widen(values.astype(np.float32)), values, equal_nan=True)
+
+
+def float32_columns(df):
+    """Columns of a frame (or series) that compact_frame downcast to float32"""
+    return df.attrs.get(FLOAT32_ATTR, ())
+
+
+def float64_values(df):
+    """
+    A series or frame as float64 NumPy values; columns compact_frame stored
+    as float32 are widened to their recorded decimals so scores match the
+    full frame
+    """
+    if isinstance(df, pd.Series):
+        if df.dtype == np.float32 and df.name in float32_columns(df):
+            return widen(df.to_numpy())
+        return df.to_numpy(dtype=np.float64, na_value=np.nan)
+    out = np.empty(df.shape, dtype=np.float64)
+    for j in range(df.shape[1]):
+        out[:, j] = float64_values(df.iloc[:, j])
+    return out
+
+
+def _categorical(series):
+    """Trimmed categorical copy of a label column"""
+    labels = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series
+    if pd.api.types.is_string_dtype(labels):
+        # Padded variants of one label collapse into a single category
+        series = series.map(str.strip, na_action="ignore")
+    return series.astype("category")
+
+
+def compact_frame(df, categorical=CATEGORICAL_COLUMNS, drop=DUPLICATE_COLUMNS):
+    """
+    Return a compacted copy of df
+
+    Label columns become trimmed categoricals, duplicate name columns are
+    dropped, integers shrink to the smallest type that holds them and floats
+    become float32 where float32_exact() holds. Applying it twice is a no-op.
+    The downcast float columns are listed in attrs[FLOAT32_ATTR].
+    """
+    df = df.drop(columns=[c for c in drop if c in df.columns])
+    downcast = list(float32_columns(df))
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if col in categorical:
+            columns[col] = _categorical(series)
+        elif pd.api.types.is_integer_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            columns[col] = pd.to_numeric(series, downcast="integer")
+        elif series.dtype == np.float64 and float32_exact(series.to_numpy()):
+            columns[col] = series.astype(np.float32)
+            downcast.append(col)
+        else:
+            columns[col] = series
+    out = pd.DataFrame(columns, index=df.index)
+    out.attrs = dict(df.attrs, **{FLOAT32_ATTR: tuple(c for c in downcast if c in out.columns)})
+    return out
+
+
+def records_memory(records):
+    """Approximate bytes held by a list of records (values are shared)"""
+    return sys.getsizeof(records) + sum(sys.getsizeof(r) for r in records)
+
+
+def memory_report(before, after, records_before=None, records_after=None):
+    """Before/after sizes for a frame and (optionally) its records"""
+    report = {
+        "frame_before_bytes": frame_memory(before),
+        "frame_after_bytes": frame_memory(after),
+        "columns_before": before.shape[1],
+        "columns_after": after.shape[1],
+    }
+    if records_before is not None and records_after is not None:
+        report["records_before_bytes"] = records_memory(records_before)
+        report["records_after_bytes"] = records_memory(records_after)
+        report["records"] = len(records_before)
+    return report
+
+
+def format_memory_report(report):
+    """One line per measured structure"""
+    lines = []
+    for name in ("frame", "records"):
+        before = report.get(f"{name}_before_bytes")
+        after = report.get(f"{name}_after_bytes")
+        if before is None:
+            continue
+        label = f"{report['records']:,} records" if name == "records" else "frame"
+        saved = 100 * (1 - after / before) if before else 0.0
+        lines.append(
+            f"  {label:<16} {before / 1024:>10.1f} KB -> {after / 1024:>10.1f} KB ({saved:.0f}% smaller)"
+        )
+    return "\n".join(lines)
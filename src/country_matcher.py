@@ -0,0 +1,150 @@
+"""
+Country name matching
+Resolves country names against a reference list with exact, normalized-key and
+alias fast paths, then one batched fuzzy pass for whatever is left
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+from rapidfuzz import process, fuzz
+
+# Opt-in aliases for names the fuzzy pass misses or gets wrong in
+# "countries of the world.csv". Not applied by default so that merges stay
+# identical to the original extractOne behaviour.
+COMMON_ALIASES = {
+    "Burma": "Myanmar",
+    "Congo, Dem. Rep.": "DR Congo",
+    "Congo, Repub. of the": "Republic of the Congo",
+    "Cote d'Ivoire": "Ivory Coast",
+    "East Timor": "Timor-Leste",
+    "Swaziland": "Eswatini",
+    "British Virgin Is.": "British Virgin Islands",
+    "Virgin Islands": "United States Virgin Islands",
+    "Turks & Caicos Is": "Turks and Caicos Islands",
+}
+
+# Upper bound on fuzzy score-matrix cells held at once (queries x choices)
+FUZZY_BLOCK_CELLS = 4_000_000
+
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_name(name):
+    """Build a case and punctuation insensitive lookup key for a name"""
+    key = str(name).casefold().replace("&", " and ")
+    key = _PUNCT.sub(" ", key)
+    return _SPACES.sub(" ", key).strip()
+
+
+class CountryMatcher:
+    """
+    Match country names against a reference list
+
+    Lookup order: exact name, normalized key, alias table (explicit aliases,
+    reference codes such as CCA3 and "Korea, South" style inversions), then a
+    single rapidfuzz cdist pass with WRatio over the remaining names.
+    """
+
+    def __init__(self, choices, codes=None, aliases=None, threshold=80, workers=1):
+        self.choices = [str(c).strip() for c in choices]
+        self.threshold = threshold
+        self.workers = workers
+
+        # First occurrence wins, mirroring extractOne's tie-breaking
+        self._exact = {}
+        self._normalized = {}
+        for choice in self.choices:
+            self._exact.setdefault(choice, choice)
+            self._normalized.setdefault(normalize_name(choice), choice)
+
+        self._aliases = {}
+        if codes is not None:
+            for code, choice in zip(codes, self.choices):
+                if pd.notna(code):
+                    self._aliases.setdefault(normalize_name(code), choice)
+        for alias, target in (aliases or {}).items():
+            target = str(target).strip()
+            if target in self._exact:
+                self._aliases[normalize_name(alias)] = target
+
+    def _lookup(self, name):
+        """Resolve a name through the exact, normalized and alias tables"""
+        if name in self._exact:
+            return self._exact[name], "exact"
+
+        key = normalize_name(name)
+        if key in self._normalized:
+            return self._normalized[key], "normalized"
+        if key in self._aliases:
+            return self._aliases[key], "alias"
+
+        # "Korea, South" -> "South Korea"
+        if "," in name:
+            head, _, tail = name.partition(",")
+            inverted = normalize_name(f"{tail} {head}")
+            if inverted in self._normalized:
+                return self._normalized[inverted], "alias"
+
+        return None, None
+
+    def match_table(self, names):
+        """
+        Match each name and return a frame with one row per input name
+
+        Columns: name, match, score, method. Unmatched names have a missing
+        match and method. Scores are WRatio scores, the same values the
+        original per-row extractOne reported.
+        """
+        names = pd.Series(names, dtype=object).reset_index(drop=True)
+        matches = np.full(len(names), None, dtype=object)
+        scores = np.full(len(names), np.nan)
+        methods = np.full(len(names), None, dtype=object)
+
+        pending = {}
+        for i, name in enumerate(names):
+            if pd.isna(name):
+                continue
+            name = str(name)
+            match, method = self._lookup(name)
+            if match is None:
+                pending.setdefault(name, []).append(i)
+                continue
+            matches[i] = match
+            methods[i] = method
+            scores[i] = 100.0 if method == "exact" else fuzz.WRatio(name, match)
+
+        if pending and self.choices:
+            queries = list(pending)
+            best = np.empty(len(queries), dtype=np.int64)
+            best_scores = np.empty(len(queries))
+            # Score in blocks so the matrix stays bounded for large references
+            block = max(1, FUZZY_BLOCK_CELLS // len(self.choices))
+            for start in range(0, len(queries), block):
+                score_matrix = process.cdist(
+                    queries[start:start + block],
+                    self.choices,
+                    scorer=fuzz.WRatio,
+                    dtype=np.float64,
+                    workers=self.workers,
+                )
+                rows = np.arange(len(score_matrix))
+                best[start:start + block] = score_matrix.argmax(axis=1)
+                best_scores[start:start + block] = score_matrix[rows, best[start:start + block]]
+
+            for query, col, score in zip(queries, best, best_scores):
+                rows = pending[query]
+                scores[rows] = score
+                if score > self.threshold:
+                    matches[rows] = self.choices[col]
+                    methods[rows] = "fuzzy"
+
+        return pd.DataFrame(
+            {"name": names, "match": matches, "score": scores, "method": methods}
+        )
+
+    def match(self, names):
+        """Return the matched reference name (or None) for each input name"""
+        return [m if pd.notna(m) else None for m in self.match_table(names)["match"]]
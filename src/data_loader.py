@@ -2,70 +2,307 @@
 Data loading and preprocessing module
 """
 
-import pandas as pd
+from dataclasses import dataclass, field
 from pathlib import Path
 
+import pandas as pd
+
+from dataset_cache import hash_file, read_feather_mmap
+from instrumentation import count, instrumented, span
+
+COUNTRY_NUMERIC_COLUMNS = [
+    "Pop. Density (per sq. mi.)",
+    "Coastline (coast/area ratio)",
+    "Net migration",
+    "Infant mortality (per 1000 births)",
+    "GDP ($ per capita)",
+    "Literacy (%)",
+    "Phones (per 1000)",
+    "Arable (%)",
+    "Crops (%)",
+    "Other (%)",
+    "Climate",
+    "Birthrate",
+    "Deathrate",
+    "Agriculture",
+    "Industry",
+    "Service",
+]
+
+# Census years of the "<year> Population" columns in the population source
+POPULATION_YEARS = [2022, 2020, 2015, 2010, 2000, 1990, 1980, 1970]
+POPULATION_COLUMNS = [f"{year} Population" for year in POPULATION_YEARS]
+
+
+@dataclass(frozen=True)
+class SourceSchema:
+    """Declarative description of how to read one source file"""
+
+    filename: str
+    label: str
+    key_columns: tuple
+    decimal: str = "."
+    dtypes: dict = field(default_factory=dict)
+    categorical: tuple = ()
+
+    def read_dtypes(self, columns):
+        """Return the read-time dtype mapping restricted to the given columns"""
+        dtypes = {col: dtype for col, dtype in self.dtypes.items() if col in columns}
+        dtypes.update({col: "category" for col in self.categorical if col in columns})
+        return dtypes
+
+
+SCHEMAS = {
+    "population": SourceSchema(
+        filename="world_population.csv",
+        label="population data",
+        key_columns=("Country/Territory", "CCA3"),
+        dtypes={"Growth Rate": "float64", "World Population Percentage": "float64"},
+        categorical=("Continent",),
+    ),
+    "countries": SourceSchema(
+        filename="countries of the world.csv",
+        label="country data",
+        key_columns=("Country",),
+        decimal=",",
+        dtypes={col: "float64" for col in COUNTRY_NUMERIC_COLUMNS},
+        categorical=("Region",),
+    ),
+    "exports": SourceSchema(
+        filename="combined_exportmap_dataset.csv",
+        label="export data",
+        key_columns=("Country/Territory", "CCA3"),
+        dtypes={col: "float64" for col in COUNTRY_NUMERIC_COLUMNS},
+        categorical=("Continent", "Region"),
+    ),
+}
+
+# Kept for callers that only need the file names
+SOURCE_FILES = {name: schema.filename for name, schema in SCHEMAS.items()}
+
+
 class DataLoader:
-    def __init__(self, data_dir="./"):
+    def __init__(self, data_dir="./", columnar_dir=None):
         self.data_dir = Path(data_dir)
+        self.columnar_dir = (
+            Path(columnar_dir) if columnar_dir else self.data_dir / ".columnar"
+        )
+    
+    def fingerprint(self):
+        """Hash the contents of every source file for cache invalidation"""
+        hashes = {}
+        for name, schema in SCHEMAS.items():
+            path = self.data_dir / schema.filename
+            hashes[name] = hash_file(path) if path.exists() else None
+        return hashes
+    
+    def _columnar_path(self, name):
+        return self.columnar_dir / f"{name}.feather"
+    
+    def _fresh_columnar(self, name):
+        """Return the columnar copy of a source if it is newer than the CSV"""
+        path = self._columnar_path(name)
+        csv_path = self.data_dir / SCHEMAS[name].filename
+        if path.exists() and path.stat().st_mtime >= csv_path.stat().st_mtime:
+            return path
+        return None
     
-    def load_all_datasets(self):
-        """Load all available datasets"""
+    def _project(self, schema, available, columns):
+        """Pick the key columns plus any requested columns this source has"""
+        if columns is None:
+            return None
+        wanted = set(schema.key_columns) | set(columns)
+        return [col for col in available if col in wanted]
+    
+    def read_source(self, name, columns=None):
+        """
+        Read one source with its schema, loading only the key columns plus
+        the requested columns (all columns when columns is None)
+        """
+        schema = SCHEMAS[name]
+        columnar = self._fresh_columnar(name)
+        if columnar is not None:
+            from pyarrow import ipc
+            
+            with ipc.open_file(columnar) as reader:
+                available = reader.schema.names
+            return read_feather_mmap(columnar, self._project(schema, available, columns))
+        
+        path = self.data_dir / schema.filename
+        available = pd.read_csv(path, nrows=0).columns
+        usecols = self._project(schema, available, columns)
+        return pd.read_csv(
+            path,
+            usecols=usecols,
+            decimal=schema.decimal,
+            dtype=schema.read_dtypes(usecols if usecols is not None else available),
+        )
+    
+    @instrumented("load")
+    def load_all_datasets(self, columns=None):
+        """
+        Load all available datasets
+
+        columns limits every source to its key columns plus the named
+        columns it contains, e.g. market_analyzer.analysis_columns().
+        """
         print("Loading datasets...")
         
         data = {}
-        
-        # Load population data
-        try:
-            data['population'] = pd.read_csv(self.data_dir / 'world_population.csv')
-            print(f"✓ Loaded population data: {len(data['population'])} countries")
-        except Exception as e:
-            print(f"✗ Error loading population data: {e}")
-        
-        # Load country statistics
-        try:
-            data["countries"] = pd.read_csv(self.data_dir / "countries of the world.csv")
-            data["countries"] = self.clean_all_numeric_columns(data["countries"])
-            print(f"✓ Loaded country data: {len(data['countries'])} countries")
-        except Exception as e:
-            print(f"✗ Error loading country data: {e}")
-        
-        # Load combined export data
-        try:
-            data['exports'] = pd.read_csv(self.data_dir / 'combined_exportmap_dataset.csv')
-            print(f"✓ Loaded export data: {len(data['exports'])} records")
-        except Exception as e:
-            print(f"✗ Error loading export data: {e}")
+        for name, schema in SCHEMAS.items():
+            try:
+                with span("read", source=name):
+                    data[name] = self.read_source(name, columns)
+                    count("rows_loaded", len(data[name]))
+                print(f"✓ Loaded {schema.label}: {len(data[name])} rows")
+            except Exception as e:
+                print(f"✗ Error loading {schema.label}: {e}")
         
         return data
     
-    def clean_numeric_column(self, df, column):
-        """Clean numeric columns with comma decimal separators"""
-        if column in df.columns:
-            df[column] = (
-                df[column].astype(str).str.replace(",", ".").astype(float, errors="ignore")
+    def convert_to_columnar(self):
+        """Parse each source once and store it as a memory-mappable Feather file"""
+        self.columnar_dir.mkdir(parents=True, exist_ok=True)
+        for name, schema in SCHEMAS.items():
+            csv_path = self.data_dir / schema.filename
+            if not csv_path.exists():
+                continue
+            # Always parse from the CSV so a stale copy is never re-exported
+            df = pd.read_csv(
+                csv_path,
+                decimal=schema.decimal,
+                dtype=schema.read_dtypes(pd.read_csv(csv_path, nrows=0).columns),
             )
-        return df
-
-    def clean_all_numeric_columns(self, df):
+            df.to_feather(self._columnar_path(name))
+            print(f"✓ Converted {schema.label}: {self._columnar_path(name)}")
+    
+    def clean_numeric_column(self, df, column):
+        """Clean numeric column with comma decimal separators"""
+        return self.clean_all_numeric_columns(df, [column])
+    
+    @instrumented("clean")
+    def clean_all_numeric_columns(self, df, numeric_cols=None):
         """Clean all numeric columns that might have comma separators"""
-        numeric_cols = [
-            "GDP ($ per capita)",
-            "Literacy (%)",
-            "Phones (per 1000)",
-            "Birthrate",
-            "Deathrate",
-            "Infant mortality (per 1000 births)",
-            "Pop. Density (per sq. mi.)",
-            "Net migration",
-            "Arable (%)",
-            "Crops (%)",
-            "Other (%)",
-        ]
+        if numeric_cols is None:
+            numeric_cols = COUNTRY_NUMERIC_COLUMNS
 
         for col in numeric_cols:
-            if col in df.columns:
+            # Columns parsed as numbers at read time need no string round-trip
+            if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
                 df[col] = pd.to_numeric(
                     df[col].astype(str).str.replace(",", "."), errors="coerce"
                 )
+                count("columns_cleaned")
         return df
+    
+    def iter_chunks(
+        self,
+        path,
+        numeric_cols,
+        chunksize=500_000,
+        columns=None,
+        dtypes=None,
+        decimal=".",
+    ):
+        """
+        Stream a large CSV as typed chunks
+
+        Each chunk goes through clean_all_numeric_columns for numeric_cols, so
+        peak memory is bounded by chunksize rather than the file size.
+        """
+        path = Path(path)
+        if not path.is_absolute():
+            path = self.data_dir / path
+        
+        reader = pd.read_csv(
+            path,
+            chunksize=chunksize,
+            usecols=columns,
+            dtype=dtypes,
+            decimal=decimal,
+        )
+        with reader:
+            for chunk in reader:
+                yield self.clean_all_numeric_columns(chunk, numeric_cols)
+    
+    def fetch_indicators(self, sources, countries=None, client=None, year=None):
+        """
+        Fetch external API indicators (indicator_api sources) as one
+        per-country frame per source
+
+        countries are ISO3 codes, by default every CCA3 in the population
+        data. Frames have a "Country" column (codes, or names for WTO) that
+        MarketAnalyzer.add_country_features resolves like any other source.
+        """
+        from indicator_api import ApiClient, HttpCache, fetch_sources
+        
+        if countries is None:
+            countries = self.read_source("population", columns=["CCA3"])["CCA3"].dropna().unique()
+        if client is None:
+            with ApiClient(HttpCache()) as client:
+                return fetch_sources(client, sources, countries, year=year)
+        return fetch_sources(client, sources, countries, year=year)
+    
+    def aggregate_country_features(
+        self,
+        path,
+        country_col,
+        sum_cols=(),
+        mean_cols=(),
+        chunksize=500_000,
+        decimal=".",
+        prefix=None,
+    ):
+        """
+        Stream a country x product x year table into one row per country
+
+        Sums and non-null counts are combined across chunks, so the running
+        state is one small frame per country. sum_cols keep their names; mean
+        columns are reported as "<col> (mean)" alongside a "<prefix> Records"
+        count, where prefix defaults to the file name without its suffix so
+        several aggregated sources can be joined onto the same analyzer.
+        """
+        records_col = f"{prefix or Path(path).stem} Records"
+        sum_cols = list(sum_cols)
+        mean_cols = list(mean_cols)
+        numeric_cols = list(dict.fromkeys(sum_cols + mean_cols))
+        columns = [country_col] + numeric_cols
+        
+        totals = None
+        for chunk in self.iter_chunks(
+            path,
+            numeric_cols,
+            chunksize=chunksize,
+            columns=columns,
+            dtypes={country_col: "category"},
+            decimal=decimal,
+        ):
+            grouped = chunk.groupby(country_col, observed=True)
+            partial = grouped[numeric_cols].sum()
+            partial.columns = [f"{col}__sum" for col in numeric_cols]
+            counts = grouped[mean_cols].count()
+            counts.columns = [f"{col}__count" for col in mean_cols]
+            partial = partial.join(counts)
+            partial[records_col] = grouped.size()
+            partial.index = partial.index.astype(str)
+            
+            totals = partial if totals is None else totals.add(partial, fill_value=0)
+        
+        if totals is None:
+            return pd.DataFrame(
+                columns=[country_col] + sum_cols + [f"{col} (mean)" for col in mean_cols] + [records_col]
+            )
+        
+        features = pd.DataFrame(index=totals.index)
+        for col in sum_cols:
+            features[col] = totals[f"{col}__sum"]
+        for col in mean_cols:
+            features[f"{col} (mean)"] = (
+                totals[f"{col}__sum"] / totals[f"{col}__count"].replace(0, float("nan"))
+            )
+        features[records_col] = totals[records_col].astype("int64")
+        
+        features.index.name = country_col
+        features = features.reset_index()
+        print(f"✓ Aggregated {path}: {features[records_col].sum()} records, {len(features)} countries")
+        return features
@@ -0,0 +1,116 @@
+"""
+Content-addressed on-disk cache for merged datasets
+Entries are keyed by a hash of the input files and matcher settings and stored
+as Feather files so a warm start is a memory-mapped read
+"""
+
+import hashlib
+import json
+import shutil
+import time
+from pathlib import Path
+
+CACHE_FORMAT_VERSION = 1
+
+
+def hash_file(path, block_size=1 << 20):
+    """Return the sha256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_feather_mmap(path, columns=None):
+    """Read a Feather file through a memory map"""
+    from pyarrow import feather
+
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+class DatasetCache:
+    """Size-bounded cache of merged frames and match tables"""
+
+    def __init__(self, cache_dir=".exportmap_cache", max_bytes=256 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def make_key(self, *parts):
+        """Build a cache key from JSON-serialisable parts"""
+        payload = json.dumps(
+            [CACHE_FORMAT_VERSION, *parts], sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key
+
+    def load(self, key):
+        """Return (merged, match_table) for a key, or None on a miss"""
+        entry = self._entry_dir(key)
+        merged_path = entry / "merged.feather"
+        if not merged_path.exists():
+            return None
+
+        try:
+            merged = read_feather_mmap(merged_path)
+            match_path = entry / "matches.feather"
+            matches = read_feather_mmap(match_path) if match_path.exists() else None
+        except Exception as e:
+            print(f"✗ Discarding unreadable cache entry {key[:12]}: {e}")
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+
+        # Mark as recently used for eviction
+        merged_path.touch()
+        return merged, matches
+
+    def store(self, key, merged, match_table=None, meta=None):
+        """Write an entry atomically, then evict old entries over the size bound"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry = self._entry_dir(key)
+        tmp = self.cache_dir / f".{key}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir()
+
+        merged.reset_index(drop=True).to_feather(tmp / "merged.feather")
+        if match_table is not None:
+            match_table.reset_index(drop=True).to_feather(tmp / "matches.feather")
+        with open(tmp / "meta.json", "w") as f:
+            json.dump({"created": time.time(), **(meta or {})}, f, default=str)
+
+        shutil.rmtree(entry, ignore_errors=True)
+        tmp.rename(entry)
+        self.evict(keep=key)
+
+    def invalidate(self, key=None):
+        """Remove one entry, or the whole cache when no key is given"""
+        target = self._entry_dir(key) if key else self.cache_dir
+        shutil.rmtree(target, ignore_errors=True)
+
+    def _entries(self):
+        """Return (mtime, size, path) for every cache entry"""
+        if not self.cache_dir.exists():
+            return []
+        entries = []
+        for entry in self.cache_dir.iterdir():
+            if not entry.is_dir() or entry.name.startswith("."):
+                continue
+            files = [f for f in entry.iterdir() if f.is_file()]
+            size = sum(f.stat().st_size for f in files)
+            mtime = max((f.stat().st_mtime for f in files), default=0)
+            entries.append((mtime, size, entry))
+        return entries
+
+    def evict(self, keep=None):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        entries = sorted(self._entries(), key=lambda e: e[0])
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if entry.name == keep:
+                continue
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
@@ -0,0 +1,101 @@
+"""
+Shared numeric feature store
+Holds the model and MOS feature columns of merged_data in one contiguous
+column-major float matrix so consumers slice views instead of copying frames
+"""
+
+import numpy as np
+
+from compact_data import float64_values
+from scenarios import minmax_scale
+
+
+class FeatureStore:
+    """
+    One float64 matrix of selected columns with a column index
+
+    Columns are laid out in the order given, column-major, so a single column
+    or a run of adjacent columns is a zero-copy view. Validity masks and
+    scaled matrices are computed once per column set and cached.
+    """
+
+    def __init__(self, df, columns):
+        self.columns = [col for col in dict.fromkeys(columns) if col in df.columns]
+        self.index = {col: j for j, col in enumerate(self.columns)}
+        self.row_labels = df.index
+
+        self.values = np.empty((len(df), len(self.columns)), dtype=np.float64, order="F")
+        for j, col in enumerate(self.columns):
+            self.values[:, j] = float64_values(df[col])
+
+        self._masks = {}
+        self._scaled = {}
+
+    def _derive(self, values, row_labels, columns=None):
+        """A store over new values, with empty caches"""
+        store = object.__new__(FeatureStore)
+        store.columns = list(self.columns if columns is None else columns)
+        store.index = {col: j for j, col in enumerate(store.columns)}
+        store.row_labels = row_labels
+        store.values = values
+        store._masks = {}
+        store._scaled = {}
+        return store
+
+    def with_column(self, name, values):
+        """
+        A store with one column replaced (or appended), keeping the cached
+        masks and scaled matrices that do not involve it
+        """
+        columns = self.columns if name in self.index else self.columns + [name]
+        out = np.empty((len(self), len(columns)), dtype=np.float64, order="F")
+        out[:, :len(self.columns)] = self.values
+        out[:, columns.index(name)] = values
+        store = self._derive(out, self.row_labels, columns)
+        store._masks = {key: m for key, m in self._masks.items() if name not in key}
+        store._scaled = {key: s for key, s in self._scaled.items() if name not in key}
+        return store
+
+    def take(self, positions):
+        """A store with its rows (and cached results) reordered by position"""
+        store = self._derive(np.asfortranarray(self.values[positions]), self.row_labels[positions])
+        store._masks = {key: m[positions] for key, m in self._masks.items()}
+        store._scaled = {key: s[positions] for key, s in self._scaled.items()}
+        return store
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __contains__(self, column):
+        return column in self.index
+
+    def column(self, name):
+        """Return one column as a view"""
+        return self.values[:, self.index[name]]
+
+    def view(self, columns):
+        """
+        Return the given columns as an (n, k) matrix
+
+        Adjacent columns in store order come back as a view; any other
+        selection is gathered into a new array.
+        """
+        positions = [self.index[col] for col in columns]
+        start = positions[0]
+        if positions == list(range(start, start + len(positions))):
+            return self.values[:, start:start + len(positions)]
+        return self.values[:, positions]
+
+    def valid_mask(self, columns):
+        """Cached mask of rows with no missing value in any of the columns"""
+        key = tuple(columns)
+        if key not in self._masks:
+            self._masks[key] = ~np.isnan(self.view(columns)).any(axis=1)
+        return self._masks[key]
+
+    def scaled(self, columns):
+        """Cached min-max scaled copy of the columns (NaNs kept)"""
+        key = tuple(columns)
+        if key not in self._scaled:
+            self._scaled[key] = minmax_scale(self.view(columns))
+        return self._scaled[key]
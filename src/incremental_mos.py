@@ -0,0 +1,159 @@
+"""
+Incremental Market Opportunity Score maintenance
+Keeps running min/max statistics per feature and a sorted ranking so single
+country updates rescore one row unless a feature's range actually moves
+"""
+
+import bisect
+
+import numpy as np
+
+from compact_data import float64_values
+
+
+class IncrementalMOS:
+    """
+    Maintain MOS scores and a ranking under single-row updates
+
+    Rows are identified by arbitrary hashable keys (merged_data index labels
+    in MarketAnalyzer). Rows with a missing feature have no score and are left
+    out of the ranking, matching calculate_mos and nlargest.
+    """
+
+    def __init__(self, keys, raw, features, weights):
+        self.features = list(features)
+        self.weights = np.array([weights.get(f, 0.0) for f in self.features])
+        self.keys = list(keys)
+        self.positions = {key: pos for pos, key in enumerate(self.keys)}
+
+        raw = np.asarray(raw, dtype=np.float64).reshape(len(self.keys), len(self.features))
+        self._capacity = max(len(self.keys), 16)
+        self._raw = np.empty((self._capacity, len(self.features)))
+        self._raw[: len(self.keys)] = raw
+        self._scores = np.full(self._capacity, np.nan)
+
+        self.full_rescores = 0
+        self.row_rescores = 0
+        self._refresh_stats()
+        self._rescore_all()
+
+    @classmethod
+    def from_frame(cls, df, features, weights):
+        """Build the maintained state from a frame holding the raw features"""
+        return cls(df.index, float64_values(df[list(features)]), features, weights)
+
+    @property
+    def raw(self):
+        return self._raw[: len(self.keys)]
+
+    @property
+    def scores(self):
+        return self._scores[: len(self.keys)]
+
+    def _refresh_stats(self):
+        """Recompute per-feature min and max, ignoring NaNs"""
+        with np.errstate(invalid="ignore"):
+            if len(self.keys):
+                self.mins = np.nanmin(self.raw, axis=0)
+                self.maxs = np.nanmax(self.raw, axis=0)
+            else:
+                self.mins = np.full(len(self.features), np.nan)
+                self.maxs = np.full(len(self.features), np.nan)
+
+    def _scale(self, rows):
+        """Min-max scale rows with the current statistics (constant -> 0)"""
+        span = self.maxs - self.mins
+        scale = 1.0 / np.where(span == 0, 1.0, span)
+        return rows * scale - self.mins * scale
+
+    def scaled(self, positions=None):
+        """Return scaled features for all rows or the given positions"""
+        rows = self.raw if positions is None else self.raw[positions]
+        return self._scale(rows)
+
+    def _rescore_all(self):
+        """Rescore every row and rebuild the ranking"""
+        self.scores[:] = self.scaled() @ self.weights
+        valid = np.flatnonzero(~np.isnan(self.scores))
+        # Stable sort keeps tied rows in key order, like nlargest
+        order = valid[np.argsort(-self.scores[valid], kind="stable")]
+        self._ranking = [(-self.scores[pos], pos) for pos in order]
+        self.full_rescores += 1
+
+    def _unrank(self, pos):
+        """Remove a row from the ranking if it is in it"""
+        score = self.scores[pos]
+        if np.isnan(score):
+            return
+        i = bisect.bisect_left(self._ranking, (-score, pos))
+        if i < len(self._ranking) and self._ranking[i] == (-score, pos):
+            del self._ranking[i]
+
+    def _range_moves(self, old, new):
+        """Whether replacing a row's old values by new ones moves any min/max"""
+        with np.errstate(invalid="ignore"):
+            if np.any(new < self.mins) or np.any(new > self.maxs):
+                return True
+            # A row sitting on a bound that changes may shrink the range
+            on_bound = (old == self.mins) | (old == self.maxs)
+            return bool(np.any(on_bound & (old != new)))
+
+    def upsert(self, key, values):
+        """
+        Update or insert one row from a {feature: value} mapping
+
+        Returns True when a min/max moved and every row was rescored, False
+        when only this row was rescored.
+        """
+        pos = self.positions.get(key)
+        if pos is None:
+            pos = self._append(key)
+            old = np.full(len(self.features), np.nan)
+        else:
+            old = self.raw[pos].copy()
+
+        new = old.copy()
+        for i, feature in enumerate(self.features):
+            if feature in values:
+                new[i] = values[feature]
+
+        if self._range_moves(old, new):
+            self.raw[pos] = new
+            previous = (self.mins.copy(), self.maxs.copy())
+            self._refresh_stats()
+            if not (
+                np.array_equal(previous[0], self.mins, equal_nan=True)
+                and np.array_equal(previous[1], self.maxs, equal_nan=True)
+            ):
+                self._rescore_all()
+                return True
+            self.raw[pos] = old
+
+        self._unrank(pos)
+        self.raw[pos] = new
+        score = float(self._scale(new) @ self.weights)
+        self.scores[pos] = score
+        if not np.isnan(score):
+            bisect.insort(self._ranking, (-score, pos))
+        self.row_rescores += 1
+        return False
+
+    def _append(self, key):
+        """Add an empty row, growing the buffers geometrically"""
+        pos = len(self.keys)
+        if pos == self._capacity:
+            self._capacity *= 2
+            raw = np.empty((self._capacity, len(self.features)))
+            raw[:pos] = self._raw[:pos]
+            scores = np.full(self._capacity, np.nan)
+            scores[:pos] = self._scores[:pos]
+            self._raw, self._scores = raw, scores
+        self.keys.append(key)
+        self.positions[key] = pos
+        self._raw[pos] = np.nan
+        self._scores[pos] = np.nan
+        return pos
+
+    def top(self, k):
+        """Return the k best (key, score) pairs in O(k)"""
+        return [(self.keys[pos], -neg) for neg, pos in self._ranking[:k]]
@@ -0,0 +1,490 @@
+"""
+External indicator APIs (World Bank, UN Comtrade, WTO)
+Requests for many countries and indicators run concurrently over one pooled
+HTTP session with bounded concurrency, retries and rate limiting; responses
+go through an on-disk cache with ETag/TTL revalidation and are normalized
+into one row per country
+
+    python src/indicator_api.py --world-bank NY.GDP.PCAP.CD --comtrade X:61
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import count, span
+
+# Statuses worth retrying: rate limited or a transient server failure
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+WORLD_BANK_URL = "https://api.worldbank.org/v2"
+COMTRADE_URL = "https://comtradeapi.un.org/public/v1"
+WTO_URL = "https://api.wto.org/timeseries/v1"
+
+
+class HttpCache:
+    """
+    On-disk cache of JSON API responses keyed by full URL
+
+    Each entry is a body file plus a small metadata file holding the ETag,
+    Last-Modified and fetch time. Entries younger than ttl seconds are used
+    as-is; older ones are revalidated with a conditional request.
+    """
+
+    def __init__(self, cache_dir=".exportmap_cache/http", ttl=24 * 3600):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+
+    def _paths(self, url):
+        digest = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = self.cache_dir / digest[:2] / digest
+        return base.with_suffix(".body"), base.with_suffix(".json")
+
+    def lookup(self, url):
+        """Return (meta, body) for a cached URL, or None"""
+        body_path, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+            return meta, body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, meta):
+        return time.time() - meta["fetched_at"] < self.ttl
+
+    def validators(self, meta):
+        """Conditional request headers for a cached entry"""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def _write(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def store(self, url, body, headers):
+        """Cache a 200 response (body first, so metadata never points at nothing)"""
+        self._write(self._paths(url)[0], body)
+        self.touch(url, headers)
+
+    def touch(self, url, headers, meta=None):
+        """Record a (re)validation at the current time"""
+        _, meta_path = self._paths(url)
+        meta = dict(meta or {}, url=url, fetched_at=time.time())
+        for key, header in (("etag", "ETag"), ("last_modified", "Last-Modified")):
+            if headers.get(header):
+                meta[key] = headers[header]
+        self._write(meta_path, json.dumps(meta).encode("utf-8"))
+
+
+class RateLimiter:
+    """Thread-safe token bucket: at most rate requests per second, bursts of burst"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _retry_after(response, default):
+    """Seconds to wait from a Retry-After header (seconds or HTTP date)"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return default
+
+
+class ApiClient:
+    """
+    Pooled, concurrent JSON client
+
+    One requests session whose connection pool matches max_workers, so every
+    worker thread reuses a keep-alive connection. get_json() serves fresh
+    cache entries without a request, revalidates stale ones, retries
+    RETRY_STATUSES and connection errors with exponential backoff (honouring
+    Retry-After), and falls back to a stale entry when every attempt fails.
+    """
+
+    def __init__(self, cache=None, max_workers=16, rate=None, retries=3, backoff=0.5,
+                 timeout=30, headers=None, session=None):
+        self.cache = cache
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(rate) if rate else None
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json", **(headers or {})})
+
+        self.stats = dict.fromkeys(("cached", "revalidated", "fetched", "retries", "stale"), 0)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def close(self):
+        self.session.close()
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+        count(f"http_{name}")
+
+    def get_json(self, url, params=None, headers=None):
+        """GET url and decode JSON, through the cache when one is configured"""
+        url = requests.Request("GET", url, params=params).prepare().url
+        cached = self.cache.lookup(url) if self.cache else None
+        if cached and self.cache.is_fresh(cached[0]):
+            self._count("cached")
+            return json.loads(cached[1])
+
+        request_headers = dict(headers or {})
+        if cached:
+            request_headers.update(self.cache.validators(cached[0]))
+
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._count("retries")
+            if self.limiter:
+                self.limiter.acquire()
+            delay = self.backoff * 2 ** attempt
+            try:
+                response = self.session.get(url, headers=request_headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                if attempt < self.retries:
+                    time.sleep(delay)
+                continue
+
+            if response.status_code == 304 and cached:
+                self.cache.touch(url, response.headers, cached[0])
+                self._count("revalidated")
+                return json.loads(cached[1])
+            if response.status_code in RETRY_STATUSES:
+                error = requests.HTTPError(f"{response.status_code} for {url}", response=response)
+                if attempt < self.retries:
+                    time.sleep(_retry_after(response, delay))
+                continue
+            response.raise_for_status()
+
+            if self.cache:
+                self.cache.store(url, response.content, response.headers)
+            self._count("fetched")
+            return response.json()
+
+        if cached:
+            print(f"Warning: {url} failed ({error}); using the cached response")
+            self._count("stale")
+            return json.loads(cached[1])
+        raise error
+
+    def map(self, fn, items):
+        """Apply fn to every item on max_workers threads; results in input order"""
+        items = list(items)
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            return list(pool.map(fn, items))
+
+
+@dataclass
+class ApiRequest:
+    """One GET for a source; context travels back to its normalize()"""
+
+    url: str
+    params: dict
+    context: dict = field(default_factory=dict)
+    headers: dict = None
+
+
+def _labels(indicators):
+    """Indicator ids (list) or {id: column label} -> {id: label}"""
+    if isinstance(indicators, dict):
+        return dict(indicators)
+    return {i: i for i in indicators}
+
+
+class WorldBankSource:
+    """
+    World Bank indicators API (v2)
+
+    One request per indicator and block of countries_per_request ISO3 codes
+    (the API takes ";"-separated lists); further pages are followed.
+    """
+
+    name = "world_bank"
+
+    def __init__(self, indicators, base_url=WORLD_BANK_URL, years=None,
+                 countries_per_request=60, per_page=20_000):
+        self.labels = _labels(indicators)
+        self.base_url = base_url.rstrip("/")
+        self.years = years
+        self.countries_per_request = countries_per_request
+        self.per_page = per_page
+
+    def requests(self, countries):
+        params = {"format": "json", "per_page": self.per_page}
+        if self.years:
+            params["date"] = f"{self.years[0]}:{self.years[1]}"
+        countries = list(countries)
+        step = self.countries_per_request
+        for indicator in self.labels:
+            for start in range(0, len(countries), step):
+                codes = ";".join(countries[start:start + step])
+                yield ApiRequest(
+                    f"{self.base_url}/country/{codes}/indicator/{indicator}",
+                    dict(params, page=1),
+                    {"indicator": indicator},
+                )
+
+    def follow_up(self, request, payload):
+        """Requests for the remaining pages after page 1"""
+        if request.params.get("page") != 1 or not isinstance(payload, list) or not payload:
+            return []
+        pages = int(payload[0].get("pages") or 1)
+        return [
+            ApiRequest(request.url, dict(request.params, page=page), request.context)
+            for page in range(2, pages + 1)
+        ]
+
+    def normalize(self, request, payload):
+        if not isinstance(payload, list) or len(payload) < 2 or payload[1] is None:
+            if isinstance(payload, list) and payload and "message" in payload[0]:
+                raise ValueError(f"World Bank error for {request.url}: {payload[0]['message']}")
+            return []
+        return [
+            (row.get("countryiso3code") or row["country"]["id"],
+             self.labels[request.context["indicator"]], row.get("date"), row.get("value"))
+            for row in payload[1]
+        ]
+
+
+class ComtradeSource:
+    """
+    UN Comtrade public API (v1 preview)
+
+    indicators are "FLOW:CMD" pairs (e.g. "X:TOTAL", "M:61"); one request
+    per pair and year covers every reporter. Values are primaryValue (USD).
+    """
+
+    name = "comtrade"
+
+    def __init__(self, indicators, base_url=COMTRADE_URL, years=None, api_key=None):
+        self.labels = _labels(indicators)
+        self.base_url = base_url.rstrip("/")
+        self.years = years or (time.gmtime().tm_year - 2,) * 2
+        self.headers = {"Ocp-Apim-Subscription-Key": api_key} if api_key else None
+
+    def requests(self, countries):
+        for indicator in self.labels:
+            flow, _, cmd = indicator.partition(":")
+            for year in range(self.years[0], self.years[1] + 1):
+                yield ApiRequest(
+                    f"{self.base_url}/preview/C/A/HS",
+                    {"period": year, "flowCode": flow, "cmdCode": cmd or "TOTAL", "partnerCode": 0},
+                    {"indicator": indicator},
+                    self.headers,
+                )
+
+    def follow_up(self, request, payload):
+        return []
+
+    def normalize(self, request, payload):
+        label = self.labels[request.context["indicator"]]
+        return [
+            (row.get("reporterISO") or row.get("reporterDesc"), label,
+             row.get("period") or row.get("refYear"), row.get("primaryValue"))
+            for row in (payload or {}).get("data") or []
+        ]
+
+
+class WtoSource:
+    """
+    WTO Timeseries API (v1)
+
+    One request per indicator for all reporting economies. Economies are
+    reported by name; they resolve to CCA3 through the country matcher when
+    the frame is joined.
+    """
+
+    name = "wto"
+
+    def __init__(self, indicators, base_url=WTO_URL, years=None, api_key=None):
+        self.labels = _labels(indicators)
+        self.base_url = base_url.rstrip("/")
+        self.years = years
+        self.headers = {"Ocp-Apim-Subscription-Key": api_key} if api_key else None
+
+    def requests(self, countries):
+        params = {"r": "all", "fmt": "json", "mode": "full", "lang": 1, "max": 1_000_000}
+        if self.years:
+            params["ps"] = f"{self.years[0]}-{self.years[1]}"
+        for indicator in self.labels:
+            yield ApiRequest(f"{self.base_url}/data", dict(params, i=indicator),
+                             {"indicator": indicator}, self.headers)
+
+    def follow_up(self, request, payload):
+        return []
+
+    def normalize(self, request, payload):
+        label = self.labels[request.context["indicator"]]
+        return [
+            (row.get("ReportingEconomy"), label, row.get("Year"), row.get("Value"))
+            for row in (payload or {}).get("Dataset") or []
+        ]
+
+
+def country_frame(rows, labels, country_col="Country", year=None):
+    """
+    Normalize (country, indicator, year, value) rows into one row per
+    country: the latest non-null value of each indicator (or the value for
+    year), plus a "<indicator> (year)" column recording which year it is
+    """
+    long = pd.DataFrame(rows, columns=[country_col, "indicator", "year", "value"])
+    long["year"] = pd.to_numeric(long["year"], errors="coerce")
+    long["value"] = pd.to_numeric(long["value"], errors="coerce")
+    long = long.dropna(subset=[country_col, "year", "value"])
+    if year is not None:
+        long = long[long["year"] == year]
+
+    latest = long.sort_values("year").drop_duplicates([country_col, "indicator"], keep="last")
+    values = latest.pivot(index=country_col, columns="indicator", values="value")
+    years = latest.pivot(index=country_col, columns="indicator", values="year")
+
+    columns = {}
+    for label in labels:
+        columns[label] = values[label] if label in values else pd.Series(dtype="float64")
+        columns[f"{label} (year)"] = (
+            years[label] if label in years else pd.Series(dtype="float64")
+        ).astype("Int64")
+    frame = pd.DataFrame(columns, index=values.index)
+    frame.index.name = country_col
+    return frame.reset_index()
+
+
+def fetch_sources(client, sources, countries, country_col="Country", year=None):
+    """
+    Fetch every source's requests concurrently over one client
+
+    All sources share the client's worker pool, so a slow source does not
+    hold up the others. Returns {source name: per-country frame}.
+    """
+    def fetch(job):
+        request = job[1]
+        return client.get_json(request.url, request.params, request.headers)
+
+    rows = {source.name: [] for source in sources}
+    pending = [(source, request) for source in sources for request in source.requests(countries)]
+    with span("fetch", sources=len(sources), requests=len(pending)):
+        while pending:
+            payloads = client.map(fetch, pending)
+            follow_ups = []
+            for (source, request), payload in zip(pending, payloads):
+                rows[source.name].extend(source.normalize(request, payload))
+                follow_ups.extend((source, r) for r in source.follow_up(request, payload))
+            pending = follow_ups
+
+    frames = {}
+    for source in sources:
+        frames[source.name] = country_frame(rows[source.name], source.labels.values(), country_col, year)
+        print(f"✓ Fetched {source.name}: {len(source.labels)} indicators, "
+              f"{len(frames[source.name])} countries")
+    return frames
+
+
+def main(argv=None):
+    from data_loader import DataLoader
+
+    parser = argparse.ArgumentParser(description="Fetch external indicators per country")
+    parser.add_argument("--data-dir", default="./")
+    parser.add_argument("--output-dir", default="indicators", help="One CSV per source")
+    parser.add_argument("--world-bank", action="append", default=[], metavar="INDICATOR")
+    parser.add_argument("--comtrade", action="append", default=[], metavar="FLOW:CMD")
+    parser.add_argument("--wto", action="append", default=[], metavar="INDICATOR")
+    parser.add_argument("--year", type=int, help="Exact year instead of the latest available")
+    parser.add_argument("--workers", type=int, default=16, help="Concurrent requests")
+    parser.add_argument("--rate", type=float, help="Max requests per second")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--ttl", type=float, default=24 * 3600, help="Cache freshness (seconds)")
+    parser.add_argument("--cache-dir", default=".exportmap_cache/http")
+    parser.add_argument("--world-bank-url", default=WORLD_BANK_URL)
+    parser.add_argument("--comtrade-url", default=COMTRADE_URL)
+    parser.add_argument("--wto-url", default=WTO_URL)
+    args = parser.parse_args(argv)
+
+    years = (args.year, args.year) if args.year else None
+    sources = []
+    if args.world_bank:
+        sources.append(WorldBankSource(args.world_bank, args.world_bank_url, years))
+    if args.comtrade:
+        sources.append(ComtradeSource(args.comtrade, args.comtrade_url, years,
+                                      os.environ.get("COMTRADE_API_KEY")))
+    if args.wto:
+        sources.append(WtoSource(args.wto, args.wto_url, years, os.environ.get("WTO_API_KEY")))
+    if not sources:
+        parser.error("Give at least one --world-bank, --comtrade or --wto indicator")
+
+    loader = DataLoader(args.data_dir)
+    client = ApiClient(HttpCache(args.cache_dir, args.ttl), max_workers=args.workers,
+                       rate=args.rate, retries=args.retries)
+    start = time.perf_counter()
+    with client:
+        frames = loader.fetch_indicators(sources, client=client, year=args.year)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for name, frame in frames.items():
+        frame.to_csv(output_dir / f"{name}.csv", index=False)
+    stats = ", ".join(f"{k} {v}" for k, v in client.stats.items())
+    print(f"✓ Saved {len(frames)} sources to {output_dir} in "
+          f"{time.perf_counter() - start:.2f}s ({stats})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""
+Per-stage timing and memory instrumentation
+Nested timing spans, counters, optional tracemalloc peaks and cProfile
+dumps. Disabled by default, where span() hands back a shared no-op context
+manager and count() returns immediately
+"""
+
+import cProfile
+import functools
+import json
+import logging
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+logger = logging.getLogger("exportmap.instrumentation")
+
+
+class _NullSpan:
+    """Shared no-op span used while instrumentation is disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def count(self, name, n=1):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """One timed region; counters and attributes end up in its record"""
+
+    __slots__ = (
+        "recorder", "name", "path", "depth", "attrs", "counters",
+        "start", "mem_start", "peak", "profiler",
+    )
+
+    def __init__(self, recorder, name, attrs):
+        self.recorder = recorder
+        self.name = name
+        self.attrs = attrs
+        self.counters = {}
+        self.profiler = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+        self.recorder._total(name, n)
+
+    def __enter__(self):
+        self.recorder._push(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recorder._pop(self, exc_type)
+        return False
+
+
+class Recorder:
+    """
+    Collects span records and counters
+
+    Spans nest per thread. With memory=True tracemalloc runs for the whole
+    session and each record carries the peak allocated above the level at
+    span start, children included. With profile_dir set, spans named in
+    profile_stages (every top-level span when None) are run under cProfile
+    and dumped to <profile_dir>/<path>.prof.
+    """
+
+    def __init__(self, memory=False, profile_dir=None, profile_stages=None, log=False):
+        self.memory = memory
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.profile_stages = set(profile_stages) if profile_stages else None
+        self.log = log
+        self.records = []
+        self.counters = {}
+        self.profiles = 0
+        self.started = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def close(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _total(self, name, n):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def _should_profile(self, span):
+        if self.profile_dir is None:
+            return False
+        if self.profile_stages is None:
+            return span.depth == 0
+        return span.name in self.profile_stages
+
+    def _push(self, span):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        span.depth = len(stack)
+        span.path = f"{parent.path}/{span.name}" if parent else span.name
+
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+            span.mem_start = current
+            span.peak = current
+
+        if self._should_profile(span) and not any(s.profiler for s in stack):
+            span.profiler = cProfile.Profile()
+            span.profiler.enable()
+
+        stack.append(span)
+        span.start = time.perf_counter()
+
+    def _pop(self, span, exc_type):
+        duration = time.perf_counter() - span.start
+        stack = self._stack()
+        stack.pop()
+
+        if span.profiler is not None:
+            span.profiler.disable()
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            self.profiles += 1
+            filename = f"{self.profiles:02d}_" + re.sub(r"[^\w.-]+", "_", span.path) + ".prof"
+            span.profiler.dump_stats(self.profile_dir / filename)
+            span.profiler = None
+
+        record = {
+            "name": span.name,
+            "path": span.path,
+            "depth": span.depth,
+            "start": span.start - self.started,
+            "seconds": duration,
+            "thread": threading.current_thread().name,
+        }
+        if self.memory:
+            peak = max(span.peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            record["peak_mb"] = (peak - span.mem_start) / 2**20
+        if span.attrs:
+            record["attrs"] = span.attrs
+        if span.counters:
+            record["counters"] = span.counters
+        if exc_type is not None:
+            record["error"] = exc_type.__name__
+
+        with self._lock:
+            self.records.append(record)
+        if self.log:
+            logger.info(json.dumps(record, default=str))
+
+    def report(self):
+        """Records (in completion order) and counter totals"""
+        return {"spans": list(self.records), "counters": dict(self.counters)}
+
+    def write_json(self, path):
+        """Write the report as one JSON document"""
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2, default=str)
+
+    def summary(self):
+        """Human-readable span tree in start order"""
+        lines = []
+        for record in sorted(self.records, key=lambda r: r["start"]):
+            memory = f" {record['peak_mb']:>8.1f} MB" if "peak_mb" in record else ""
+            counters = ", ".join(f"{k}={v}" for k, v in record.get("counters", {}).items())
+            attrs = ", ".join(str(v) for v in record.get("attrs", {}).values())
+            label = f"{record['name']} ({attrs})" if attrs else record["name"]
+            lines.append(
+                f"{'  ' * record['depth']}{label:<{36 - 2 * record['depth']}}"
+                f"{record['seconds'] * 1000:>10.1f} ms{memory}"
+                + (f"  [{counters}]" if counters else "")
+            )
+        return "\n".join(lines)
+
+
+_recorder = None
+
+
+def enable(memory=False, profile_dir=None, profile_stages=None, log=False):
+    """Start recording spans; returns the Recorder"""
+    global _recorder
+    disable()
+    _recorder = Recorder(memory, profile_dir, profile_stages, log)
+    return _recorder
+
+
+def disable():
+    """Stop recording and return the previous Recorder (or None)"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    if recorder is not None:
+        recorder.close()
+    return recorder
+
+
+def recorder():
+    """Return the active Recorder, or None when disabled"""
+    return _recorder
+
+
+def span(name, **attrs):
+    """Time a region: `with span("merge", rows=n) as s: ... s.count("x")`"""
+    if _recorder is None:
+        return NULL_SPAN
+    return Span(_recorder, name, attrs)
+
+
+def annotate(**attrs):
+    """Set attributes on the innermost open span"""
+    if _recorder is None:
+        return
+    stack = _recorder._stack()
+    if stack:
+        stack[-1].set(**attrs)
+
+
+def count(name, n=1):
+    """Add to a counter on the innermost span and the session totals"""
+    if _recorder is None:
+        return
+    stack = _recorder._stack()
+    if stack:
+        stack[-1].count(name, n)
+    else:
+        _recorder._total(name, n)
+
+
+def instrumented(name):
+    """Decorator form of span() for whole functions"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _recorder is None:
+                return fn(*args, **kwargs)
+            with Span(_recorder, name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,310 @@
+"""
+Key-based join engine
+Resolves every source to the reference key (CCA3) once, running the fuzzy
+matcher only for names no stored resolution covers, then joins any number
+of sources through a hash index on the key in a single pass
+
+    python src/join_engine.py --output combined_exportmap_dataset.csv
+    python src/join_engine.py --output combined.csv --key-map country_keys.csv \
+        --source tariffs.csv:country --source logistics.csv:iso3:key
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from country_matcher import COMMON_ALIASES, CountryMatcher
+
+JOIN_KINDS = ("name", "key")
+JOIN_HOWS = ("left", "inner")
+
+
+class KeyMap:
+    """
+    Stored name -> key resolutions
+
+    Unmatched names are kept too (with a missing key), so no name is ever
+    fuzzy-matched twice. Saved as a small CSV that can be reviewed and
+    corrected by hand.
+    """
+
+    COLUMNS = ["name", "key", "match", "score", "method"]
+
+    def __init__(self, table=None):
+        table = pd.DataFrame(columns=self.COLUMNS) if table is None else table[self.COLUMNS]
+        self._set(table)
+
+    def _set(self, table):
+        table = table.astype({"score": "float64"})
+        self.table = table.drop_duplicates("name", keep="last").reset_index(drop=True)
+        self._index = pd.Index(self.table["name"])
+
+    def __len__(self):
+        return len(self.table)
+
+    def missing(self, names):
+        """Names (unique, in order) with no stored resolution"""
+        names = pd.unique(pd.Series(names).dropna().astype(str))
+        return names[self._index.get_indexer(names) < 0]
+
+    def update(self, resolved):
+        """Add or replace resolutions from a frame with COLUMNS"""
+        parts = [t for t in (self.table, resolved[self.COLUMNS]) if len(t)]
+        self._set(pd.concat(parts, ignore_index=True) if parts else resolved[self.COLUMNS])
+
+    def lookup(self, names):
+        """Resolution rows for every name, in input order (missing as NaN)"""
+        names = pd.Series(names).reset_index(drop=True)
+        positions = self._index.get_indexer(names.astype(object).where(names.notna(), None))
+        rows = self.table.reindex(positions).reset_index(drop=True)
+        rows["name"] = names
+        return rows
+
+    def digest(self):
+        """Content hash, for cache keys that depend on stored resolutions"""
+        text = self.table.sort_values("name").to_csv(index=False)
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def load(cls, path):
+        """Read a saved key map; a missing file gives an empty map"""
+        path = Path(path)
+        if not path.exists():
+            return cls()
+        text = {col: "object" for col in cls.COLUMNS if col != "score"}
+        return cls(pd.read_csv(path, dtype=text, float_precision="round_trip"))
+
+    def save(self, path):
+        """Write the key map atomically"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        self.table.to_csv(tmp, index=False)
+        os.replace(tmp, path)
+
+
+@dataclass
+class JoinSource:
+    """
+    One frame to join onto the reference
+
+    on names the column identifying each row's country: by="name" resolves
+    it through the matcher, by="key" means it already holds reference keys
+    (and is then dropped from the output). unique keeps the first row per
+    key, for sources that should contribute at most one row per country.
+    """
+
+    name: str
+    frame: pd.DataFrame
+    on: str
+    by: str = "name"
+    how: str = "left"
+    unique: bool = False
+    columns: list = None
+    keys: np.ndarray = field(default=None, init=False, repr=False)
+    resolution: pd.DataFrame = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        if self.by not in JOIN_KINDS:
+            raise ValueError(f"by must be one of {JOIN_KINDS}, got {self.by!r}")
+        if self.how not in JOIN_HOWS:
+            raise ValueError(f"how must be one of {JOIN_HOWS}, got {self.how!r}")
+        if self.on not in self.frame.columns:
+            raise ValueError(f"Source {self.name!r} has no column {self.on!r}")
+
+    def output_columns(self):
+        if self.columns is not None:
+            return list(self.columns)
+        return [c for c in self.frame.columns if not (self.by == "key" and c == self.on)]
+
+
+def _probe(left_keys, right_keys, how, unique):
+    """
+    Hash-join positions: for each left row, the right rows sharing its key
+
+    Returns (left, right) position arrays in left order, right order within a
+    key; unmatched left rows get right = -1 under how="left".
+    """
+    codes, uniques = pd.factorize(pd.Series(right_keys, dtype=object), use_na_sentinel=True)
+    valid = codes >= 0
+    if unique:
+        valid &= ~pd.Series(codes).duplicated().to_numpy()
+
+    positions = np.flatnonzero(valid)
+    positions = positions[np.argsort(codes[positions], kind="stable")]
+    counts = np.bincount(codes[valid], minlength=len(uniques))
+    starts = np.cumsum(counts) - counts
+
+    bucket = pd.Index(uniques).get_indexer(pd.Series(left_keys, dtype=object))
+    matched = np.where(bucket >= 0, counts[bucket], 0)
+    per_row = np.maximum(matched, 1) if how == "left" else matched
+
+    left = np.repeat(np.arange(len(bucket)), per_row)
+    offset = np.arange(len(left)) - np.repeat(np.cumsum(per_row) - per_row, per_row)
+    hit = np.repeat(matched, per_row) > 0
+    right = np.full(len(left), -1, dtype=np.int64)
+    right[hit] = positions[np.repeat(starts[np.maximum(bucket, 0)], per_row)[hit] + offset[hit]]
+    return left, right
+
+
+class JoinEngine:
+    """
+    Join sources onto a reference frame by its key column
+
+    Name resolution goes stored key map -> CountryMatcher (exact,
+    normalized, alias and reference codes, then fuzzy for the rest), and new
+    resolutions are added to the key map. The join itself is a hash probe
+    per source over row positions; columns are gathered once at the end.
+    """
+
+    def __init__(self, reference, key="CCA3", name="Country/Territory", key_map=None,
+                 aliases=None, threshold=80, workers=1):
+        if key not in reference.columns or name not in reference.columns:
+            raise ValueError(f"Reference needs {key!r} and {name!r} columns")
+        self.reference = reference
+        self.key = key
+        self.name = name
+        self.key_map = key_map if key_map is not None else KeyMap()
+        self.aliases = aliases
+        self.threshold = threshold
+        self.workers = workers
+        self._matcher = None
+        # Reference name -> key, first occurrence wins like the matcher
+        names = reference[name].astype(str).str.strip()
+        firsts = ~names.duplicated()
+        self._key_of = pd.Series(reference[key].to_numpy()[firsts.to_numpy()], index=names[firsts])
+
+    def matcher(self):
+        if self._matcher is None:
+            self._matcher = CountryMatcher(
+                self.reference[self.name],
+                codes=self.reference[self.key],
+                aliases=self.aliases,
+                threshold=self.threshold,
+                workers=self.workers,
+            )
+        return self._matcher
+
+    def resolve(self, names):
+        """
+        Resolve names to reference keys; returns a frame with one row per
+        name: name, key, match, score, method
+        """
+        missing = self.key_map.missing(names)
+        if len(missing):
+            resolved = self.matcher().match_table(missing)
+            resolved["key"] = self._key_of.reindex(resolved["match"].astype(object)).to_numpy()
+            self.key_map.update(resolved)
+        return self.key_map.lookup(names)
+
+    def resolve_source(self, source):
+        """Attach reference keys (and the resolution table) to a source"""
+        if source.keys is None:
+            if source.by == "key":
+                source.keys = source.frame[source.on].to_numpy(dtype=object)
+            else:
+                source.resolution = self.resolve(source.frame[source.on])
+                source.keys = source.resolution["key"].to_numpy(dtype=object)
+        return source.resolution
+
+    def join(self, sources, frame=None):
+        """
+        Join every source onto the reference (or onto frame, which must hold
+        the key column) and return the combined frame
+
+        Row positions are joined source by source; each column is then
+        gathered exactly once. Colliding column names get a "_<source>"
+        suffix.
+        """
+        base = self.reference if frame is None else frame
+        base_keys = base[self.key].to_numpy(dtype=object)
+        left = np.arange(len(base))
+        rights = []
+        for source in sources:
+            self.resolve_source(source)
+            rows, right = _probe(base_keys[left], source.keys, source.how, source.unique)
+            left = left[rows]
+            rights = [r[rows] for r in rights] + [right]
+
+        parts = [base.take(left).reset_index(drop=True)]
+        seen = set(base.columns)
+        for source, right in zip(sources, rights):
+            columns = source.output_columns()
+            part = source.frame[columns].reset_index(drop=True).reindex(right)
+            part = part.reset_index(drop=True)
+            part.columns = [f"{c}_{source.name}" if c in seen else c for c in columns]
+            seen.update(part.columns)
+            parts.append(part)
+        joined = pd.concat(parts, axis=1)
+        # Keep the base frame's metadata (e.g. compact_data's float32 columns)
+        joined.attrs = dict(base.attrs)
+        return joined
+
+
+def build_combined(loader, sources=(), key_map=None):
+    """
+    Build the combined dataset (population + countries + extra sources)
+
+    Rebuilds combined_exportmap_dataset.csv: the countries table joins on
+    resolved names like the analyzer merge, with COMMON_ALIASES applied so
+    abbreviated names ("British Virgin Is.") reach the right country. Names
+    are stripped only for matching; the output keeps the source padding.
+    """
+    data = loader.load_all_datasets()
+    pop, countries = data["population"], data["countries"]
+    pop["Country/Territory"] = pop["Country/Territory"].str.strip()
+
+    engine = JoinEngine(pop, key_map=key_map, aliases=COMMON_ALIASES)
+    base = JoinSource("countries", countries, "Country", how="inner")
+    base.resolution = engine.resolve(countries["Country"].str.strip())
+    base.keys = base.resolution["key"].to_numpy(dtype=object)
+    return engine.join([base, *sources]), engine
+
+
+def _parse_source(spec, data_dir):
+    """PATH:COLUMN[:name|key] -> JoinSource (one row per key)"""
+    parts = spec.rsplit(":", 2)
+    if len(parts) < 2:
+        raise ValueError(f"Expected PATH:COLUMN[:name|key], got {spec!r}")
+    path, column, *kind = parts
+    path = Path(path) if Path(path).is_absolute() else Path(data_dir) / path
+    frame = pd.read_csv(path)
+    return JoinSource(Path(path).stem, frame, column, by=kind[0] if kind else "name", unique=True)
+
+
+def main(argv=None):
+    from data_loader import DataLoader
+
+    parser = argparse.ArgumentParser(description="Build the combined ExportMap dataset")
+    parser.add_argument("--data-dir", default="./")
+    parser.add_argument(
+        "--output", required=True,
+        help="CSV to write (the tracked combined_exportmap_dataset.csv is only overwritten when named)",
+    )
+    parser.add_argument("--key-map", help="CSV of stored name -> CCA3 resolutions")
+    parser.add_argument(
+        "--source", action="append", default=[],
+        help="Extra source as PATH:COLUMN[:name|key], joined one row per country",
+    )
+    args = parser.parse_args(argv)
+
+    key_map = KeyMap.load(args.key_map) if args.key_map else None
+    sources = [_parse_source(spec, args.data_dir) for spec in args.source]
+    combined, engine = build_combined(DataLoader(args.data_dir), sources, key_map)
+    combined.to_csv(args.output, index=False)
+    print(f"✓ Saved combined dataset: {args.output} ({len(combined)} rows)")
+
+    if args.key_map:
+        engine.key_map.save(args.key_map)
+        print(f"✓ Saved key map: {args.key_map} ({len(engine.key_map)} names)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
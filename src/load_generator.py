@@ -0,0 +1,149 @@
+"""
+Local load generator for the recommendation server
+Keeps one HTTP/1.1 keep-alive connection per concurrent client and reports
+latency percentiles and throughput (standard library only)
+
+    python src/load_generator.py --port 8000 --concurrency 16 --requests 5000
+    python src/load_generator.py --port 8000 --mix miss-heavy
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import numpy as np
+
+# Mix of (weight, method, path, JSON body) sent by every client; path and
+# body may also be callables taking the client's random.Random
+DEFAULT_MIX = [
+    (6, "GET", "/recommendations?top_n=15", None),
+    (2, "GET", "/recommendations?category=luxury&top_n=10", None),
+    (2, "GET", "/markets?region=western%20europe&limit=5", None),
+    (1, "POST", "/predict", {"features": {
+        "Literacy (%)": 95.0,
+        "Phones (per 1000)": 450.0,
+        "Birthrate": 11.0,
+        "Infant mortality (per 1000 births)": 5.0,
+    }}),
+]
+
+
+def _random_features(rng):
+    return {
+        "Literacy (%)": round(rng.uniform(40, 100), 1),
+        "Phones (per 1000)": round(rng.uniform(10, 900), 1),
+        "Birthrate": round(rng.uniform(8, 45), 2),
+        "Infant mortality (per 1000 births)": round(rng.uniform(2, 120), 2),
+    }
+
+
+# Mostly unique queries, so nearly every request misses the response cache
+# and is scored in the handler pool
+MISS_HEAVY_MIX = [
+    (3, "GET", lambda rng: f"/recommendations?top_n={rng.randint(1, 200)}", None),
+    (2, "GET", lambda rng: f"/markets?min_gdp={rng.randint(0, 40_000)}&limit=10", None),
+    (3, "POST", "/predict", lambda rng: {"features": _random_features(rng)}),
+    (1, "POST", "/predict/batch", lambda rng: {"rows": [_random_features(rng) for _ in range(32)]}),
+]
+
+MIXES = {"default": DEFAULT_MIX, "miss-heavy": MISS_HEAVY_MIX}
+
+
+async def _request(reader, writer, host, method, path, body):
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n".encode("ascii")
+        + payload
+    )
+    await writer.drain()
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def _client(host, port, mix, count, latencies, errors, seed):
+    rng = random.Random(seed)
+    weights = [w for w, *_ in mix]
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            _, method, path, body = rng.choices(mix, weights)[0]
+            path = path(rng) if callable(path) else path
+            body = body(rng) if callable(body) else body
+            start = time.perf_counter()
+            status = await _request(reader, writer, host, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(host="127.0.0.1", port=8000, concurrency=16, requests=2000, mix=None, seed=0):
+    """
+    Send requests from concurrency clients and return a summary dict with
+    throughput and p50/p90/p99/max latency in milliseconds
+    """
+    mix = mix or DEFAULT_MIX
+    latencies, errors = [], []
+    per_client = [requests // concurrency + (i < requests % concurrency) for i in range(concurrency)]
+
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, mix, count, latencies, errors, seed + i)
+        for i, count in enumerate(per_client)
+        if count
+    ))
+    elapsed = time.perf_counter() - start
+
+    ms = np.asarray(latencies) * 1000
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the ExportMap server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="default",
+                        help="Request mix (miss-heavy bypasses the response cache)")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    summary = asyncio.run(run_load(args.host, args.port, args.concurrency, args.requests,
+                                  MIXES[args.mix]))
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"✓ {summary['requests']} requests in {summary['seconds']:.2f}s "
+          f"({summary['throughput']:.0f} req/s, {summary['concurrency']} clients)")
+    print(f"  p50 {summary['p50_ms']:.2f} ms   p90 {summary['p90_ms']:.2f} ms   "
+          f"p99 {summary['p99_ms']:.2f} ms   max {summary['max_ms']:.2f} ms")
+    if summary["errors"]:
+        print(f"✗ {summary['errors']} non-200 responses")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,225 @@
 """
 ExportMap: Smart Market Finder
 Main application entry point
+
+Heavy dependencies are imported inside the subcommand that needs them, so
+`recommend` never loads scikit-learn's model/metric stack or a plotting library
 """
 
-from data_loader import DataLoader
-from market_analyzer import MarketAnalyzer
-from predictive_models import GDPPredictor, MarketClassifier
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
 
+# Modules the recommend path must not import, and its import-time budget
+RECOMMEND_FORBIDDEN_MODULES = ["sklearn.linear_model", "sklearn.metrics", "matplotlib", "seaborn"]
+RECOMMEND_IMPORT_BUDGET = 1.5
 
-def main():
-    print("=== ExportMap: Smart Market Finder ===\n")
 
-    # Load data
-    loader = DataLoader()
-    data = loader.load_all_datasets()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="ExportMap: Smart Market Finder")
+    parser.add_argument(
+        "--cache-dir", default=".exportmap_cache", help="Merged dataset cache directory"
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Always load and merge from the CSVs"
+    )
+    parser.add_argument(
+        "--rebuild-cache", action="store_true", help="Rebuild the cached merge"
+    )
+    parser.add_argument(
+        "--model-dir", default="models", help="Directory for saved models"
+    )
+    parser.add_argument(
+        "--retrain", action="store_true", help="Retrain models even if data is unchanged"
+    )
+    parser.add_argument("--dpi", type=int, default=None, help="Chart resolution")
+    parser.add_argument(
+        "--format", dest="chart_format", default=None, help="Chart format (png, svg, pdf)"
+    )
+    parser.add_argument(
+        "--render-workers", type=int, default=None, help="Processes used to render charts"
+    )
+    parser.add_argument("--trace", help="Write per-stage timing spans to this JSON file")
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="Record peak memory per stage (tracemalloc)"
+    )
+    parser.add_argument(
+        "--trace-log", action="store_true", help="Emit each span as a JSON log record"
+    )
+    parser.add_argument("--profile-dir", help="Dump a cProfile file per stage here")
+    parser.add_argument(
+        "--key-map", help="CSV of stored country name -> CCA3 resolutions (created if missing)"
+    )
+    parser.add_argument(
+        "--compact", action="store_true",
+        help="Hold merged data and recommendations in compact form and report the savings",
+    )
+
+    commands = parser.add_subparsers(dest="command")
+
+    recommend = commands.add_parser("recommend", help="Show the top markets")
+    recommend.add_argument("--category", default="children_clothing", help="Product category")
+    recommend.add_argument("--top-n", type=int, default=15, help="Number of markets")
+    recommend.add_argument(
+        "--horizon", type=int, help="Score market size on the population projected to this year"
+    )
+    recommend.add_argument(
+        "--forecast-method", default="loglinear",
+        choices=["cagr", "loglinear", "piecewise", "growth_rate"],
+        help="Growth model for --horizon",
+    )
+    recommend.add_argument(
+        "--stability", type=int, default=0, metavar="SAMPLES",
+        help="Report rank stability over this many feature perturbations",
+    )
+    recommend.add_argument(
+        "--noise", type=float, default=0.1, help="Relative measurement error for --stability"
+    )
+
+    similar = commands.add_parser("similar", help="Find markets similar to given countries")
+    similar.add_argument("countries", nargs="+", help="Country names or CCA3 codes")
+    similar.add_argument("--k", type=int, default=10, help="Neighbours per country")
+    similar.add_argument(
+        "--radius", type=float, help="Return every market within this distance instead"
+    )
+    similar.add_argument(
+        "--algorithm", default="auto", choices=["auto", "brute", "kd_tree", "ball_tree"]
+    )
+
+    commands.add_parser("train", help="Train (or load) the predictive models")
+
+    online = commands.add_parser(
+        "train-online", help="Train the market classifier incrementally in mini-batches"
+    )
+    online.add_argument(
+        "--stream", help="CSV of market observations (model features and MOS); default merged data"
+    )
+    online.add_argument("--batch-size", type=int, default=10_000, help="Rows per mini-batch")
+    online.add_argument("--holdout-size", type=int, default=2000, help="Rolling holdout rows")
+    online.add_argument(
+        "--checkpoint", help="Checkpoint path (default <model-dir>/market_classifier_online.ckpt)"
+    )
+    online.add_argument(
+        "--checkpoint-every", type=int, default=10, help="Batches between checkpoints"
+    )
+    online.add_argument("--fresh", action="store_true", help="Ignore an existing checkpoint")
+
+    evaluate = commands.add_parser("evaluate", help="Cross-validate the model grids")
+    evaluate.add_argument("--splits", type=int, default=5, help="Folds per repeat")
+    evaluate.add_argument("--repeats", type=int, default=10, help="CV repeats")
+    evaluate.add_argument(
+        "--jobs", type=int, default=None,
+        help="Worker processes (-1 for every core; default: serial for small grids)",
+    )
+
+    bulk = commands.add_parser("bulk", help="Score many client profiles in one job")
+    bulk.add_argument("profiles", help="Client profiles as JSONL or CSV")
+    bulk.add_argument(
+        "--output", default="bulk_results.jsonl", help="Results file (.jsonl or .csv)"
+    )
+    bulk.add_argument("--jobs", type=int, default=None, help="Worker processes")
+    bulk.add_argument("--shard-size", type=int, default=256, help="Profiles per shard")
+    bulk.add_argument(
+        "--fresh", action="store_true", help="Ignore the checkpoint and rewrite the output"
+    )
+
+    plot = commands.add_parser("plot", help="Render market and model charts")
+    plot.add_argument("--top-n", type=int, default=10, help="Markets in the bar chart")
+
+    serve = commands.add_parser("serve", help="Run the HTTP recommendation server")
+    serve.add_argument("--host", default="127.0.0.1", help="Interface to bind")
+    serve.add_argument("--port", type=int, default=8000, help="Port to listen on")
+    serve.add_argument("--cache-size", type=int, default=1024, help="Cached responses")
+    serve.add_argument("--workers", type=int, default=4, help="Executor threads")
+
+    bench = commands.add_parser(
+        "bench", help="Check the import budget and benchmark the pipeline stages"
+    )
+    bench.add_argument(
+        "--imports-only", action="store_true", help="Only run the import budget check"
+    )
+    bench.add_argument(
+        "--budget",
+        type=float,
+        default=RECOMMEND_IMPORT_BUDGET,
+        help="Import-time budget for the recommend path in seconds",
+    )
+    bench.add_argument("--sizes", type=int, nargs="+", help="Synthetic dataset sizes (rows)")
+    bench.add_argument("--stages", nargs="+", help="Stages to run (default: all)")
+    bench.add_argument("--repeats", type=int, default=3, help="Timed runs per stage")
+    bench.add_argument("--seed", type=int, default=0, help="Synthetic data seed")
+    bench.add_argument("--no-memory", action="store_true", help="Skip tracemalloc runs")
+    bench.add_argument("--output", default="benchmark_results.json", help="Results JSON")
+    bench.add_argument(
+        "--baseline", help="Baseline JSON to compare against (default: benchmarks/baseline.json)"
+    )
+    bench.add_argument(
+        "--save-baseline", action="store_true", help="Write the results as the baseline"
+    )
+    bench.add_argument(
+        "--no-compare", action="store_true", help="Skip the baseline comparison"
+    )
+    bench.add_argument("--threshold", type=float, help="Allowed slowdown (0.25 = 25%%)")
+    bench.add_argument("--memory-threshold", type=float, help="Allowed peak memory growth")
+    return parser.parse_args(argv)
+
 
-    # Initialize analyzer
-    analyzer = MarketAnalyzer(data)
+def load_analyzer(args):
+    """Load (or reuse the cached) merged dataset and score it"""
+    from data_loader import DataLoader
+    from dataset_cache import DatasetCache
+    from join_engine import KeyMap
+    from market_analyzer import MarketAnalyzer, analysis_columns
+
+    # Load data and initialize analyzer (warm starts read the cached merge);
+    # only the columns the analysis reads are parsed
+    loader = DataLoader()
+    cache = None if args.no_cache else DatasetCache(args.cache_dir)
+    key_map = KeyMap.load(args.key_map) if args.key_map else None
+    analyzer = MarketAnalyzer.from_loader(
+        loader, cache=cache, force_rebuild=args.rebuild_cache, columns=analysis_columns(),
+        compact=args.compact, key_map=key_map,
+    )
+    if args.key_map:
+        analyzer.key_map.save(args.key_map)
 
     # Calculate Market Opportunity Score
     print("Calculating Market Opportunity Scores...\n")
     analyzer.calculate_mos()
+    return analyzer
+
+
+def chart_pipeline(args):
+    from chart_pipeline import ChartPipeline
+
+    # Charts render in background processes while the analysis continues
+    return ChartPipeline(
+        max_workers=args.render_workers, dpi=args.dpi, fmt=args.chart_format
+    )
+
+
+def run_recommend(args, analyzer=None):
+    analyzer = analyzer or load_analyzer(args)
+    category = getattr(args, "category", "children_clothing")
+    top_n = getattr(args, "top_n", 15)
+    horizon = getattr(args, "horizon", None)
+    if horizon is not None:
+        analyzer.add_population_forecast([horizon], args.forecast_method)
 
     # Get top market recommendations
-    print("Top Markets for Children's Clothing Exports:")
+    label = "Children's Clothing" if category == "children_clothing" else category.replace("_", " ").title()
+    print(f"Top Markets for {label} Exports:")
     print("=" * 80)
     recommendations = analyzer.get_market_recommendations(
-        product_category="children_clothing", top_n=15
+        product_category=category, top_n=top_n, horizon=horizon
     )
 
     # Display results in table format
+    projected = f"{f'Pop {horizon}':<14} " if horizon is not None else ""
     print(
-        f"{'Rank':<6} {'Country':<25} {'MOS':<10} {'GDP/Cap':<12} {'Literacy':<10} {'Region'}"
+        f"{'Rank':<6} {'Country':<25} {'MOS':<10} {'GDP/Cap':<12} {'Literacy':<10} {projected}{'Region'}"
     )
     print("-" * 80)
 
@@ -42,11 +230,67 @@ def main():
             else "N/A"
         )
         lit = f"{market['literacy']:.1f}%" if market["literacy"] else "N/A"
+        pop = f"{market['projected_population']:<14,.0f} " if horizon is not None else ""
 
         print(
-            f"{idx:<6} {market['country']:<25} {market['mos_score']:<10.3f} {gdp:<12} {lit:<10} {market['region']}"
+            f"{idx:<6} {market['country']:<25} {market['mos_score']:<10.3f} {gdp:<12} {lit:<10} {pop}{market['region']}"
         )
 
+    samples = getattr(args, "stability", 0)
+    if samples:
+        if category != "children_clothing":
+            print("\n✗ Rank stability is only available for the MOS ranking")
+        else:
+            print_rank_stability(analyzer, samples, args.noise, top_n)
+    return recommendations
+
+
+def print_rank_stability(analyzer, samples, noise, top_n):
+    stability = analyzer.rank_stability(n_samples=samples, noise=noise)
+    summary = stability.summary(k=top_n, level=0.9, top_n=top_n)
+
+    print(f"\nRank Stability ({samples:,} perturbations, {noise:.0%} relative noise):")
+    print("=" * 80)
+    print(f"{'Rank':<6} {'Country':<25} {f'P(Top {top_n})':<12} {'Median':<8} {'90% Band'}")
+    print("-" * 80)
+    for _, row in summary.iterrows():
+        band = f"{row['Rank Low']}-{row['Rank High']}"
+        print(
+            f"{row['Rank']:<6} {row['Country']:<25} {row[f'P(Top {top_n})']:<12.1%} "
+            f"{row['Median Rank']:<8.0f} {band}"
+        )
+
+
+def run_similar(args, analyzer=None):
+    analyzer = analyzer or load_analyzer(args)
+    try:
+        results = analyzer.similar_markets(
+            args.countries, k=args.k, radius=args.radius, algorithm=args.algorithm
+        )
+    except ValueError as e:
+        # Unknown countries, or ones missing a similarity feature
+        print(f"✗ {e}")
+        return None
+    for country, markets in results.items():
+        print(f"Markets similar to {country}:")
+        print("=" * 80)
+        print(f"{'Rank':<6} {'Country':<25} {'Distance':<10} {'MOS':<10} {'GDP/Cap':<12} {'Region'}")
+        print("-" * 80)
+        for idx, market in enumerate(markets, 1):
+            gdp = f"${market['gdp_per_capita']:,.0f}" if market["gdp_per_capita"] else "N/A"
+            print(
+                f"{idx:<6} {market['country']:<25} {market['distance']:<10.3f} "
+                f"{market['mos_score']:<10.3f} {gdp:<12} {str(market['region']).strip()}"
+            )
+        print()
+    return results
+
+
+def run_train(args, analyzer=None, charts=None):
+    from predictive_models import GDPPredictor, MarketClassifier
+
+    analyzer = analyzer or load_analyzer(args)
+
     # Predictive Models
     print("\n" + "=" * 80)
     print("PREDICTIVE ANALYTICS")
@@ -55,36 +299,254 @@ def main():
     # 1. GDP Prediction Model
     print("\n1. GDP Prediction (Linear Regression)")
     print("-" * 80)
-    gdp_predictor = GDPPredictor()
-    gdp_results = gdp_predictor.train(analyzer.merged_data)
+    gdp_predictor, gdp_results = GDPPredictor.load_or_train(
+        Path(args.model_dir) / "gdp_predictor.joblib",
+        analyzer.feature_store(),
+        retrain=args.retrain,
+    )
 
-    if gdp_results:
+    if gdp_results is None and gdp_predictor.is_trained:
+        print(f"R² Score: {gdp_predictor.metrics['r2_score']:.3f} (stored model)")
+        print("\nFeature Coefficients:")
+        for feature, coef in zip(gdp_predictor.features, gdp_predictor.model.coef_):
+            print(f"  {feature:<40} {coef:>10.2f}")
+        print(f"  {'Intercept':<40} {gdp_predictor.model.intercept_:>10.2f}")
+    elif gdp_results:
         print(f"R² Score: {gdp_results['r2_score']:.3f}")
         print("\nFeature Coefficients:")
         for feature, coef in gdp_results["coefficients"].items():
             print(f"  {feature:<40} {coef:>10.2f}")
         print(f"  {'Intercept':<40} {gdp_results['intercept']:>10.2f}")
-        gdp_predictor.plot_results(gdp_results)
+        if charts is not None:
+            gdp_predictor.plot_results(gdp_results, charts, background=True)
 
     # 2. Market Classification Model
     print("\n2. High-Potential Market Classification (Logistic Regression)")
     print("-" * 80)
-    classifier = MarketClassifier()
-    class_results = classifier.train(analyzer.merged_data)
+    classifier, class_results = MarketClassifier.load_or_train(
+        Path(args.model_dir) / "market_classifier.joblib",
+        analyzer.feature_store(),
+        retrain=args.retrain,
+    )
 
-    if class_results:
+    if class_results is None and classifier.is_trained:
+        print(f"Accuracy: {classifier.metrics['accuracy']:.3f} (stored model)")
+        print(f"ROC AUC: {classifier.metrics['roc_auc']:.3f} (stored model)")
+    elif class_results:
         print(f"Accuracy: {class_results['accuracy']:.3f}")
         print(f"ROC AUC: {class_results['roc_auc']:.3f}")
         print("\nConfusion Matrix:")
         print(class_results["confusion_matrix"])
         print("\nClassification Report:")
         print(class_results["classification_report"])
-        classifier.plot_results(class_results)
+        if charts is not None:
+            classifier.plot_results(class_results, charts, background=True)
+    return gdp_predictor, classifier
+
+
+def run_train_online(args):
+    from online_training import OnlineMarketClassifier, frame_batches, stream_batches
+
+    checkpoint = Path(args.checkpoint or Path(args.model_dir) / "market_classifier_online.ckpt")
+    fresh = args.fresh or not checkpoint.exists()
+    if not fresh and not args.stream:
+        # Merged data is reshuffled (and may be rescored) on every run, so
+        # there is no stream position to resume from
+        print(f"Note: ignoring checkpoint {checkpoint}; only --stream runs resume")
+        fresh = True
+    if fresh:
+        classifier = OnlineMarketClassifier(holdout_size=args.holdout_size)
+    else:
+        classifier = OnlineMarketClassifier.resume(checkpoint)
+        print(f"✓ Resumed checkpoint: {checkpoint} ({classifier.rows_seen:,} rows seen)")
+
+    stream = None
+    if args.stream:
+        from data_loader import DataLoader
+
+        batches = stream_batches(DataLoader(), args.stream, classifier.features, args.batch_size)
+        stream = {"path": str(Path(args.stream).resolve()), "batch_size": args.batch_size}
+    else:
+        batches = frame_batches(load_analyzer(args).merged_data, args.batch_size, classifier.rng)
+
+    classifier.fit_stream(
+        batches, checkpoint=checkpoint, checkpoint_every=args.checkpoint_every, stream=stream
+    )
+    if classifier.is_trained:
+        classifier.save(Path(args.model_dir) / "market_classifier_online.joblib")
+    return classifier
+
+
+def run_bulk(args):
+    from bulk_scoring import load_profiles, run_bulk
+
+    profiles = load_profiles(args.profiles)
+    analyzer = load_analyzer(args)
+    print(f"Scoring {len(profiles):,} client profiles...\n")
+    return run_bulk(
+        analyzer.merged_data,
+        profiles,
+        args.output,
+        n_jobs=args.jobs,
+        shard_size=args.shard_size,
+        resume=not args.fresh,
+    )
+
+
+def run_evaluate(args):
+    from predictive_models import GDPPredictor, MarketClassifier
+
+    analyzer = load_analyzer(args)
+    store = analyzer.feature_store()
+    for title, model in [("GDP Prediction", GDPPredictor()), ("Market Classification", MarketClassifier())]:
+        print(f"\n{title}: {args.repeats}x{args.splits}-fold cross-validation")
+        print("-" * 80)
+        results = model.cross_validate(
+            store, n_splits=args.splits, n_repeats=args.repeats, n_jobs=args.jobs
+        )
+        if results is not None:
+            print(results.to_string(index=False))
+
+
+def run_plot(args):
+    from predictive_models import GDPPredictor, MarketClassifier
+    from visualizer import MarketVisualizer
+
+    analyzer = load_analyzer(args)
+    store = analyzer.feature_store()
+    with chart_pipeline(args) as charts:
+        viz = MarketVisualizer(charts)
+        recommendations = analyzer.get_market_recommendations(top_n=args.top_n)
+        viz.plot_top_markets(recommendations, metric="mos_score", background=True)
+        viz.plot_regional_distribution(analyzer.merged_data, background=True)
+
+        # Model charts need held-out predictions, so refit (this is cheap and
+        # deterministic; unchanged charts are skipped by the pipeline)
+        for model in (GDPPredictor(), MarketClassifier()):
+            model.plot_results(model.train(store), charts, background=True)
+
+
+def check_import_budget(budget=RECOMMEND_IMPORT_BUDGET):
+    """
+    Import the recommend path in a fresh interpreter and check that it stays
+    within the time budget and loads none of RECOMMEND_FORBIDDEN_MODULES
+
+    Returns (seconds, forbidden modules found).
+    """
+    code = (
+        "import json, sys, time\n"
+        f"sys.path.insert(0, {str(Path(__file__).resolve().parent)!r})\n"
+        "start = time.perf_counter()\n"
+        "import main, data_loader, dataset_cache, market_analyzer\n"
+        "elapsed = time.perf_counter() - start\n"
+        "print(json.dumps({'seconds': elapsed, 'modules': sorted(sys.modules)}))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    report = json.loads(output)
+    loaded = set(report["modules"])
+    forbidden = [
+        name
+        for name in RECOMMEND_FORBIDDEN_MODULES
+        if name in loaded or any(m.startswith(name + ".") for m in loaded)
+    ]
+    return report["seconds"], forbidden
+
+
+def run_bench(args):
+    seconds, forbidden = check_import_budget(args.budget)
+    status = "✓" if seconds <= args.budget and not forbidden else "✗"
+    print(f"{status} recommend imports: {seconds:.3f}s (budget {args.budget:.3f}s)")
+    if forbidden:
+        print(f"✗ recommend path imports: {', '.join(forbidden)}")
+    if args.imports_only:
+        return 0 if status == "✓" else 1
+
+    import benchmarks
+
+    print()
+    return max(benchmarks.run(args), 0 if status == "✓" else 1)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("=== ExportMap: Smart Market Finder ===\n")
+
+    if not (args.trace or args.trace_memory or args.trace_log or args.profile_dir):
+        return run_command(args)
+
+    import logging
+
+    import instrumentation
+
+    if args.trace_log:
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+    recorder = instrumentation.enable(
+        memory=args.trace_memory, profile_dir=args.profile_dir, log=args.trace_log
+    )
+    try:
+        return run_command(args)
+    finally:
+        instrumentation.disable()
+        print("\nStage timings:")
+        print(recorder.summary())
+        if args.trace:
+            recorder.write_json(args.trace)
+            print(f"✓ Saved trace: {args.trace}")
+        if args.profile_dir:
+            print(f"✓ Saved profiles: {args.profile_dir}")
+
+
+def run_command(args):
+    if args.command == "recommend":
+        run_recommend(args)
+        return 0
+    if args.command == "train":
+        with chart_pipeline(args) as charts:
+            run_train(args, charts=charts)
+        return 0
+    if args.command == "train-online":
+        run_train_online(args)
+        return 0
+    if args.command == "evaluate":
+        run_evaluate(args)
+        return 0
+    if args.command == "similar":
+        return 0 if run_similar(args) is not None else 1
+    if args.command == "bulk":
+        run_bulk(args)
+        return 0
+    if args.command == "plot":
+        run_plot(args)
+        return 0
+    if args.command == "serve":
+        from server import serve
+
+        serve(
+            cache_dir=None if args.no_cache else args.cache_dir,
+            model_dir=args.model_dir,
+            host=args.host,
+            port=args.port,
+            cache_size=args.cache_size,
+            workers=args.workers,
+            compact=args.compact,
+        )
+        return 0
+    if args.command == "bench":
+        return run_bench(args)
+
+    # No subcommand: the full analysis, as before
+    analyzer = load_analyzer(args)
+    run_recommend(args, analyzer)
+    with chart_pipeline(args) as charts:
+        run_train(args, analyzer, charts)
 
     print("\n" + "=" * 80)
     print("Analysis complete! Check generated PNG files for visualizations.")
     print("=" * 80)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -5,24 +5,162 @@ Based on fuzzy matching and Market Opportunity Score (MOS) methodology
 
 import pandas as pd
 import numpy as np
-from rapidfuzz import process, fuzz
-from sklearn.preprocessing import MinMaxScaler
+
+from category_profiles import CATEGORY_PROFILES, CategoryScores, at_horizon, registry_version
+from compact_data import compact_frame, format_memory_report, memory_report
+from data_loader import POPULATION_COLUMNS
+from feature_store import FeatureStore
+from incremental_mos import IncrementalMOS
+from instrumentation import annotate, count, instrumented, span
+from join_engine import JoinEngine, JoinSource, KeyMap
+from market_index import CATEGORICAL_FILTERS, RANGE_FILTERS, RECORD_FIELDS, MarketIndex, build_records
+from population_forecast import forecast_frame, projected_column
+from rank_stability import rank_stability
+from scenarios import score_scenarios
+from similarity_index import SimilarityIndex
+
+# The MOS is the children_clothing profile; its weights are read from the
+# registry at call time, so re-registering the profile reweights MOS
+MOS_PROFILE = 'children_clothing'
+MOS_FEATURES = list(CATEGORY_PROFILES[MOS_PROFILE].weights)
+
+# Feature store layout: MOS features first, then the rest of the model
+# features, so both the MOS and the model feature sets are contiguous views
+FEATURE_STORE_COLUMNS = MOS_FEATURES + ['Infant mortality (per 1000 births)', 'MOS']
+
+# Population history the growth models fit on (see population_forecast)
+FORECAST_COLUMNS = POPULATION_COLUMNS + ['Growth Rate']
+
+# Similarity results: recommendation records plus the distance to the query
+SIMILARITY_DISTANCE = 'Similarity Distance'
+SIMILARITY_FIELDS = dict(RECORD_FIELDS, distance=(SIMILARITY_DISTANCE, 0))
+
+# Rows of records measured for the compact-mode memory report
+REPORT_RECORDS = 1000
+
+
+def mos_weights(weights=None):
+    """Return weights, or the registered MOS profile's, as a {feature: weight} dict"""
+    weights = dict(weights or CATEGORY_PROFILES[MOS_PROFILE].weights)
+    unknown = [f for f in weights if f not in MOS_FEATURES]
+    if unknown:
+        raise ValueError(f"MOS weights for unknown features {unknown}; MOS uses {MOS_FEATURES}")
+    return weights
+
+
+def analysis_columns():
+    """
+    Columns the analyzer reads beyond each source's key columns, for
+    DataLoader.load_all_datasets(columns=...)
+
+    The union of every registered profile's features and filter columns, the
+    feature store, the recommendation records and the forecast inputs, taken
+    from the registry at call time so later profiles are covered too.
+    """
+    columns = FEATURE_STORE_COLUMNS + [col for col, _ in RECORD_FIELDS.values()] + FORECAST_COLUMNS
+    for profile in CATEGORY_PROFILES.values():
+        columns += list(profile.weights)
+        for name in profile.filters:
+            name = name.removeprefix('min_').removeprefix('max_')
+            columns.append(RANGE_FILTERS.get(name) or CATEGORICAL_FILTERS.get(name))
+    return [col for col in dict.fromkeys(columns) if col and col != 'MOS']
+
 
 class MarketAnalyzer:
-    def __init__(self, data):
-        self.data = data
-        self.merged_data = self._merge_datasets()
-        self.scaler = MinMaxScaler()
-    
-    def _fuzzy_match_country(self, name, choices):
-        """Fuzzy match country names using rapidfuzz"""
-        if pd.isna(name):
-            return None
-        match, score, _ = process.extractOne(name, choices, scorer=fuzz.WRatio)
-        return match if score > 80 else None
+    def __init__(self, data, match_workers=1, aliases=None, match_threshold=80, compact=False,
+                 key_map=None):
+        self._data = data
+        self._source = None
+        self.match_workers = match_workers
+        self.aliases = aliases
+        self.match_threshold = match_threshold
+        self.match_table = None
+        self.key_map = key_map if key_map is not None else KeyMap()
+        self.incremental = None
+        self.data_version = 0
+        self._market_index = None
+        self._category_scores = None
+        self._feature_store = None
+        self._similarity_index = None
+        self._join_engine = None
+        self._projection = None
+        self.forecast_method = 'loglinear'
+        self.mos_weights = None
+        self.compact_mode = compact
+        self.merged_data = self._merge_datasets() if data else None
+        if compact and self.merged_data is not None:
+            self.compact()
     
+    @classmethod
+    def from_loader(cls, loader, cache=None, force_rebuild=False, columns=None, **kwargs):
+        """
+        Build an analyzer from a DataLoader, reusing a cached merge when the
+        input files, projected columns and matcher settings are unchanged
+        """
+        if cache is None:
+            return cls(loader.load_all_datasets(columns), **kwargs)
+        
+        probe = cls({}, **kwargs)
+        key = cache.make_key(
+            loader.fingerprint(),
+            sorted(columns) if columns is not None else None,
+            probe.matcher_settings(),
+        )
+        
+        if not force_rebuild:
+            with span('load', source='cache'):
+                hit = cache.load(key)
+            if hit is not None:
+                probe.merged_data, probe.match_table = hit
+                # The source frames are only read if something asks for them
+                probe._data, probe._source = None, (loader, columns)
+                count('cache_hits')
+                print(f"✓ Loaded merged data from cache: {len(probe.merged_data)} countries")
+                return probe
+        
+        analyzer = cls(loader.load_all_datasets(columns), **kwargs)
+        if analyzer.merged_data is not None and not analyzer.merged_data.empty:
+            cache.store(key, analyzer.merged_data, analyzer.match_table)
+        return analyzer
+    
+    @property
+    def data(self):
+        """
+        The source frames merged_data was built from
+
+        After a cache hit they are read from the loader on first access, so
+        warm starts that only need merged_data never parse the CSVs.
+        """
+        if self._data is None and self._source is not None:
+            loader, columns = self._source
+            self._data, self._source = loader.load_all_datasets(columns), None
+        return self._data
+    
+    def matcher_settings(self):
+        """Return the settings that change merge results, for cache keys"""
+        settings = {
+            'threshold': self.match_threshold,
+            'aliases': sorted((self.aliases or {}).items()),
+        }
+        if self.compact_mode:
+            settings['compact'] = True
+        if len(self.key_map):
+            settings['key_map'] = self.key_map.digest()
+        return settings
+    
+    def join_engine(self, reference):
+        """Key join engine over a reference frame, sharing the analyzer's key map"""
+        return JoinEngine(
+            reference,
+            key_map=self.key_map,
+            aliases=self.aliases,
+            threshold=self.match_threshold,
+            workers=self.match_workers,
+        )
+    
+    @instrumented('merge')
     def _merge_datasets(self):
-        """Merge datasets using fuzzy matching for country names"""
+        """Merge datasets by CCA3, resolving country names once"""
         if not self.data:
             return None
         
@@ -36,32 +174,110 @@ class MarketAnalyzer:
         cw['Country'] = cw['Country'].str.strip()
         pop['Country/Territory'] = pop['Country/Territory'].str.strip()
         
-        # Fuzzy match countries
-        cw['match_country'] = cw['Country'].apply(
-            lambda x: self._fuzzy_match_country(x, pop['Country/Territory'].tolist())
-        )
-        
-        # Merge on matched names
-        merged = pd.merge(
-            pop, cw,
-            left_on='Country/Territory',
-            right_on='match_country',
-            how='inner'
-        )
+        # Resolve names to CCA3 in one batched pass (stored names skip matching)
+        engine = self.join_engine(pop)
+        countries = JoinSource('countries', cw, 'Country', how='inner')
+        with span('match', names=len(cw)):
+            self.match_table = engine.resolve_source(countries)
+            for method, n in self.match_table['method'].fillna('unmatched').value_counts().items():
+                count(f'matched_{method}', int(n))
         
-        merged = merged.drop(columns=['match_country'])
+        # Hash join on the key
+        merged = engine.join([countries])
+        count('rows_matched', len(merged))
+        count('rows_dropped', len(pop) + len(cw) - 2 * len(merged))
         return merged
     
-    def calculate_mos(self):
+    def join_sources(self, sources):
+        """
+        Left-join any number of extra sources (tariffs, logistics scores,
+        trade flows, ...) onto merged_data by CCA3 in one pass
+
+        sources are join_engine.JoinSource objects; names are resolved through
+        the analyzer's key map, so each distinct name is matched only once.
+        """
+        if self.merged_data is None or self.merged_data.empty:
+            return
+        
+        with span('join', sources=len(sources)):
+            self.merged_data = self.join_engine(self.merged_data).join(sources)
+        self.data_version += 1
+        for source in sources:
+            keys = pd.unique(pd.Series(source.keys).dropna())
+            matched = int(self.merged_data['CCA3'].isin(keys).sum())
+            print(f"✓ Joined {source.name}: {matched} countries matched")
+    
+    def add_country_features(self, features, country_col):
+        """
+        Left-join a compact per-country frame (e.g. from
+        DataLoader.aggregate_country_features) onto merged_data
+
+        Country names or CCA3 codes in country_col are resolved with the same
+        matcher used for the main merge. Raises ValueError when a feature
+        column already exists in merged_data or several rows resolve to the
+        same country (aggregate them first).
+        """
+        if self.merged_data is None or self.merged_data.empty:
+            return
+        
+        columns = [c for c in features.columns if c != country_col]
+        clashes = [c for c in columns if c in self.merged_data.columns]
+        if clashes:
+            raise ValueError(f"Feature columns already in merged data: {clashes}")
+        
+        source = JoinSource('features', features, country_col, columns=columns)
+        self.join_engine(self.merged_data).resolve_source(source)
+        keys = pd.Series(source.keys, dtype=object)
+        repeated = keys.notna() & keys.duplicated(keep=False)
+        if repeated.any():
+            names = features[country_col].to_numpy()[repeated.to_numpy()]
+            groups = pd.Series(names).groupby(keys[repeated].to_numpy()).agg(list)
+            raise ValueError(f"Several feature rows resolve to the same country: {groups.to_dict()}")
+        self.join_sources([source])
+    
+    def compact(self):
+        """
+        Switch to compact mode and return the before/after memory report
+
+        merged_data gets trimmed categorical labels, loses the duplicate
+        Country column and has numerics downcast where no recorded precision
+        is lost (see compact_data). Recommendations become MarketRecords.
+        """
+        if self.merged_data is None:
+            return {}
+        
+        before = self.merged_data
+        with span('compact', rows=len(before)):
+            after = compact_frame(before)
+            # Records cost the same per row, so a sample page stands for all
+            sample = slice(0, REPORT_RECORDS)
+            report = memory_report(
+                before, after,
+                build_records(before.iloc[sample]),
+                build_records(after.iloc[sample], compact=True),
+            )
+        self.merged_data = after
+        self.compact_mode = True
+        self.data_version += 1
+        print("✓ Compacted merged data:")
+        print(format_memory_report(report))
+        return report
+    
+    @instrumented('mos')
+    def calculate_mos(self, weights=None):
         """
         Calculate Market Opportunity Score (MOS) using weighted features
         MOS = 0.4*GDP + 0.2*Literacy + 0.2*Phones + 0.2*Birthrate
         """
+        weights = mos_weights(weights)
         if self.merged_data is None or self.merged_data.empty:
             return
         
+        # A full recompute supersedes any incrementally maintained ranking
+        self.incremental = None
+        
         df = self.merged_data
-        mos_features = ['GDP ($ per capita)', 'Literacy (%)', 'Phones (per 1000)', 'Birthrate']
+        mos_features = MOS_FEATURES
         
         # Check if all features exist
         missing = [f for f in mos_features if f not in df.columns]
@@ -69,47 +285,415 @@ class MarketAnalyzer:
             print(f"Warning: Missing MOS features: {missing}")
             return
         
-        # Scale features to 0-1 range
+        # Scale features to 0-1 range (a cached view of the feature store)
+        store = self.feature_store()
+        scaled = store.scaled(mos_features)
         scaled_cols = [f + '_scaled' for f in mos_features]
-        df[scaled_cols] = self.scaler.fit_transform(df[mos_features])
+        df[scaled_cols] = scaled
         
         # Calculate weighted MOS
-        df['MOS'] = (
-            0.4 * df['GDP ($ per capita)_scaled'] +
-            0.2 * df['Literacy (%)_scaled'] +
-            0.2 * df['Phones (per 1000)_scaled'] +
-            0.2 * df['Birthrate_scaled']
+        mos = 0
+        for j, feature in enumerate(mos_features):
+            mos = mos + weights.get(feature, 0.0) * scaled[:, j]
+        df['MOS'] = mos
+        count('rows_scored', int(df['MOS'].notna().sum()))
+        
+        order = df['MOS'].reset_index(drop=True).sort_values(ascending=False).index.to_numpy()
+        self.merged_data = df.take(order)
+        self.mos_weights = dict(weights)
+        self.data_version += 1
+        # Only MOS and the row order changed, so the store is updated, not rebuilt
+        self._feature_store = (self.data_version, store.with_column('MOS', mos).take(order))
+    
+    def feature_store(self):
+        """
+        Return the shared FeatureStore for the current data version
+
+        The MOS calculation, scenario scoring and the predictive models read
+        views of this one matrix instead of copying merged_data. It is built
+        from merged_data only after changes that may touch its columns:
+        calculate_mos updates it in place of a rebuild, and forecasts carry
+        it over unchanged.
+        """
+        store = self._feature_store
+        if store is None or store[0] != self.data_version:
+            with span('feature_store', rows=len(self.merged_data)):
+                self._feature_store = (
+                    self.data_version,
+                    FeatureStore(self.merged_data, FEATURE_STORE_COLUMNS),
+                )
+        return self._feature_store[1]
+    
+    def _bump_version(self, store_columns_changed=True):
+        """Invalidate per-version caches, carrying the feature store over if it is unaffected"""
+        store = self._feature_store
+        self.data_version += 1
+        if not store_columns_changed and store is not None and store[0] == self.data_version - 1:
+            self._feature_store = (self.data_version, store[1])
+    
+    def score_scenarios(self, weights, top_k=10, chunk_size=1024):
+        """
+        Score a sweep of MOS weight vectors in one batched pass
+
+        weights is an (n_scenarios x 4) array over MOS_FEATURES, or a list of
+        {feature: weight} dicts. Returns a ScenarioResult with per-scenario
+        top-k countries and a country x scenario rank matrix.
+        """
+        if self.merged_data is None or self.merged_data.empty:
+            return None
+        
+        df = self.merged_data
+        return score_scenarios(
+            self.feature_store().scaled(MOS_FEATURES),
+            weights,
+            countries=df['Country/Territory'].to_numpy(),
+            features=MOS_FEATURES,
+            top_k=top_k,
+            chunk_size=chunk_size,
         )
+    
+    def rank_stability(self, n_samples=2000, noise=0.1, seed=42, weights=None, chunk_size=None,
+                       n_jobs=1):
+        """
+        Rank every country under n_samples perturbations of the MOS features
+
+        noise is the relative measurement error (a float or {feature: sd}).
+        Returns a RankStability with each country's rank distribution,
+        top-k probability and rank bands; see rank_stability.
+        """
+        if self.merged_data is None or self.merged_data.empty:
+            return None
+        
+        with span('stability', samples=n_samples):
+            return rank_stability(
+                self.feature_store().view(MOS_FEATURES),
+                mos_weights(weights),
+                countries=self.merged_data['Country/Territory'].to_numpy(),
+                features=MOS_FEATURES,
+                noise=noise,
+                n_samples=n_samples,
+                seed=seed,
+                chunk_size=chunk_size,
+                n_jobs=n_jobs,
+            )
+    
+    def add_population_forecast(self, horizons=(2030,), method='loglinear', window=None):
+        """
+        Project every country's population to the target years
+
+        Growth is fitted across all countries at once from the "<year>
+        Population" columns (see population_forecast). Adds one
+        "<year> Population (projected)" column per horizon plus the fitted
+        annual growth, and returns the new column names.
+        """
+        if self.merged_data is None or self.merged_data.empty:
+            return []
+        
+        with span('forecast', method=method, horizons=len(horizons)):
+            forecast = forecast_frame(self.merged_data, horizons, method, window)
+        for col in forecast.columns:
+            self.merged_data[col] = forecast[col]
+        self.forecast_method = method
+        self._bump_version(store_columns_changed=False)
+        print(f"✓ Projected populations to {', '.join(str(int(h)) for h in horizons)} ({method})")
+        return list(forecast.columns)
+    
+    def projected_data(self, horizon):
+        """
+        Return (frame, column): merged_data with a projected population for a year
+
+        Uses the column added by add_population_forecast when present.
+        Otherwise the projection goes on a shallow copy, cached for this data
+        version, so read paths (which the server runs concurrently) never
+        write to merged_data or bump the data version.
+        """
+        column = projected_column(horizon)
+        df = self.merged_data
+        if column in df.columns:
+            return df, column
         
-        self.merged_data = df.sort_values('MOS', ascending=False)
+        key = (self.data_version, self.forecast_method, horizon)
+        cached = self._projection
+        if cached is None or cached[0] != key:
+            with span('forecast', method=self.forecast_method, horizons=1):
+                forecast = forecast_frame(df, [horizon], self.forecast_method)
+            cached = (key, df.assign(**{col: forecast[col] for col in forecast.columns}))
+            self._projection = cached
+        return cached[1], column
     
-    def get_market_recommendations(self, product_category="children_clothing", top_n=10):
+    def enable_incremental(self, weights=None):
+        """
+        Switch to incremental MOS maintenance
+
+        Later update_country calls rescore only the affected row unless a
+        feature's min or max moves, and recommendations read a maintained
+        ranking instead of re-sorting merged_data. The MOS column is
+        rescored first if it was calculated with different weights.
+        """
+        if self.merged_data is None or self.merged_data.empty:
+            return
+        weights = mos_weights(weights)
+        if 'MOS' not in self.merged_data.columns or self.mos_weights != weights:
+            self.calculate_mos(weights)
+        
+        self.incremental = IncrementalMOS.from_frame(self.merged_data, MOS_FEATURES, weights)
+        self._country_labels = {}
+        for label, country in zip(self.merged_data.index, self.merged_data['Country/Territory']):
+            self._country_labels.setdefault(country, label)
+    
+    def update_country(self, country, values):
+        """
+        Update or insert one country's raw columns and keep MOS current
+
+        values maps column names to new values; MOS features among them are
+        rescored incrementally. Requires enable_incremental().
+        """
+        if self.incremental is None:
+            raise ValueError("Call enable_incremental() before update_country()")
+        
+        df = self.merged_data
+        label = self._country_labels.get(country)
+        if label is None:
+            label = df.index.max() + 1 if len(df) else 0
+            attrs = df.attrs
+            self.merged_data = df = pd.concat(
+                [df, pd.DataFrame({'Country/Territory': [country]}, index=[label])]
+            )
+            df.attrs = dict(attrs)
+            self._country_labels[country] = label
+        
+        for column, value in values.items():
+            if (
+                column in df.columns
+                and isinstance(df[column].dtype, pd.CategoricalDtype)
+                and pd.notna(value)
+                and value not in df[column].cat.categories
+            ):
+                df[column] = df[column].cat.add_categories([value])
+            df.loc[label, column] = value
+        
+        inc = self.incremental
+        scaled_cols = [f + '_scaled' for f in MOS_FEATURES]
+        if inc.upsert(label, values):
+            # A min or max moved, so every row was rescored
+            df.loc[inc.keys, scaled_cols] = inc.scaled()
+            df.loc[inc.keys, 'MOS'] = inc.scores
+        else:
+            pos = inc.positions[label]
+            df.loc[label, scaled_cols] = inc.scaled([pos])[0]
+            df.loc[label, 'MOS'] = inc.scores[pos]
+        self.data_version += 1
+    
+    @instrumented('recommend')
+    def get_market_recommendations(self, product_category="children_clothing", top_n=10, horizon=None):
         """
         Generate market recommendations using MOS (Market Opportunity Score)
+
+        Other product categories are ranked by their registered profile, with
+        the profile score reported as mos_score. With a horizon year, profiles
+        that weight market size score the projected population instead and
+        records carry projected_population.
         """
         if self.merged_data is None or self.merged_data.empty:
             return []
         
+        annotate(category=product_category, top_n=top_n)
+        fields = RECORD_FIELDS
+        if horizon is not None:
+            fields = dict(RECORD_FIELDS, projected_population=(projected_column(horizon), 0))
+        
+        if product_category != "children_clothing":
+            if product_category not in CATEGORY_PROFILES:
+                raise ValueError(
+                    f"Unknown product category {product_category!r}; "
+                    f"choose from {sorted(CATEGORY_PROFILES)}"
+                )
+            return build_records(
+                self.category_scores(horizon).top(product_category, top_n), fields, self.compact_mode
+            )
+        
         # Calculate MOS if not already done
         if 'MOS' not in self.merged_data.columns:
             self.calculate_mos()
         
-        df = self.merged_data
+        df = self.merged_data if horizon is None else self.projected_data(horizon)[0]
         
         # Get top markets by MOS
-        top_markets = df.nlargest(top_n, 'MOS') if 'MOS' in df.columns else df.head(top_n)
-        
-        recommendations = []
-        for _, row in top_markets.iterrows():
-            recommendations.append({
-                'country': row.get('Country/Territory', 'Unknown'),
-                'mos_score': row.get('MOS', 0),
-                'population': row.get('2022 Population', 0),
-                'gdp_per_capita': row.get('GDP ($ per capita)', 0),
-                'literacy': row.get('Literacy (%)', 0),
-                'birthrate': row.get('Birthrate', 0),
-                'region': row.get('Region', 'Unknown'),
-                'continent': row.get('Continent', 'Unknown')
-            })
-        
-        return recommendations
+        if self.incremental is not None:
+            top_markets = df.loc[[key for key, _ in self.incremental.top(top_n)]]
+        elif 'MOS' in df.columns:
+            top_markets = df.nlargest(top_n, 'MOS')
+        else:
+            top_markets = df.head(top_n)
+        
+        return build_records(top_markets, fields, self.compact_mode)
+    
+    def category_scores(self, horizon=None):
+        """
+        Score every registered category profile in one batched pass
+
+        With a horizon year, market size is the projected population. The
+        result is cached until the data, the registry or the horizon changes.
+        """
+        df, profiles = self.merged_data, CATEGORY_PROFILES.values()
+        if horizon is not None:
+            df, column = self.projected_data(horizon)
+            profiles = [at_horizon(p, column) for p in profiles]
+        
+        key = (self.data_version, registry_version(), horizon, self.forecast_method)
+        cached = self._category_scores
+        if cached is None or cached[0] != key:
+            scores = CategoryScores(df, profiles)
+            for name, missing in scores.missing.items():
+                if missing:
+                    print(f"Warning: Profile {name!r} missing features: {missing}")
+            self._category_scores = (key, scores)
+        return self._category_scores[1]
+    
+    def recommendations_by_category(self, top_n=10, horizon=None):
+        """Return {category: recommendations} for every registered profile"""
+        if self.merged_data is None or self.merged_data.empty:
+            return {}
+        
+        scores = self.category_scores(horizon)
+        fields = RECORD_FIELDS
+        if horizon is not None:
+            fields = dict(RECORD_FIELDS, projected_population=(projected_column(horizon), 0))
+        return {
+            name: build_records(scores.top(name, top_n), fields, self.compact_mode)
+            for name in CATEGORY_PROFILES
+        }
+    
+    def query_markets(self, offset=0, limit=10, **filters):
+        """
+        Filtered, paginated recommendations in MOS order
+
+        Accepts region, continent, min_population, max_population, min_gdp
+        and max_gdp filters. Indexes are built once per data version, so
+        query cost depends on the matching rows, not the frame size.
+        """
+        if self.merged_data is None or self.merged_data.empty:
+            return []
+        
+        if 'MOS' not in self.merged_data.columns:
+            self.calculate_mos()
+        
+        return self.market_index().query(offset=offset, limit=limit, **filters)
+    
+    def similarity_index(self, features=None, weights=None, algorithm='auto'):
+        """
+        Return the nearest-neighbour index for the current data version
+
+        Defaults to the MOS features, reusing the scaled matrix calculate_mos
+        scores from; other feature lists are scaled the same way. weights
+        maps features to distance weights (1 by default). Rebuilt lazily when
+        the data or the parameters change.
+        """
+        features = tuple(features or MOS_FEATURES)
+        key = (self.data_version, features, tuple(sorted((weights or {}).items())), algorithm)
+        cached = self._similarity_index
+        if cached is None or cached[0] != key:
+            scaled = None
+            if list(features) == MOS_FEATURES and set(features) <= set(self.merged_data.columns):
+                scaled = self.feature_store().scaled(MOS_FEATURES)
+            with span('similarity_index', rows=len(self.merged_data)):
+                index = SimilarityIndex(
+                    self.merged_data, features, weights, algorithm, scaled=scaled, key='CCA3'
+                )
+            self._similarity_index = (key, index)
+        return self._similarity_index[1]
+    
+    def similar_markets(self, countries, k=10, radius=None, features=None, weights=None,
+                        include_self=False, algorithm='auto'):
+        """
+        Markets most similar to one or more countries, nearest first
+
+        countries is a name or CCA3 code (or a list of them), resolved like
+        merge names. Results are get_market_recommendations records plus a
+        distance: a list for one country, {country: records} for several.
+        With radius, every market within that distance is returned instead
+        of the k nearest.
+        """
+        if self.merged_data is None or self.merged_data.empty:
+            return [] if isinstance(countries, str) else {}
+        
+        single = isinstance(countries, str)
+        names = [countries] if single else list(countries)
+        index = self.similarity_index(features, weights, algorithm)
+        
+        # CCA3 codes hit the index directly; anything else is resolved by name
+        keys = np.array(names, dtype=object)
+        positions = index.positions_of(keys)
+        if (positions < 0).any():
+            unresolved = positions < 0
+            resolved = self._merged_join_engine().resolve(keys[unresolved])['key']
+            keys[unresolved] = resolved.to_numpy(dtype=object)
+            positions[unresolved] = index.positions_of(keys[unresolved])
+        unknown = [name for name, pos in zip(names, positions) if pos < 0]
+        if unknown:
+            raise ValueError(f"No market with complete features for {unknown}")
+        
+        results = self._neighbour_records(
+            index, index.points[positions], k, radius, exclude=None if include_self else keys
+        )
+        return results[0] if single else dict(zip(names, results))
+    
+    def similar_to_profile(self, profiles, k=10, radius=None, features=None, weights=None,
+                           algorithm='auto'):
+        """
+        Markets closest to raw feature profiles ({feature: value}), e.g. the
+        figures of a best customer's market; a list of records per profile
+        """
+        if self.merged_data is None or self.merged_data.empty:
+            return []
+        
+        single = isinstance(profiles, dict)
+        profiles = [profiles] if single else list(profiles)
+        index = self.similarity_index(features, weights, algorithm)
+        missing = sorted({f for p in profiles for f in index.features if f not in p})
+        if missing:
+            raise ValueError(f"Profiles are missing features: {missing}")
+        
+        values = [[p[f] for f in index.features] for p in profiles]
+        results = self._neighbour_records(index, index.transform(values), k, radius)
+        return results[0] if single else results
+    
+    def _neighbour_records(self, index, points, k, radius, exclude=None):
+        """k-NN (or radius) search for each point, as distance-annotated records"""
+        if radius is not None:
+            hits = index.radius_neighbors(points, radius)
+        else:
+            extra = index.max_duplicates if exclude is not None else 0
+            hits = zip(*index.kneighbors(points, k + extra))
+        
+        all_distances, all_positions, sizes = [], [], []
+        for i, (distances, positions) in enumerate(hits):
+            if exclude is not None:
+                keep = index.keys[positions] != exclude[i]
+                distances, positions = distances[keep], positions[keep]
+            if radius is None:
+                distances, positions = distances[:k], positions[:k]
+            all_distances.append(distances)
+            all_positions.append(positions)
+            sizes.append(len(positions))
+        
+        # One gather and one record build for the whole batch
+        rows = index.frame.take(np.concatenate(all_positions).astype(np.int64))
+        rows = rows.assign(**{SIMILARITY_DISTANCE: np.concatenate(all_distances)})
+        records = build_records(rows, SIMILARITY_FIELDS, self.compact_mode)
+        bounds = np.cumsum([0] + sizes)
+        return [records[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    
+    def _merged_join_engine(self):
+        """Join engine over merged_data, kept per data version for repeated lookups"""
+        cached = self._join_engine
+        if cached is None or cached[0] != self.data_version:
+            self._join_engine = (self.data_version, self.join_engine(self.merged_data))
+        return self._join_engine[1]
+    
+    def market_index(self):
+        """Return the query index for the current data version"""
+        index = self._market_index
+        if index is None or index[0] != self.data_version:
+            self._market_index = (self.data_version, MarketIndex(self.merged_data, compact=self.compact_mode))
+        return self._market_index[1]
@@ -0,0 +1,205 @@
+"""
+Indexed market queries
+Precomputes MOS ordering, categorical posting lists and sorted numeric
+columns so filtered, paginated top-k queries avoid scanning merged_data
+"""
+
+from collections.abc import Mapping
+from dataclasses import make_dataclass
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from compact_data import float32_columns, float64_values, widen
+
+# Recommendation record field -> (merged_data column, default when missing)
+RECORD_FIELDS = {
+    'country': ('Country/Territory', 'Unknown'),
+    'mos_score': ('MOS', 0),
+    'population': ('2022 Population', 0),
+    'gdp_per_capita': ('GDP ($ per capita)', 0),
+    'literacy': ('Literacy (%)', 0),
+    'birthrate': ('Birthrate', 0),
+    'region': ('Region', 'Unknown'),
+    'continent': ('Continent', 'Unknown'),
+}
+
+CATEGORICAL_FILTERS = {'region': 'Region', 'continent': 'Continent'}
+RANGE_FILTERS = {'population': '2022 Population', 'gdp': 'GDP ($ per capita)'}
+
+
+class MarketRecord(Mapping):
+    """
+    Slotted recommendation record
+
+    Reads like the dict records (record['country'], dict(record), JSON via
+    the Mapping interface) at a fraction of a dict's size. Concrete classes
+    come from record_type().
+    """
+
+    __slots__ = ()
+    fields = ()
+
+    def __getitem__(self, key):
+        if key not in self.fields:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self):
+        return len(self.fields)
+
+    def __reduce__(self):
+        return _make_record, (self.fields, tuple(self.values()))
+
+    def __repr__(self):
+        return f'MarketRecord({dict(self)!r})'
+
+
+@lru_cache(maxsize=None)
+def record_type(fields):
+    """Return the MarketRecord class with one slot per field name"""
+    taken = [f for f in fields if not f.isidentifier() or hasattr(MarketRecord, f)]
+    if taken:
+        raise ValueError(f'Record field names unusable as slots: {taken}')
+    cls = make_dataclass(
+        'MarketRecord', fields, bases=(MarketRecord,), slots=True, eq=False, repr=False
+    )
+    cls.fields = fields
+    return cls
+
+
+def _make_record(fields, values):
+    return record_type(fields)(*values)
+
+
+def build_records(df, fields=RECORD_FIELDS, compact=False):
+    """
+    Build recommendation records column-wise instead of row by row
+
+    Records are dicts, or MarketRecords when compact. Columns compact_frame
+    stored as float32 are widened back to the decimals they were recorded as.
+    """
+    n = len(df)
+    columns = {}
+    for key, (col, default) in fields.items():
+        if col not in df.columns:
+            columns[key] = [default] * n
+        elif df[col].dtype == np.float32 and col in float32_columns(df):
+            columns[key] = widen(df[col].to_numpy()).tolist()
+        else:
+            columns[key] = df[col].tolist()
+    if compact:
+        return list(map(record_type(tuple(columns)), *columns.values()))
+    keys = list(columns)
+    return [dict(zip(keys, values)) for values in zip(*columns.values())]
+
+
+def category_key(value):
+    """Normalize a category value for case and padding insensitive lookups"""
+    return str(value).strip().casefold()
+
+
+class MarketIndex:
+    """
+    Query index over a scored merged_data frame
+
+    Rows are held in MOS order (unscored rows dropped). Region and Continent
+    map to sorted arrays of rank positions, and population and GDP are kept
+    as sorted value arrays, so a query touches only matching positions.
+    """
+
+    def __init__(self, df, score_col='MOS', compact=False):
+        self.compact = compact
+        if score_col in df.columns:
+            df = df[df[score_col].notna()].sort_values(
+                score_col, ascending=False, kind='stable'
+            )
+        self.frame = df.reset_index(drop=True)
+        self.size = len(self.frame)
+
+        self.postings = {}
+        for name, col in CATEGORICAL_FILTERS.items():
+            if col not in self.frame.columns:
+                continue
+            codes, uniques = pd.factorize(
+                self.frame[col].map(category_key, na_action='ignore')
+            )
+            order = np.argsort(codes, kind='stable')
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.postings[name] = {
+                key: order[bounds[i]:bounds[i + 1]] for i, key in enumerate(uniques)
+            }
+
+        self.ranges = {}
+        for name, col in RANGE_FILTERS.items():
+            if col not in self.frame.columns:
+                continue
+            values = float64_values(self.frame[col])
+            valid = np.flatnonzero(~np.isnan(values))
+            order = valid[np.argsort(values[valid], kind='stable')]
+            self.ranges[name] = (values[order], order)
+
+    def _category_positions(self, name, wanted):
+        postings = self.postings.get(name, {})
+        if isinstance(wanted, str):
+            wanted = [wanted]
+        parts = [postings.get(category_key(w)) for w in wanted]
+        parts = [p for p in parts if p is not None]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    def _range_positions(self, name, low, high):
+        if name not in self.ranges:
+            return np.empty(0, dtype=np.int64)
+        values, order = self.ranges[name]
+        start = 0 if low is None else np.searchsorted(values, low, side='left')
+        stop = len(values) if high is None else np.searchsorted(values, high, side='right')
+        return np.sort(order[start:stop])
+
+    def positions(self, region=None, continent=None, min_population=None,
+                  max_population=None, min_gdp=None, max_gdp=None):
+        """Return matching rank positions in MOS order, or None for no filter"""
+        candidates = []
+        if region is not None:
+            candidates.append(self._category_positions('region', region))
+        if continent is not None:
+            candidates.append(self._category_positions('continent', continent))
+        if min_population is not None or max_population is not None:
+            candidates.append(self._range_positions('population', min_population, max_population))
+        if min_gdp is not None or max_gdp is not None:
+            candidates.append(self._range_positions('gdp', min_gdp, max_gdp))
+
+        if not candidates:
+            return None
+
+        # Intersect smallest first so the work tracks the selective filter
+        candidates.sort(key=len)
+        result = candidates[0]
+        for other in candidates[1:]:
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+    def query(self, offset=0, limit=10, **filters):
+        """
+        Return one page of recommendation records in MOS order
+
+        filters: region / continent (a name or list of names, case and
+        padding insensitive), min_population / max_population and
+        min_gdp / max_gdp (inclusive).
+        """
+        matched = self.positions(**filters)
+        if matched is None:
+            page = np.arange(offset, min(offset + limit, self.size))
+        else:
+            page = matched[offset:offset + limit]
+        return build_records(self.frame.take(page), compact=self.compact)
+
+    def count(self, **filters):
+        """Return how many rows match the filters"""
+        matched = self.positions(**filters)
+        return self.size if matched is None else len(matched)
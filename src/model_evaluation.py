@@ -0,0 +1,150 @@
+"""
+Repeated k-fold cross-validation with a hyperparameter grid
+Folds are generated once from a fixed seed and (candidate, repeat) jobs are
+spread over a process pool in batches, so results do not depend on the
+worker count
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+from sklearn.base import clone
+from sklearn.metrics import accuracy_score, r2_score, roc_auc_score
+from sklearn.model_selection import RepeatedKFold, RepeatedStratifiedKFold
+
+# With n_jobs=None, grids smaller than this many training rows (rows x fits
+# in total) run serially, since starting a process pool would cost more than
+# it saves
+PARALLEL_MIN_WORK = 5_000_000
+
+# Jobs are sent to the pool in batches of about this many per worker
+BATCHES_PER_WORKER = 4
+
+# Per-process training data, set once by the pool initializer
+_X = None
+_y = None
+
+
+def resolve_jobs(n_jobs):
+    """
+    Worker count for n_jobs as joblib reads it: None or -1 is every core,
+    -2 all but one, and so on
+    """
+    cpus = os.cpu_count() or 1
+    if n_jobs is None:
+        return cpus
+    if n_jobs == 0:
+        raise ValueError("n_jobs == 0 has no meaning")
+    return n_jobs if n_jobs > 0 else max(1, cpus + 1 + n_jobs)
+
+
+def _init_worker(X, y):
+    global _X, _y
+    _X, _y = X, y
+
+
+def _score(task, estimator, X_test, y_test):
+    """Return {metric: value} for one fitted fold"""
+    if task == "regression":
+        return {"r2": r2_score(y_test, estimator.predict(X_test))}
+    y_prob = estimator.predict_proba(X_test)[:, 1]
+    return {
+        "roc_auc": roc_auc_score(y_test, y_prob),
+        "accuracy": accuracy_score(y_test, (y_prob >= 0.5).astype(int)),
+    }
+
+
+def _run_job(job):
+    """Fit and score one candidate on every fold of one repeat"""
+    candidate_id, estimator, task, folds = job
+    scores = []
+    for train_idx, test_idx in folds:
+        model = clone(estimator)
+        model.fit(_X[train_idx], _y[train_idx])
+        scores.append(_score(task, model, _X[test_idx], _y[test_idx]))
+    return candidate_id, scores
+
+
+def confidence_interval(values, level=0.95):
+    """
+    Student-t interval for the mean of the fold scores
+
+    Folds of repeated CV overlap, so this is an approximation that tends to
+    be somewhat narrow; it is meant for comparing candidates.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    mean = values.mean()
+    if len(values) < 2:
+        return mean, mean
+    half = stats.t.ppf((1 + level) / 2, len(values) - 1) * stats.sem(values)
+    return mean - half, mean + half
+
+
+def cross_validate_grid(
+    X,
+    y,
+    candidates,
+    task,
+    n_splits=5,
+    n_repeats=10,
+    seed=42,
+    n_jobs=None,
+):
+    """
+    Evaluate each (name, params, estimator) candidate with repeated k-fold CV
+
+    task is "regression" (scored by R²) or "classification" (ROC AUC and
+    accuracy, with stratified folds). Returns a frame with one row per
+    candidate: mean, std and 95% CI of each metric, sorted best first.
+    n_jobs follows joblib (-1 is every core). When it is None, grids under
+    PARALLEL_MIN_WORK run serially and larger ones use every core; any other
+    value sends (candidate, repeat) jobs to that many workers in batches.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    splitter_cls = RepeatedStratifiedKFold if task == "classification" else RepeatedKFold
+    splitter = splitter_cls(n_splits=n_splits, n_repeats=n_repeats, random_state=seed)
+    splits = list(splitter.split(X, y))
+    repeats = [splits[r * n_splits:(r + 1) * n_splits] for r in range(n_repeats)]
+
+    jobs = [
+        (i, estimator, task, folds)
+        for i, (_, _, estimator) in enumerate(candidates)
+        for folds in repeats
+    ]
+
+    if n_jobs is None and len(X) * len(splits) * len(candidates) < PARALLEL_MIN_WORK:
+        n_jobs = 1
+    n_jobs = resolve_jobs(n_jobs)
+    fold_scores = [[] for _ in candidates]
+    if n_jobs == 1:
+        _init_worker(X, y)
+        results = map(_run_job, jobs)
+        for candidate_id, scores in results:
+            fold_scores[candidate_id].extend(scores)
+    else:
+        workers = min(n_jobs, len(jobs))
+        batch = max(1, len(jobs) // (workers * BATCHES_PER_WORKER))
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(X, y)
+        ) as pool:
+            for candidate_id, scores in pool.map(_run_job, jobs, chunksize=batch):
+                fold_scores[candidate_id].extend(scores)
+
+    rows = []
+    for (name, params, _), scores in zip(candidates, fold_scores):
+        row = {"model": name, "params": params, "n_folds": len(scores)}
+        for metric in scores[0]:
+            values = [s[metric] for s in scores]
+            low, high = confidence_interval(values)
+            row[f"{metric}_mean"] = float(np.mean(values))
+            row[f"{metric}_std"] = float(np.std(values, ddof=1)) if len(values) > 1 else 0.0
+            row[f"{metric}_ci_low"] = float(low)
+            row[f"{metric}_ci_high"] = float(high)
+        rows.append(row)
+
+    primary = "r2_mean" if task == "regression" else "roc_auc_mean"
+    return pd.DataFrame(rows).sort_values(primary, ascending=False, kind="stable").reset_index(drop=True)
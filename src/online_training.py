@@ -0,0 +1,360 @@
+"""
+Online training for the market classifier
+Mini-batch partial_fit with a streaming scaler, a running MOS threshold for
+the High_MOS label and a rolling holdout, so each update costs time
+proportional to the batch rather than to everything seen so far
+"""
+
+import os
+import time
+from itertools import islice
+from pathlib import Path
+
+import joblib
+import numpy as np
+from scipy.special import expit
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
+from sklearn.metrics import auc, roc_curve
+from sklearn.preprocessing import StandardScaler
+
+from compact_data import float64_values
+from feature_store import FeatureStore
+from instrumentation import annotate, count, instrumented
+from predictive_models import MarketClassifier, library_versions, linear_decision, store_frame
+
+CHECKPOINT_FORMAT_VERSION = 2
+
+
+class RunningQuantile:
+    """
+    Approximate quantile of a stream from a fixed-bin histogram
+
+    Values are clipped into [low, high] (MOS is 0-1 by construction), so an
+    update is one bincount over the batch and the answer is exact to within
+    one bin width. decay < 1 fades old batches for drifting streams.
+    """
+
+    def __init__(self, q=0.5, low=0.0, high=1.0, bins=4096, decay=1.0):
+        if not 0.0 < q < 1.0:
+            raise ValueError(f"q must be between 0 and 1, got {q}")
+        if not high > low:
+            raise ValueError("high must be greater than low")
+        self.q = q
+        self.low = low
+        self.high = high
+        self.decay = decay
+        self.counts = np.zeros(bins)
+
+    @property
+    def total(self):
+        return float(self.counts.sum())
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if self.decay < 1.0:
+            self.counts *= self.decay
+        if not len(values):
+            return
+        bins = len(self.counts)
+        position = (values - self.low) / (self.high - self.low) * bins
+        index = np.clip(position.astype(np.int64), 0, bins - 1)
+        self.counts += np.bincount(index, minlength=bins)
+
+    def value(self):
+        """Current quantile estimate (NaN before any update)"""
+        total = self.total
+        if total == 0:
+            return np.nan
+        cumulative = np.cumsum(self.counts)
+        target = self.q * total
+        b = int(np.searchsorted(cumulative, target))
+        below = cumulative[b] - self.counts[b]
+        within = (target - below) / self.counts[b] if self.counts[b] else 0.0
+        width = (self.high - self.low) / len(self.counts)
+        return self.low + (b + within) * width
+
+
+class RollingHoldout:
+    """Ring buffer of the most recent held-out rows (features and MOS)"""
+
+    def __init__(self, capacity, n_features):
+        self.capacity = capacity
+        self.X = np.empty((capacity, n_features))
+        self.mos = np.empty(capacity)
+        self.size = 0
+        self._next = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, X, mos):
+        X, mos = X[-self.capacity:], mos[-self.capacity:]
+        slots = (self._next + np.arange(len(X))) % self.capacity
+        self.X[slots] = X
+        self.mos[slots] = mos
+        self._next = (self._next + len(X)) % self.capacity
+        self.size = min(self.size + len(X), self.capacity)
+
+    def rows(self):
+        return self.X[: self.size], self.mos[: self.size]
+
+
+class RawLinearModel:
+    """
+    coef_/intercept_ of an SGD model fitted on standardized features, folded
+    back into raw feature space so linear_decision() scores raw rows
+    """
+
+    def __init__(self, coef, intercept):
+        self.coef_ = np.atleast_2d(coef)
+        self.intercept_ = np.atleast_1d(intercept)
+
+    def predict_proba(self, X):
+        """[P(low), P(high)] per row, like LogisticRegression.predict_proba"""
+        prob = expit(linear_decision(self, X))
+        return np.column_stack([1 - prob, prob])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] >= 0.5).astype(int)
+
+
+def frame_batches(df, batch_size, rng=None):
+    """
+    Yield consecutive row slices of a frame, or of a random permutation of
+    its rows when rng (a NumPy Generator) is given
+    """
+    if rng is not None:
+        df = df.take(rng.permutation(len(df)))
+    for start in range(0, len(df), batch_size):
+        yield df.iloc[start:start + batch_size]
+
+
+class OnlineMarketClassifier(MarketClassifier):
+    """
+    High-potential market classifier trained by mini-batch partial_fit
+
+    Each batch updates a streaming StandardScaler, the running MOS median
+    that defines High_MOS, and an SGD logistic regression. A random
+    holdout_fraction of every batch goes to a rolling holdout of the latest
+    holdout_size rows instead of training; metrics are computed on it. The
+    fitted model is kept in raw feature space, so every MarketClassifier
+    prediction method works unchanged.
+
+    Labels drift: each training row is labelled once, against the running
+    median at the moment its batch arrives, and is never relabelled as the
+    median moves. Early batches can therefore disagree with the final
+    threshold, most of all on streams ordered by MOS; evaluate() relabels
+    the holdout with the current median.
+    """
+
+    def __init__(self, alpha=1e-4, holdout_size=2000, holdout_fraction=0.2,
+                 threshold_bins=4096, threshold_decay=1.0, random_state=42):
+        super().__init__()
+        self.estimator = SGDClassifier(loss="log_loss", alpha=alpha, random_state=random_state)
+        self.scaler = StandardScaler()
+        self.threshold = RunningQuantile(0.5, bins=threshold_bins, decay=threshold_decay)
+        self.holdout = RollingHoldout(holdout_size, len(self.features))
+        self.holdout_fraction = holdout_fraction
+        self.rng = np.random.default_rng(random_state)
+        self.batches_seen = 0
+        self.rows_seen = 0
+        self.history = []
+        # Identity of the stream being consumed and how many batches of it
+        # were read, so a resumed fit_stream skips them
+        self.stream = None
+        self.stream_batches = 0
+
+    def batch_values(self, batch):
+        """Complete (features, MOS) rows of a batch as float64 arrays"""
+        if isinstance(batch, FeatureStore):
+            columns = self.features + ["MOS"]
+            batch = store_frame(batch, columns, batch.valid_mask(columns))
+        missing = [c for c in self.features + ["MOS"] if c not in batch.columns]
+        if missing:
+            raise ValueError(f"Batch is missing columns: {missing}")
+        X = float64_values(batch[self.features])
+        mos = float64_values(batch["MOS"])
+        valid = ~(np.isnan(X).any(axis=1) | np.isnan(mos))
+        return X[valid], mos[valid]
+
+    def partial_fit(self, batch):
+        """
+        Update the model with one batch (a frame with the features and MOS)
+
+        Returns the number of rows trained on; held-out rows are not counted.
+        """
+        X, mos = self.batch_values(batch)
+        if not len(X):
+            return 0
+
+        self.threshold.update(mos)
+        held = self.rng.random(len(X)) < self.holdout_fraction
+        self.holdout.add(X[held], mos[held])
+        X, mos = X[~held], mos[~held]
+        self.batches_seen += 1
+        if not len(X):
+            return 0
+
+        self.scaler.partial_fit(X)
+        y = (mos >= self.threshold.value()).astype(int)
+        self.estimator.partial_fit(self.scaler.transform(X), y, classes=[0, 1])
+        self.rows_seen += len(X)
+        count("rows_train", len(X))
+
+        # x_scaled = (x - mean) / scale, folded into the coefficients
+        coef = self.estimator.coef_[0] / self.scaler.scale_
+        intercept = self.estimator.intercept_[0] - coef @ self.scaler.mean_
+        self.model = RawLinearModel(coef, intercept)
+        self.is_trained = True
+        return len(X)
+
+    def evaluate(self):
+        """Accuracy and ROC AUC on the rolling holdout under the current threshold"""
+        X, mos = self.holdout.rows()
+        if not self.is_trained or not len(X):
+            return None
+        y = (mos >= self.threshold.value()).astype(int)
+        prob = self.predict_proba_many(X)
+        pred = (prob >= 0.5).astype(int)
+        metrics = {
+            "accuracy": float(accuracy_score(y, pred)),
+            "roc_auc": np.nan,
+            "threshold": float(self.threshold.value()),
+            "n_train": self.rows_seen,
+            "n_test": len(X),
+        }
+        if 0 < y.sum() < len(y):
+            fpr, tpr, _ = roc_curve(y, prob)
+            metrics["roc_auc"] = float(auc(fpr, tpr))
+        self.metrics = metrics
+        return metrics
+
+    def results(self):
+        """MarketClassifier.train-style results on the rolling holdout"""
+        metrics = self.evaluate()
+        if metrics is None:
+            return None
+        X, mos = self.holdout.rows()
+        y_test = (mos >= self.threshold.value()).astype(int)
+        y_prob = self.predict_proba_many(X)
+        y_pred = (y_prob >= 0.5).astype(int)
+        fpr, tpr = (roc_curve(y_test, y_prob)[:2] if 0 < y_test.sum() < len(y_test)
+                    else (np.array([0.0, 1.0]), np.array([0.0, 1.0])))
+        return {
+            "accuracy": metrics["accuracy"],
+            "confusion_matrix": confusion_matrix(y_test, y_pred, labels=[0, 1]),
+            "classification_report": classification_report(y_test, y_pred, zero_division=0),
+            "fpr": fpr,
+            "tpr": tpr,
+            "roc_auc": metrics["roc_auc"],
+            "y_test": y_test,
+            "y_pred": y_pred,
+            "y_prob": y_prob,
+        }
+
+    def fit_stream(self, batches, checkpoint=None, checkpoint_every=10, eval_every=1,
+                   verbose=True, stream=None):
+        """
+        Train on an iterable of batches (e.g. DataLoader.iter_chunks)
+
+        Holdout metrics are recorded in history every eval_every batches and
+        the full state is checkpointed every checkpoint_every batches and at
+        the end. stream identifies a replayable source (e.g. its path and
+        batch size): when it matches the stream of a resumed checkpoint, the
+        batches already read from it are skipped rather than trained twice.
+        Returns the history.
+        """
+        if stream is not None and stream == self.stream:
+            batches = islice(batches, self.stream_batches, None)
+            if verbose and self.stream_batches:
+                print(f"✓ Skipping {self.stream_batches} batches already trained on")
+        else:
+            self.stream, self.stream_batches = stream, 0
+
+        saved = None
+        for batch in batches:
+            seen = self.batches_seen
+            self.stream_batches += 1
+            self.partial_fit(batch)
+            if self.batches_seen == seen:
+                continue
+            if eval_every and self.batches_seen % eval_every == 0:
+                metrics = self.evaluate()
+                if metrics is not None:
+                    self.history.append(dict(metrics, batch=self.batches_seen))
+                    if verbose:
+                        print(
+                            f"✓ Batch {self.batches_seen}: {self.rows_seen:,} rows, "
+                            f"holdout accuracy {metrics['accuracy']:.3f}, "
+                            f"ROC AUC {metrics['roc_auc']:.3f}"
+                        )
+            if checkpoint and checkpoint_every and self.batches_seen % checkpoint_every == 0:
+                self.checkpoint(checkpoint, verbose=verbose)
+                saved = self.batches_seen
+
+        if checkpoint and self.is_trained and saved != self.batches_seen:
+            self.checkpoint(checkpoint, verbose=verbose)
+        return self.history
+
+    @instrumented("train")
+    def train(self, data, batch_size=1000):
+        """
+        Stream merged_data (or a FeatureStore) through partial_fit
+
+        Drop-in for MarketClassifier.train, so load_or_train works; returns
+        results on the rolling holdout. Rows are streamed in random order:
+        merged_data is sorted by MOS, and in that order the running median
+        (and so every label) would lag far behind the true median.
+        """
+        annotate(model=type(self).__name__)
+        self.fingerprint = self.training_fingerprint(data)
+        if "MOS" not in data:
+            print("Warning: MOS not calculated. Cannot train classifier.")
+            return None
+        if isinstance(data, FeatureStore):
+            columns = self.features + ["MOS"]
+            data = store_frame(data, columns, data.valid_mask(columns))
+        self.fit_stream(frame_batches(data, batch_size, self.rng), verbose=False)
+        return self.results()
+
+    def checkpoint(self, path, verbose=True):
+        """Write the full training state (resumable with resume()) atomically"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.tmp")
+        joblib.dump(
+            {
+                "format": CHECKPOINT_FORMAT_VERSION,
+                "class": type(self).__name__,
+                "state": dict(self.__dict__),
+                "versions": library_versions(),
+                "saved_at": time.time(),
+            },
+            tmp,
+        )
+        os.replace(tmp, path)
+        if verbose:
+            print(f"✓ Checkpoint: {path} (batch {self.batches_seen}, {self.rows_seen:,} rows)")
+
+    @classmethod
+    def resume(cls, path):
+        """Restore a checkpoint written by checkpoint()"""
+        payload = joblib.load(path)
+        if payload.get("class") != cls.__name__:
+            raise ValueError(f"{path} does not contain a {cls.__name__} checkpoint")
+        if payload.get("format") != CHECKPOINT_FORMAT_VERSION:
+            raise ValueError(
+                f"{path} is checkpoint format {payload.get('format')}, "
+                f"expected {CHECKPOINT_FORMAT_VERSION}; retrain with --fresh"
+            )
+        instance = cls.__new__(cls)
+        instance.__dict__.update(payload["state"])
+        return instance
+
+
+def stream_batches(loader, path, features, batch_size=10_000):
+    """Mini-batches of the features and MOS from a CSV of market observations"""
+    columns = list(features) + ["MOS"]
+    return loader.iter_chunks(path, columns, chunksize=batch_size, columns=columns)
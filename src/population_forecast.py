@@ -0,0 +1,175 @@
+"""
+Vectorized population forecasting
+Fits growth curves for every entity at once over the "<year> Population"
+matrix (CAGR, log-linear or two-segment piecewise log-linear) and projects
+populations to arbitrary target years without a per-entity loop
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+YEAR_COLUMN = re.compile(r"^(\d{4}) Population$")
+METHODS = ("cagr", "loglinear", "piecewise", "growth_rate")
+
+
+def year_columns(df):
+    """Return (years, columns) for every "<year> Population" column, oldest first"""
+    found = sorted(
+        (int(m.group(1)), col) for col in df.columns if (m := YEAR_COLUMN.match(str(col)))
+    )
+    return np.array([year for year, _ in found], dtype=np.float64), [col for _, col in found]
+
+
+def projected_column(year):
+    """Name of the projected population column for a target year"""
+    return f"{int(year)} Population (projected)"
+
+
+def _masked_loglinear(t, logp, mask):
+    """
+    Per-row least-squares slope, intercept (at the mean year) and squared
+    error of logp on t, using only the masked-in cells. Rows with fewer than
+    two points get NaN.
+    """
+    t = t - t.mean()  # centred years keep the normal equations well conditioned
+    m = mask.astype(np.float64)
+    y = np.where(mask, logp, 0.0)
+    n = m.sum(axis=1)
+    st = m @ t
+    stt = m @ (t * t)
+    sy = y.sum(axis=1)
+    sty = y @ t
+    denom = n * stt - st * st
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = np.where((n >= 2) & (denom > 0), (n * sty - st * sy) / denom, np.nan)
+        intercept = (sy - slope * st) / n
+    sse = (m * (y - (intercept[:, None] + slope[:, None] * t)) ** 2).sum(axis=1)
+    return slope, intercept, sse
+
+
+class PopulationForecaster:
+    """
+    Fit per-entity growth and project populations
+
+    Rates are continuous (log) growth per year. Projections start from each
+    entity's latest observed population, so fitted curves never jump at the
+    base year.
+
+    - cagr: compound growth between the first and last observation in the
+      window (window = number of trailing observations, all when None)
+    - loglinear: least squares on log population over the window
+    - piecewise: the better of every two-segment log-linear split, by total
+      squared error; the recent segment's slope drives the projection
+    - growth_rate: the reported annual multiplier ("Growth Rate" column)
+    """
+
+    def __init__(self, method="loglinear", window=None, min_segment=3):
+        if method not in METHODS:
+            raise ValueError(f"Unknown forecast method {method!r}; choose from {METHODS}")
+        self.method = method
+        self.window = window
+        self.min_segment = min_segment
+        self.rates = None
+        self.base_year = None
+        self.base_population = None
+        self.breaks = None
+
+    def fit(self, years, populations, growth_rate=None):
+        """Fit every row of an (entities x years) population matrix"""
+        t = np.asarray(years, dtype=np.float64)
+        P = np.asarray(populations, dtype=np.float64).reshape(-1, len(t))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            logp = np.log(np.where(P > 0, P, np.nan))
+        valid = ~np.isnan(logp)
+
+        # Latest observation per row is the projection base
+        last = len(t) - 1 - np.argmax(valid[:, ::-1], axis=1)
+        rows = np.arange(len(P))
+        has_data = valid.any(axis=1)
+        self.base_year = np.where(has_data, t[last], np.nan)
+        self.base_population = np.where(has_data, P[rows, last], np.nan)
+
+        if self.window is not None:
+            # Keep only each row's trailing `window` observations
+            seen_from_end = np.cumsum(valid[:, ::-1], axis=1)[:, ::-1]
+            valid &= seen_from_end <= self.window
+
+        if self.method == "growth_rate":
+            if growth_rate is None:
+                raise ValueError("growth_rate method needs the Growth Rate column")
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.rates = np.log(np.asarray(growth_rate, dtype=np.float64))
+        elif self.method == "cagr":
+            first = np.argmax(valid, axis=1)
+            last_in_window = len(t) - 1 - np.argmax(valid[:, ::-1], axis=1)
+            span = t[last_in_window] - t[first]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.rates = np.where(
+                    valid.any(axis=1) & (span > 0),
+                    (logp[rows, last_in_window] - logp[rows, first]) / span,
+                    np.nan,
+                )
+        elif self.method == "loglinear":
+            self.rates, _, _ = _masked_loglinear(t, logp, valid)
+        else:
+            self.rates, self.breaks = self._fit_piecewise(t, logp, valid)
+        return self
+
+    def _fit_piecewise(self, t, logp, valid):
+        """Try every split year and keep, per row, the one with the lowest SSE"""
+        slope, _, best_sse = _masked_loglinear(t, logp, valid)
+        best_rate = slope
+        best_break = np.full(len(logp), np.nan)
+
+        # Loop over candidate split columns (a handful), never over entities
+        for k in range(1, len(t) - 1):
+            early = valid.copy()
+            early[:, k + 1:] = False
+            late = valid.copy()
+            late[:, :k] = False
+            enough = (early.sum(axis=1) >= self.min_segment) & (late.sum(axis=1) >= self.min_segment)
+            if not enough.any():
+                continue
+            _, _, sse_early = _masked_loglinear(t, logp, early)
+            late_slope, _, sse_late = _masked_loglinear(t, logp, late)
+            sse = sse_early + sse_late
+            better = enough & (sse < best_sse)
+            best_sse = np.where(better, sse, best_sse)
+            best_rate = np.where(better, late_slope, best_rate)
+            best_break = np.where(better, t[k], best_break)
+        return best_rate, best_break
+
+    @classmethod
+    def from_frame(cls, df, method="loglinear", window=None, **kwargs):
+        """Fit a forecaster on every "<year> Population" column of a frame"""
+        years, cols = year_columns(df)
+        if not cols:
+            raise ValueError("No '<year> Population' columns to forecast from")
+        growth = df["Growth Rate"].to_numpy() if "Growth Rate" in df.columns else None
+        forecaster = cls(method, window, **kwargs)
+        return forecaster.fit(years, df[cols].to_numpy(dtype=np.float64), growth)
+
+    def project(self, horizons):
+        """Return an (entities x horizons) matrix of projected populations"""
+        if self.rates is None:
+            raise ValueError("Forecaster must be fitted before projecting")
+        h = np.atleast_1d(np.asarray(horizons, dtype=np.float64))
+        steps = h[None, :] - self.base_year[:, None]
+        return self.base_population[:, None] * np.exp(self.rates[:, None] * steps)
+
+    def annual_growth(self):
+        """Fitted annual growth as a fraction (0.012 = 1.2% a year)"""
+        return np.expm1(self.rates)
+
+
+def forecast_frame(df, horizons, method="loglinear", window=None):
+    """Project df's populations; returns a frame aligned with df's index"""
+    forecaster = PopulationForecaster.from_frame(df, method, window)
+    projected = forecaster.project(horizons)
+    out = pd.DataFrame(
+        projected, index=df.index, columns=[projected_column(h) for h in np.atleast_1d(horizons)]
+    )
+    out["Population Growth (fitted)"] = forecaster.annual_growth()
+    return out
@@ -3,19 +3,279 @@ Predictive models for market analysis
 Includes Linear Regression (GDP prediction) and Logistic Regression (market classification)
 """
 
+import hashlib
+import platform
+import time
+from itertools import islice
+from pathlib import Path
+
+import joblib
+import sklearn
+
 import pandas as pd
 import numpy as np
+from scipy.special import expit
+from sklearn.base import clone
 from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression, LogisticRegression
+from sklearn.linear_model import Lasso, LinearRegression, LogisticRegression, Ridge
 from sklearn.metrics import r2_score, accuracy_score, confusion_matrix, classification_report
 from sklearn.metrics import roc_curve, auc
-import matplotlib.pyplot as plt
-import seaborn as sns
+
+from chart_pipeline import ChartSpec, render_spec
+from compact_data import float64_values
+from feature_store import FeatureStore
+from instrumentation import annotate, count, instrumented
+from model_evaluation import cross_validate_grid
+
+
+def iter_feature_batches(X, features, chunk_size=10_000):
+    """
+    Yield (n, len(features)) float arrays from an array, a DataFrame or an
+    iterable of feature dicts
+
+    Column order is validated once up front; arrays are assumed to already be
+    in the order of features.
+    """
+    if isinstance(X, pd.DataFrame):
+        missing = [f for f in features if f not in X.columns]
+        if missing:
+            raise ValueError(f"Missing features: {missing}")
+        values = float64_values(X[features])
+    elif isinstance(X, np.ndarray):
+        values = np.atleast_2d(X).astype(np.float64, copy=False)
+        if values.shape[1] != len(features):
+            raise ValueError(
+                f"Expected {len(features)} feature columns, got {values.shape[1]}"
+            )
+    else:
+        # Stream dicts so inputs larger than memory are never materialised
+        rows = iter(X)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            try:
+                batch = np.array([[row[f] for f in features] for row in chunk], dtype=np.float64)
+            except KeyError as e:
+                raise ValueError(f"Missing features: [{e.args[0]!r}]") from None
+            yield batch
+
+    for start in range(0, len(values), chunk_size):
+        yield values[start:start + chunk_size]
+
+
+def feature_frame(features_dict, features):
+    """One-row frame of the model features from a {feature: value} dict"""
+    missing = [f for f in features if f not in features_dict]
+    if missing:
+        raise ValueError(f"Missing features: {missing}")
+    return pd.DataFrame([features_dict])[features]
+
+
+def column_values(data, column):
+    """Return one column as float64 from a DataFrame or a FeatureStore"""
+    if isinstance(data, FeatureStore):
+        return data.column(column)
+    return float64_values(data[column])
+
+
+def store_frame(store, columns, mask):
+    """Build a training frame from FeatureStore rows, copying only those rows"""
+    return pd.DataFrame(
+        store.view(columns)[mask], columns=columns, index=store.row_labels[mask]
+    )
+
+
+def linear_decision(model, X):
+    """
+    Evaluate X @ coef + intercept for a fitted linear model
+
+    Terms are accumulated one feature at a time, so a row gets bit-identical
+    output whether it is scored alone or inside a large batch (a BLAS dot
+    product may change summation order with the batch shape).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    coef = np.ravel(model.coef_)
+    out = X[:, 0] * coef[0]
+    for j in range(1, len(coef)):
+        out += X[:, j] * coef[j]
+    return out + np.ravel(model.intercept_)[0]
+
+
+MODEL_FORMAT_VERSION = 1
+
+
+def library_versions():
+    """Versions that affect whether a pickled estimator can be trusted"""
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+
+class PersistentModel:
+    """Save/load and data-fingerprint support shared by the predictive models"""
+
+    # Columns besides the features whose values determine the trained model
+    target_columns = []
+
+    def training_fingerprint(self, data):
+        """Hash the columns the model is trained on"""
+        cols = self.features + self.target_columns
+        digest = hashlib.sha256(repr(cols).encode("utf-8"))
+        for col in cols:
+            if col in data:
+                digest.update(np.ascontiguousarray(column_values(data, col)).tobytes())
+        return digest.hexdigest()
+
+    def save(self, path):
+        """Store the fitted estimator with its features, fingerprint and metrics"""
+        if not self.is_trained:
+            raise ValueError("Model must be trained before saving")
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(
+            {
+                "format": MODEL_FORMAT_VERSION,
+                "class": type(self).__name__,
+                "model": self.model,
+                "features": self.features,
+                "fingerprint": self.fingerprint,
+                "metrics": self.metrics,
+                "versions": library_versions(),
+                "saved_at": time.time(),
+            },
+            path,
+        )
+        print(f"✓ Saved model: {path}")
+
+    @classmethod
+    def load(cls, path):
+        """Load a model saved with save()"""
+        payload = joblib.load(path)
+        if payload.get("format") != MODEL_FORMAT_VERSION or payload.get("class") != cls.__name__:
+            raise ValueError(f"{path} does not contain a {cls.__name__} model")
+
+        stale = {
+            lib: version
+            for lib, version in payload["versions"].items()
+            if library_versions().get(lib) != version
+        }
+        if stale:
+            print(f"Warning: {path} was saved with different library versions: {stale}")
+
+        instance = cls()
+        instance.model = payload["model"]
+        instance.features = payload["features"]
+        instance.fingerprint = payload["fingerprint"]
+        instance.metrics = payload["metrics"]
+        instance.saved_versions = payload["versions"]
+        instance.is_trained = True
+        return instance
+
+    @classmethod
+    def load_or_train(cls, path, data, retrain=False):
+        """
+        Reuse the model stored at path when it was trained on identical data
+
+        Returns (model, results); results is None when the stored model was
+        reused, since no evaluation was run.
+        """
+        path = Path(path)
+        fingerprint = cls().training_fingerprint(data)
+        if path.exists() and not retrain:
+            try:
+                model = cls.load(path)
+                if model.fingerprint == fingerprint:
+                    print(f"✓ Loaded model: {path}")
+                    return model, None
+            except Exception as e:
+                print(f"✗ Could not reuse {path}: {e}")
+
+        model = cls()
+        results = model.train(data)
+        if results is not None:
+            model.save(path)
+        return model, results
+
+
+# Cross-validation metric -> the train() metric it estimates
+CV_METRIC_KEYS = {"r2": "r2_score", "roc_auc": "roc_auc", "accuracy": "accuracy"}
+
+
+class ModelEvaluationMixin:
+    """Repeated k-fold CV and hyperparameter search shared by both models"""
+
+    task = None
+
+    def cross_validate(self, data, n_splits=5, n_repeats=10, seed=42, n_jobs=None, refit=False):
+        """
+        Evaluate the candidates() grid with repeated k-fold CV in a process pool
+
+        Returns a frame of per-candidate metric means, standard deviations and
+        95% confidence intervals, best first. With refit=True the best
+        candidate is fitted on all rows and becomes this model's estimator;
+        metrics keeps the train() keys, filled with the CV means (n_test is
+        0 as no rows are held out), and the best row is kept under
+        metrics["cv"].
+        """
+        prepared = self.prepare_training_data(data)
+        if prepared is None:
+            return None
+        X, y = prepared
+
+        if len(X) < n_splits * 2:
+            print(f"Warning: Not enough data for {n_splits}-fold cross-validation")
+            return None
+
+        candidates = self.candidates()
+        results = cross_validate_grid(
+            X.to_numpy(dtype=np.float64),
+            y.to_numpy(),
+            candidates,
+            self.task,
+            n_splits=n_splits,
+            n_repeats=n_repeats,
+            seed=seed,
+            n_jobs=n_jobs,
+        )
+
+        if refit:
+            best = results.iloc[0]
+            for name, params, estimator in candidates:
+                if name == best["model"] and params == best["params"]:
+                    self.model = clone(estimator).fit(X, y)
+                    self.is_trained = True
+                    self.fingerprint = self.training_fingerprint(data)
+                    self.metrics = {
+                        key: float(best[f"{metric}_mean"])
+                        for metric, key in CV_METRIC_KEYS.items()
+                        if f"{metric}_mean" in best
+                    }
+                    self.metrics.update(
+                        n_train=len(X),
+                        n_test=0,
+                        cv={
+                            "model": name,
+                            "params": params,
+                            "n_folds": int(best["n_folds"]),
+                            **{key: float(value) for key, value in best.items() if key.startswith(tuple(CV_METRIC_KEYS))},
+                        },
+                    )
+                    break
+
+        return results
 
 
-class GDPPredictor:
+class GDPPredictor(ModelEvaluationMixin, PersistentModel):
     """Linear Regression model to predict GDP per capita"""
 
+    task = "regression"
+    target_columns = ["GDP ($ per capita)"]
+
     def __init__(self):
         self.model = LinearRegression()
         self.features = [
@@ -25,19 +285,46 @@ class GDPPredictor:
             "Infant mortality (per 1000 births)",
         ]
         self.is_trained = False
-
-    def train(self, data):
-        """Train the linear regression model"""
-        df = data.copy()
+        self.fingerprint = None
+        self.metrics = {}
+
+    def prepare_training_data(self, data):
+        """
+        Return features and target with incomplete rows removed
+
+        data is merged_data or a FeatureStore built from it; only the model
+        columns are copied, never the whole frame.
+        """
+        target = "GDP ($ per capita)"
+        if isinstance(data, FeatureStore):
+            mask = data.valid_mask(self.features + [target])
+            X = store_frame(data, self.features, mask)
+            y = pd.Series(data.column(target)[mask], index=X.index, name=target)
+            return X, y
 
         # Prepare features and target
-        X = df[self.features].copy()
-        y = df["GDP ($ per capita)"].copy()
+        X = data[self.features]
+        y = data[target]
 
         # Remove rows with missing values
         mask = X.notna().all(axis=1) & y.notna()
-        X = X[mask]
-        y = y[mask]
+        return X[mask], y[mask]
+
+    def candidates(self):
+        """Hyperparameter grid for cross-validation: OLS, ridge and lasso"""
+        grid = [("linear", {}, LinearRegression())]
+        for alpha in [0.1, 1.0, 10.0, 100.0]:
+            grid.append(("ridge", {"alpha": alpha}, Ridge(alpha=alpha)))
+        for alpha in [0.1, 1.0, 10.0, 100.0]:
+            grid.append(("lasso", {"alpha": alpha}, Lasso(alpha=alpha, max_iter=50_000)))
+        return grid
+
+    @instrumented("train")
+    def train(self, data):
+        """Train the linear regression model"""
+        annotate(model=type(self).__name__)
+        self.fingerprint = self.training_fingerprint(data)
+        X, y = self.prepare_training_data(data)
 
         if len(X) < 10:
             print("Warning: Not enough data to train GDP predictor")
@@ -49,12 +336,14 @@ class GDPPredictor:
         )
 
         # Train model
+        count("rows_train", len(X_train))
         self.model.fit(X_train, y_train)
         self.is_trained = True
 
         # Evaluate
         y_pred = self.model.predict(X_test)
         r2 = r2_score(y_test, y_pred)
+        self.metrics = {"r2_score": float(r2), "n_train": len(X_train), "n_test": len(X_test)}
 
         results = {
             "r2_score": r2,
@@ -72,46 +361,49 @@ class GDPPredictor:
         if not self.is_trained:
             raise ValueError("Model must be trained before prediction")
 
-        X = pd.DataFrame([features_dict])[self.features]
-        return self.model.predict(X)[0]
+        # Scored through the batch path so a row matches predict_many exactly
+        X = feature_frame(features_dict, self.features)
+        return next(self.iter_predict(X))[0]
+
+    def iter_predict(self, X, chunk_size=10_000):
+        """Yield GDP predictions chunk by chunk for streamed inputs"""
+        if not self.is_trained:
+            raise ValueError("Model must be trained before prediction")
 
-    def plot_results(self, results):
+        for batch in iter_feature_batches(X, self.features, chunk_size):
+            yield linear_decision(self.model, batch)
+
+    @instrumented("predict")
+    def predict_many(self, X, chunk_size=10_000):
+        """Predict GDP for many rows (array, DataFrame or iterable of dicts)"""
+        parts = list(self.iter_predict(X, chunk_size))
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def results_spec(self, results, dpi=300, fmt="png"):
+        """Describe the actual vs predicted and coefficient chart"""
+        data = {
+            "y_test": np.asarray(results["y_test"], dtype=np.float64),
+            "y_pred": np.asarray(results["y_pred"], dtype=np.float64),
+            "r2_score": float(results["r2_score"]),
+            "features": list(results["coefficients"].keys()),
+            "coefficients": [float(c) for c in results["coefficients"].values()],
+        }
+        return ChartSpec("gdp_results", data, "gdp_prediction_results", dpi, fmt)
+
+    def plot_results(self, results, pipeline=None, background=False):
         """Plot actual vs predicted GDP"""
         if results is None:
             return
+        return render_spec(self.results_spec(results), pipeline, background)
 
-        fig, axes = plt.subplots(1, 2, figsize=(14, 5))
 
-        # Actual vs Predicted
-        axes[0].scatter(results["y_test"], results["y_pred"], alpha=0.6)
-        axes[0].plot(
-            [results["y_test"].min(), results["y_test"].max()],
-            [results["y_test"].min(), results["y_test"].max()],
-            "r--",
-            lw=2,
-        )
-        axes[0].set_xlabel("Actual GDP per Capita")
-        axes[0].set_ylabel("Predicted GDP per Capita")
-        axes[0].set_title(f'GDP Prediction (R² = {results["r2_score"]:.3f})')
-        axes[0].grid(True, alpha=0.3)
-
-        # Feature Importance
-        coef_abs = np.abs(list(results["coefficients"].values()))
-        features = list(results["coefficients"].keys())
-        axes[1].barh(features, coef_abs)
-        axes[1].set_xlabel("Absolute Coefficient Value")
-        axes[1].set_title("Feature Importance (Linear Regression)")
-        axes[1].grid(True, alpha=0.3, axis="x")
-
-        plt.tight_layout()
-        plt.savefig("gdp_prediction_results.png", dpi=300, bbox_inches="tight")
-        plt.close()
-        print("✓ Saved: gdp_prediction_results.png")
-
-
-class MarketClassifier:
+class MarketClassifier(ModelEvaluationMixin, PersistentModel):
     """Logistic Regression to classify high-potential markets"""
 
+    task = "classification"
+
+    target_columns = ["MOS"]
+
     def __init__(self):
         self.model = LogisticRegression(max_iter=1000, random_state=42)
         self.features = [
@@ -121,27 +413,54 @@ class MarketClassifier:
             "Infant mortality (per 1000 births)",
         ]
         self.is_trained = False
+        self.fingerprint = None
+        self.metrics = {}
 
-    def train(self, data):
-        """Train the logistic regression model"""
-        df = data.copy()
+    def prepare_training_data(self, data):
+        """
+        Return features and the High_MOS label, or None without MOS
 
+        data is merged_data or a FeatureStore built from it; only the model
+        columns are copied, never the whole frame.
+        """
         # Create binary target: High MOS (above median)
-        if "MOS" not in df.columns:
+        if "MOS" not in data:
             print("Warning: MOS not calculated. Cannot train classifier.")
             return None
 
-        median_mos = df["MOS"].median()
-        df["High_MOS"] = (df["MOS"] >= median_mos).astype(int)
+        if isinstance(data, FeatureStore):
+            mos = data.column("MOS")
+            mask = data.valid_mask(self.features)
+            X = store_frame(data, self.features, mask)
+            high = (mos[mask] >= np.nanmedian(mos)).astype(int)
+            return X, pd.Series(high, index=X.index, name="High_MOS")
+
+        median_mos = data["MOS"].median()
+        y = (data["MOS"] >= median_mos).astype(int).rename("High_MOS")
 
         # Prepare features and target
-        X = df[self.features].copy()
-        y = df["High_MOS"].copy()
+        X = data[self.features]
 
         # Remove rows with missing values
         mask = X.notna().all(axis=1)
-        X = X[mask]
-        y = y[mask]
+        return X[mask], y[mask]
+
+    def candidates(self):
+        """Hyperparameter grid for cross-validation: regularization strength C"""
+        return [
+            ("logistic", {"C": C}, LogisticRegression(C=C, max_iter=1000, random_state=42))
+            for C in [0.01, 0.1, 1.0, 10.0, 100.0]
+        ]
+
+    @instrumented("train")
+    def train(self, data):
+        """Train the logistic regression model"""
+        annotate(model=type(self).__name__)
+        self.fingerprint = self.training_fingerprint(data)
+        prepared = self.prepare_training_data(data)
+        if prepared is None:
+            return None
+        X, y = prepared
 
         if len(X) < 10:
             print("Warning: Not enough data to train market classifier")
@@ -153,6 +472,7 @@ class MarketClassifier:
         )
 
         # Train model
+        count("rows_train", len(X_train))
         self.model.fit(X_train, y_train)
         self.is_trained = True
 
@@ -164,6 +484,12 @@ class MarketClassifier:
         cm = confusion_matrix(y_test, y_pred)
         fpr, tpr, _ = roc_curve(y_test, y_prob)
         roc_auc = auc(fpr, tpr)
+        self.metrics = {
+            "accuracy": float(acc),
+            "roc_auc": float(roc_auc),
+            "n_train": len(X_train),
+            "n_test": len(X_test),
+        }
 
         results = {
             "accuracy": acc,
@@ -184,46 +510,37 @@ class MarketClassifier:
         if not self.is_trained:
             raise ValueError("Model must be trained before prediction")
 
-        X = pd.DataFrame([features_dict])[self.features]
-        return self.model.predict_proba(X)[0][1]
+        # Scored through the batch path so a row matches predict_proba_many exactly
+        X = feature_frame(features_dict, self.features)
+        return next(self.iter_predict_proba(X))[0]
+
+    def iter_predict_proba(self, X, chunk_size=10_000):
+        """Yield high-potential probabilities chunk by chunk for streamed inputs"""
+        if not self.is_trained:
+            raise ValueError("Model must be trained before prediction")
 
-    def plot_results(self, results):
+        for batch in iter_feature_batches(X, self.features, chunk_size):
+            yield expit(linear_decision(self.model, batch))
+
+    @instrumented("predict")
+    def predict_proba_many(self, X, chunk_size=10_000):
+        """Predict probabilities for many rows (array, DataFrame or iterable of dicts)"""
+        parts = list(self.iter_predict_proba(X, chunk_size))
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def results_spec(self, results, dpi=300, fmt="png"):
+        """Describe the confusion matrix and ROC curve chart"""
+        data = {
+            "confusion_matrix": np.asarray(results["confusion_matrix"]).astype(int),
+            "accuracy": float(results["accuracy"]),
+            "fpr": np.asarray(results["fpr"], dtype=np.float64),
+            "tpr": np.asarray(results["tpr"], dtype=np.float64),
+            "roc_auc": float(results["roc_auc"]),
+        }
+        return ChartSpec("classification_results", data, "market_classification_results", dpi, fmt)
+
+    def plot_results(self, results, pipeline=None, background=False):
         """Plot confusion matrix and ROC curve"""
         if results is None:
             return
-
-        fig, axes = plt.subplots(1, 2, figsize=(14, 5))
-
-        # Confusion Matrix
-        sns.heatmap(
-            results["confusion_matrix"],
-            annot=True,
-            fmt="d",
-            cmap="Blues",
-            ax=axes[0],
-            cbar=False,
-        )
-        axes[0].set_xlabel("Predicted")
-        axes[0].set_ylabel("Actual")
-        axes[0].set_title(f'Confusion Matrix (Acc = {results["accuracy"]:.3f})')
-        axes[0].set_xticklabels(["Low MOS", "High MOS"])
-        axes[0].set_yticklabels(["Low MOS", "High MOS"])
-
-        # ROC Curve
-        axes[1].plot(
-            results["fpr"],
-            results["tpr"],
-            label=f'AUC = {results["roc_auc"]:.3f}',
-            lw=2,
-        )
-        axes[1].plot([0, 1], [0, 1], "r--", lw=2, label="Random")
-        axes[1].set_xlabel("False Positive Rate")
-        axes[1].set_ylabel("True Positive Rate")
-        axes[1].set_title("ROC Curve - Market Classification")
-        axes[1].legend(loc="lower right")
-        axes[1].grid(True, alpha=0.3)
-
-        plt.tight_layout()
-        plt.savefig("market_classification_results.png", dpi=300, bbox_inches="tight")
-        plt.close()
-        print("✓ Saved: market_classification_results.png")
+        return render_spec(self.results_spec(results), pipeline, background)
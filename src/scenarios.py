@@ -0,0 +1,101 @@
+"""
+Batched MOS scenario scoring
+Scores many weight vectors against one scaled feature matrix with a chunked
+matrix multiply instead of one calculate_mos call per scenario
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+def minmax_scale(X):
+    """
+    Scale each column to 0-1, ignoring NaNs, with MinMaxScaler's conventions
+    (constant columns map to 0, NaNs stay NaN) and its exact arithmetic
+    """
+    X = np.asarray(X, dtype=np.float64)
+    col_min = np.nanmin(X, axis=0)
+    col_range = np.nanmax(X, axis=0) - col_min
+    col_range[col_range == 0] = 1.0
+    scale = 1.0 / col_range
+    return X * scale - col_min * scale
+
+
+@dataclass
+class ScenarioResult:
+    """Scores of every scenario, summarised as top-k lists and a rank matrix"""
+
+    countries: np.ndarray
+    features: list
+    weights: np.ndarray
+    top_indices: np.ndarray
+    top_scores: np.ndarray
+    ranks: np.ndarray
+
+    def top_countries(self, scenario):
+        """Return the top-k country names for one scenario"""
+        return self.countries[self.top_indices[scenario]].tolist()
+
+    def rank_frame(self):
+        """Return the country x scenario rank matrix as a DataFrame"""
+        return pd.DataFrame(self.ranks, index=self.countries)
+
+
+def normalize_weights(weights, features):
+    """Turn a weight matrix or a list of {feature: weight} dicts into an array"""
+    if isinstance(weights, dict):
+        weights = [weights]
+    if len(weights) and isinstance(weights[0], dict):
+        weights = [[w.get(f, 0.0) for f in features] for w in weights]
+
+    W = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    if W.shape[1] != len(features):
+        raise ValueError(
+            f"Expected {len(features)} weights per scenario, got {W.shape[1]}"
+        )
+    return W
+
+
+def score_scenarios(scaled, weights, countries, features, top_k=10, chunk_size=1024):
+    """
+    Score every weight vector (rows of weights) against the scaled matrix
+
+    Rows with a missing feature get no score, as in calculate_mos, and are
+    ranked after every scored row. Work is done chunk_size scenarios at a
+    time so memory stays at rows x chunk_size regardless of the sweep size.
+    """
+    scaled = np.asarray(scaled, dtype=np.float64)
+    W = normalize_weights(weights, features)
+    n_rows, n_scenarios = scaled.shape[0], W.shape[0]
+    top_k = min(top_k, n_rows)
+
+    valid = ~np.isnan(scaled).any(axis=1)
+    filled = np.where(valid[:, None], scaled, 0.0)
+
+    top_indices = np.empty((n_scenarios, top_k), dtype=np.int64)
+    top_scores = np.empty((n_scenarios, top_k))
+    ranks = np.empty((n_rows, n_scenarios), dtype=np.int32)
+    positions = np.arange(1, n_rows + 1, dtype=np.int32)
+
+    for start in range(0, n_scenarios, chunk_size):
+        stop = min(start + chunk_size, n_scenarios)
+        scores = filled @ W[start:stop].T
+        scores[~valid] = -np.inf
+
+        # Stable descending order keeps ties in row order, like nlargest
+        order = np.argsort(-scores, axis=0, kind="stable")
+        top = order[:top_k].T
+        top_indices[start:stop] = top
+        top_scores[start:stop] = np.take_along_axis(scores, order[:top_k], axis=0).T
+        np.put_along_axis(ranks[:, start:stop], order, positions[:, None], axis=0)
+
+    return ScenarioResult(
+        countries=np.asarray(countries, dtype=object),
+        features=list(features),
+        weights=W,
+        top_indices=top_indices,
+        top_scores=top_scores,
+        ranks=ranks,
+    )
@@ -0,0 +1,433 @@
+"""
+Long-running recommendation server
+Keeps the merged data, MOS scores and trained models in memory and serves
+JSON over a small asyncio HTTP/1.1 server (standard library only)
+"""
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from data_loader import DataLoader
+from dataset_cache import DatasetCache
+from market_analyzer import MarketAnalyzer, analysis_columns
+
+MAX_BODY_BYTES = 16 * 1024 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Content Too Large",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    """An error with an HTTP status, reported to the client as JSON"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class ServerState:
+    """One immutable snapshot of everything a request reads"""
+
+    analyzer: MarketAnalyzer
+    gdp_predictor: object
+    classifier: object
+    version: int
+    loaded_at: float = field(default_factory=time.time)
+
+
+def load_state(data_dir="./", cache_dir=".exportmap_cache", model_dir="models", version=1,
+               compact=False):
+    """
+    Load, merge and score the data and load (or train) both models
+
+    Lazily built structures (category scores, query index) are warmed here so
+    request handlers only read shared state. compact keeps merged_data and
+    the records in their compact form (see compact_data).
+    """
+    from predictive_models import GDPPredictor, MarketClassifier
+
+    loader = DataLoader(data_dir)
+    cache = DatasetCache(cache_dir) if cache_dir else None
+    analyzer = MarketAnalyzer.from_loader(
+        loader, cache=cache, columns=analysis_columns(), compact=compact
+    )
+    analyzer.calculate_mos()
+    analyzer.category_scores()
+    analyzer.market_index()
+    analyzer.similarity_index()
+
+    store = analyzer.feature_store()
+    gdp_predictor, _ = GDPPredictor.load_or_train(Path(model_dir) / "gdp_predictor.joblib", store)
+    classifier, _ = MarketClassifier.load_or_train(
+        Path(model_dir) / "market_classifier.joblib", store
+    )
+    return ServerState(analyzer, gdp_predictor, classifier, version)
+
+
+class ResponseCache:
+    """LRU cache of encoded responses, keyed by data version and request"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key, body):
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _plain(value):
+    """Make records JSON-safe: NumPy scalars to Python, NaN to None"""
+    if isinstance(value, Mapping):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, np.ndarray):
+        return _plain(value.tolist())
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def encode(payload):
+    return json.dumps(_plain(payload), separators=(",", ":")).encode("utf-8")
+
+
+def _int_param(params, name, default, low=0, high=10_000):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"{name} must be an integer")
+    if not low <= value <= high:
+        raise HTTPError(400, f"{name} must be between {low} and {high}")
+    return value
+
+
+def _json_body(body):
+    try:
+        payload = json.loads(body or b"{}")
+    except ValueError:
+        raise HTTPError(400, "Request body must be JSON")
+    if not isinstance(payload, dict):
+        raise HTTPError(400, "Request body must be a JSON object")
+    return payload
+
+
+def handle_recommendations(state, params, body):
+    category = params.get("category", "children_clothing")
+    top_n = _int_param(params, "top_n", 10, low=1)
+    markets = state.analyzer.get_market_recommendations(category, top_n)
+    return {"category": category, "version": state.version, "markets": markets}
+
+
+def handle_markets(state, params, body):
+    filters = {}
+    for name in ("region", "continent"):
+        if name in params:
+            filters[name] = params[name]
+    for name in ("min_population", "max_population", "min_gdp", "max_gdp"):
+        if name in params:
+            try:
+                filters[name] = float(params[name])
+            except ValueError:
+                raise HTTPError(400, f"{name} must be a number")
+    offset = _int_param(params, "offset", 0, high=1_000_000)
+    limit = _int_param(params, "limit", 10, low=1)
+    markets = state.analyzer.query_markets(offset=offset, limit=limit, **filters)
+    return {"version": state.version, "markets": markets}
+
+
+def handle_similar(state, params, body):
+    countries = [c for c in params.get("country", "").split(",") if c.strip()]
+    if not countries:
+        raise HTTPError(400, "Expected country=<name or CCA3>[,<name>...]")
+    k = _int_param(params, "k", 10, low=1)
+    radius = None
+    if "radius" in params:
+        try:
+            radius = float(params["radius"])
+        except ValueError:
+            raise HTTPError(400, "radius must be a number")
+    results = state.analyzer.similar_markets([c.strip() for c in countries], k=k, radius=radius)
+    return {"version": state.version, "results": results}
+
+
+def _predict_rows(state, rows):
+    gdp = state.gdp_predictor.predict_many(rows)
+    probability = state.classifier.predict_proba_many(rows)
+    return gdp, probability
+
+
+def handle_predict(state, params, body):
+    features = _json_body(body).get("features")
+    if not isinstance(features, dict):
+        raise HTTPError(400, "Expected {\"features\": {feature: value}}")
+    gdp, probability = _predict_rows(state, [features])
+    return {
+        "gdp_per_capita": gdp[0],
+        "high_potential_probability": probability[0],
+        "version": state.version,
+    }
+
+
+def handle_predict_batch(state, params, body):
+    rows = _json_body(body).get("rows")
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise HTTPError(400, "Expected {\"rows\": [{feature: value}, ...]}")
+    gdp, probability = _predict_rows(state, rows)
+    return {
+        "gdp_per_capita": gdp,
+        "high_potential_probability": probability,
+        "version": state.version,
+    }
+
+
+def handle_recommendations_batch(state, params, body):
+    queries = _json_body(body).get("queries")
+    if not isinstance(queries, list) or not all(isinstance(q, dict) for q in queries):
+        raise HTTPError(400, "Expected {\"queries\": [{\"category\": ..., \"top_n\": ...}]}")
+    results = [
+        handle_recommendations(state, {k: str(v) for k, v in query.items()}, b"")
+        for query in queries
+    ]
+    return {"version": state.version, "results": results}
+
+
+# (method, path) -> (handler, cacheable)
+ROUTES = {
+    ("GET", "/recommendations"): (handle_recommendations, True),
+    ("GET", "/markets"): (handle_markets, True),
+    ("GET", "/similar"): (handle_similar, True),
+    ("POST", "/predict"): (handle_predict, True),
+    ("POST", "/predict/batch"): (handle_predict_batch, False),
+    ("POST", "/recommendations/batch"): (handle_recommendations_batch, True),
+}
+
+
+class RecommendationServer:
+    """
+    Serve recommendations and predictions from in-memory state
+
+    Handlers run in a thread pool so scoring never blocks the event loop;
+    threads share the loaded state without copying it (NumPy releases the
+    GIL for the heavy work). Encoded responses are cached per data version.
+    POST /reload builds a new state in the pool and swaps it in with a
+    single assignment, so in-flight requests finish on the old snapshot.
+    """
+
+    def __init__(self, state_factory, host="127.0.0.1", port=8000, cache_size=1024, workers=4):
+        self.state_factory = state_factory
+        self.host = host
+        self.port = port
+        self.cache = ResponseCache(cache_size)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="exportmap")
+        self.state = None
+        self.requests_served = 0
+        self._reload_lock = None
+        self._server = None
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._reload_lock = asyncio.Lock()
+        self.state = await loop.run_in_executor(self.executor, self.state_factory, 1)
+        self._server = await asyncio.start_server(self._serve_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"✓ Serving on http://{self.host}:{self.port} (data version {self.state.version})")
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    async def reload(self):
+        """Build a new state off the loop and swap it in atomically"""
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            state = await loop.run_in_executor(
+                self.executor, self.state_factory, self.state.version + 1
+            )
+            self.state = state
+            self.cache.clear()
+        return {"status": "reloaded", "version": state.version}
+
+    def status(self):
+        return {
+            "status": "ok",
+            "version": self.state.version,
+            "loaded_at": self.state.loaded_at,
+            "countries": len(self.state.analyzer.merged_data),
+            "requests": self.requests_served,
+            "cache": {"entries": len(self.cache), "hits": self.cache.hits, "misses": self.cache.misses},
+        }
+
+    async def dispatch(self, method, target, body):
+        """Return (status, encoded JSON body) for one request"""
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query))
+
+        if url.path == "/health" and method == "GET":
+            return 200, encode(self.status())
+        if url.path == "/reload" and method == "POST":
+            return 200, encode(await self.reload())
+
+        route = ROUTES.get((method, url.path))
+        if route is None:
+            if any(path == url.path for _, path in ROUTES):
+                raise HTTPError(405, f"{method} not allowed on {url.path}")
+            raise HTTPError(404, f"No endpoint {url.path}")
+        handler, cacheable = route
+
+        # Pin the snapshot so the whole request sees one data version
+        state = self.state
+        key = (state.version, method, url.path, tuple(sorted(params.items())), body)
+        if cacheable:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return 200, cached
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self.executor, handler, state, params, body)
+        except KeyError as e:
+            raise HTTPError(400, f"Missing feature {e}")
+        except ValueError as e:
+            raise HTTPError(400, str(e))
+        encoded = encode(result)
+        if cacheable and state is self.state:
+            self.cache.put(key, encoded)
+        return 200, encoded
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    # The stream position is unknown after a bad request, so close
+                    await self._respond(writer, e.status, encode({"error": str(e)}), False)
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, encode({"error": str(e)})
+                except Exception as e:
+                    status, payload = 500, encode({"error": f"{type(e).__name__}: {e}"})
+                self.requests_served += 1
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        writer.write(
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("ascii")
+            + payload
+        )
+        await writer.drain()
+
+    async def _read_request(self, reader):
+        """
+        Parse one HTTP/1.1 request, or return None when the client is done
+
+        Raises HTTPError for oversized headers (431), a truncated or malformed
+        head (400) and an invalid or oversized body length (400/413).
+        """
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            if e.partial.strip():
+                raise HTTPError(400, "Incomplete request head")
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request head too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HTTPError(400, f"Invalid Content-Length {headers['content-length']!r}")
+        if length < 0:
+            raise HTTPError(400, f"Invalid Content-Length {length}")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target, headers, body
+
+
+def serve(data_dir="./", cache_dir=".exportmap_cache", model_dir="models", host="127.0.0.1",
+          port=8000, cache_size=1024, workers=4, compact=False):
+    """Run the server until interrupted"""
+    def factory(version):
+        return load_state(data_dir, cache_dir, model_dir, version, compact)
+
+    server = RecommendationServer(factory, host, port, cache_size, workers)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        print("\n✓ Server stopped")
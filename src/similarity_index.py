@@ -0,0 +1,157 @@
+"""
+Nearest-neighbour similarity index
+"Markets like X" queries over min-max scaled feature columns, answered by
+brute-force vectorized distances for small tables and a KD-tree or ball
+tree for larger ones
+"""
+
+import numpy as np
+import pandas as pd
+
+from compact_data import float64_values
+
+ALGORITHMS = ("auto", "brute", "kd_tree", "ball_tree")
+
+# auto: brute force up to this many rows, KD-tree up to KD_TREE_MAX_DIMS
+# features, ball tree beyond (KD-trees degrade in high dimensions)
+BRUTE_FORCE_MAX_ROWS = 5_000
+KD_TREE_MAX_DIMS = 15
+
+# Upper bound on distance-matrix cells held at once (queries x rows)
+BRUTE_BLOCK_CELLS = 4_000_000
+
+
+def choose_algorithm(n_rows, n_dims):
+    """Pick the search structure for a table of this shape"""
+    if n_rows <= BRUTE_FORCE_MAX_ROWS:
+        return "brute"
+    return "kd_tree" if n_dims <= KD_TREE_MAX_DIMS else "ball_tree"
+
+
+class SimilarityIndex:
+    """
+    k-NN and radius search over one frame's rows
+
+    Features are min-max scaled to 0-1 with calculate_mos' conventions and
+    multiplied by optional per-feature weights, so distances are weighted
+    Euclidean distances in MOS feature space. Rows missing any feature are
+    left out of the index. scaled may pass an already scaled matrix (e.g.
+    the feature store's), which must match the raw scaling. key names an
+    identifier column (e.g. CCA3) for positions_of().
+    """
+
+    def __init__(self, frame, features, weights=None, algorithm="auto", scaled=None,
+                 key=None, leaf_size=40):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm!r}; choose from {ALGORITHMS}")
+        missing = [f for f in features if f not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing similarity features: {missing}")
+
+        self.features = list(features)
+        raw = float64_values(frame[self.features])
+        self.col_min = np.nanmin(raw, axis=0)
+        col_range = np.nanmax(raw, axis=0) - self.col_min
+        col_range[col_range == 0] = 1.0
+        self.scale = 1.0 / col_range
+        self.weights = np.array([(weights or {}).get(f, 1.0) for f in self.features])
+
+        if scaled is None:
+            scaled = raw * self.scale - self.col_min * self.scale
+        valid = ~np.isnan(scaled).any(axis=1)
+        self.rows = np.flatnonzero(valid)
+        self.frame = frame.take(self.rows)
+        self.points = np.ascontiguousarray(scaled[valid] * self.weights)
+
+        self.algorithm = (
+            choose_algorithm(*self.points.shape) if algorithm == "auto" else algorithm
+        )
+        self._tree = None
+        if self.algorithm != "brute" and len(self.points):
+            from sklearn.neighbors import BallTree, KDTree
+
+            tree = KDTree if self.algorithm == "kd_tree" else BallTree
+            self._tree = tree(self.points, leaf_size=leaf_size)
+        self._sq_norms = np.einsum("ij,ij->i", self.points, self.points)
+
+        self.keys = None
+        if key is not None:
+            self.keys = self.frame[key].to_numpy(dtype=object)
+            codes, uniques = pd.factorize(pd.Series(self.keys, dtype=object))
+            first = np.full(len(uniques), -1, dtype=np.int64)
+            first[codes[::-1]] = np.arange(len(codes))[::-1]
+            self._key_index = pd.Index(uniques)
+            self._first = first
+            self.max_duplicates = int(np.bincount(codes[codes >= 0]).max()) if len(codes) else 0
+
+    def __len__(self):
+        return len(self.points)
+
+    def positions_of(self, keys):
+        """First indexed position per key, -1 for keys not in the index"""
+        found = self._key_index.get_indexer(pd.Series(keys, dtype=object))
+        return np.where(found >= 0, self._first[np.maximum(found, 0)], -1)
+
+    def transform(self, values):
+        """Scale and weight raw feature rows (n x features) into index space"""
+        values = np.atleast_2d(np.asarray(values, dtype=np.float64))
+        return (values * self.scale - self.col_min * self.scale) * self.weights
+
+    def _brute_blocks(self, queries):
+        """Yield (start, squared distance block) over bounded query blocks"""
+        block = max(1, BRUTE_BLOCK_CELLS // max(len(self.points), 1))
+        for start in range(0, len(queries), block):
+            q = queries[start:start + block]
+            d2 = (
+                np.einsum("ij,ij->i", q, q)[:, None]
+                + self._sq_norms[None, :]
+                - 2.0 * (q @ self.points.T)
+            )
+            yield start, np.maximum(d2, 0.0)
+
+    def kneighbors(self, queries, k):
+        """
+        Return (distances, positions), each (queries x k), nearest first
+
+        Positions index the index's own rows (self.frame); k is capped at the
+        number of indexed rows.
+        """
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float64))
+        k = min(k, len(self.points))
+        if k <= 0:
+            empty = np.empty((len(queries), 0))
+            return empty, empty.astype(np.int64)
+
+        if self._tree is not None:
+            return self._tree.query(queries, k=k)
+
+        distances = np.empty((len(queries), k))
+        positions = np.empty((len(queries), k), dtype=np.int64)
+        for start, d2 in self._brute_blocks(queries):
+            if k < d2.shape[1]:
+                part = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            else:
+                part = np.broadcast_to(np.arange(d2.shape[1]), d2.shape)
+            part_d2 = np.take_along_axis(d2, part, axis=1)
+            order = np.argsort(part_d2, axis=1, kind="stable")
+            stop = start + len(d2)
+            positions[start:stop] = np.take_along_axis(part, order, axis=1)
+            distances[start:stop] = np.sqrt(np.take_along_axis(part_d2, order, axis=1))
+        return distances, positions
+
+    def radius_neighbors(self, queries, radius):
+        """Return [(distances, positions)] per query for rows within radius, nearest first"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float64))
+        if self._tree is not None:
+            positions, distances = self._tree.query_radius(
+                queries, r=radius, return_distance=True, sort_results=True
+            )
+            return list(zip(distances, positions))
+
+        results = []
+        for _, d2 in self._brute_blocks(queries):
+            for row in d2:
+                hits = np.flatnonzero(row <= radius * radius)
+                order = np.argsort(row[hits], kind="stable")
+                results.append((np.sqrt(row[hits[order]]), hits[order]))
+        return results
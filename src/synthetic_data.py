@@ -0,0 +1,230 @@
+"""
+Synthetic data generator for benchmarks
+Produces frames in the shape of the three source CSVs at any size, with
+correlated indicators and realistic country-name perturbations
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from data_loader import COUNTRY_NUMERIC_COLUMNS, POPULATION_YEARS, SCHEMAS
+
+SYLLABLES = [
+    "ba", "bel", "bor", "ca", "dor", "ga", "gal", "ha", "ka", "kir", "la", "lan",
+    "li", "ma", "mor", "na", "ni", "no", "pa", "ra", "ri", "ro", "sa", "sel",
+    "ta", "tor", "tu", "va", "vel", "za", "zen", "ar", "en", "is", "ol", "um",
+]
+PREFIXES = ["North", "South", "East", "West", "Saint", "New"]
+CONTINENTS = ["Asia", "Europe", "Africa", "Oceania", "North America", "South America"]
+REGIONS = [
+    "ASIA (EX. NEAR EAST)", "EASTERN EUROPE", "NORTHERN AFRICA", "OCEANIA",
+    "WESTERN EUROPE", "SUB-SAHARAN AFRICA", "LATIN AMER. & CARIB", "C.W. OF IND. STATES",
+    "NEAR EAST", "NORTHERN AMERICA", "BALTICS",
+]
+
+
+def _names(ids):
+    """Spell each integer id as syllables, so names are unique by construction"""
+    base = len(SYLLABLES)
+    names = []
+    for i in ids:
+        parts = []
+        i = int(i) + base  # at least two syllables
+        while i:
+            i, digit = divmod(i, base)
+            parts.append(SYLLABLES[digit])
+        names.append("".join(parts).capitalize())
+    return names
+
+
+def _codes(n):
+    """Unique upper-case codes, three letters while they suffice (like CCA3)"""
+    width = 3
+    while 26 ** width < n:
+        width += 1
+    codes = []
+    for i in range(n):
+        letters = []
+        for _ in range(width):
+            i, digit = divmod(i, 26)
+            letters.append(chr(65 + digit))
+        codes.append("".join(reversed(letters)))
+    return codes
+
+
+def _typo(name, rng):
+    """Drop, swap or double one letter"""
+    if len(name) < 5:
+        return name + name[-1]
+    i = int(rng.integers(1, len(name) - 2))
+    kind = rng.integers(3)
+    if kind == 0:
+        return name[:i] + name[i + 1:]
+    if kind == 1:
+        return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+    return name[:i] + name[i] + name[i:]
+
+
+def perturb_name(name, rng, fuzzy):
+    """
+    Rewrite a reference name the way the countries dataset differs from the
+    population dataset: case, hyphenation, "and"/"&", "X, North" inversion,
+    and (when fuzzy) a spelling difference only fuzzy matching can resolve
+    """
+    if fuzzy:
+        return _typo(name, rng)
+    words = name.split(" ")
+    if words[0] == "Saint":
+        return "Saint-" + " ".join(words[1:])
+    if words[0] in PREFIXES and len(words) > 1:
+        return " ".join(words[1:]) + ", " + words[0]
+    if " and " in name:
+        return name.replace(" and ", " & ")
+    return name.upper()
+
+
+def _format_decimal_comma(values, decimals=2):
+    """Format floats with a comma decimal separator, blanks for NaN"""
+    text = np.char.mod(f"%.{decimals}f", np.nan_to_num(values))
+    text = np.char.replace(text, ".", ",")
+    return np.where(np.isnan(values), None, text)
+
+
+def generate_datasets(
+    n_rows,
+    seed=0,
+    perturb_rate=0.1,
+    fuzzy_rate=0.02,
+    max_fuzzy=50,
+    missing_rate=0.03,
+    unmatched_rate=0.02,
+):
+    """
+    Return {"population", "countries", "exports"} frames with n_rows countries
+
+    Countries are driven by one latent development level, so GDP, literacy,
+    phones, birthrate and the sector shares are correlated as in the real
+    data. perturb_rate of the countries names are rewritten in ways the
+    normalized/alias lookups resolve; fuzzy_rate get a typo. Typos and extra
+    unmatched names are each capped at max_fuzzy because fuzzy matching costs
+    names x reference names.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(n_rows)
+
+    ids = rng.permutation(n)
+    names = np.array(_names(ids), dtype=object)
+    prefixed = rng.random(n) < 0.1
+    prefixes = rng.choice(PREFIXES, n)
+    names[prefixed] = [f"{p} {name}" for p, name in zip(prefixes[prefixed], names[prefixed])]
+    joined = (~prefixed) & (rng.random(n) < 0.03)
+    names[joined] = [f"{name} and {other}" for name, other in zip(names[joined], _names(ids[joined] + n))]
+
+    development = rng.beta(2, 2, n)
+    continent = rng.choice(CONTINENTS, n)
+    region = rng.choice(REGIONS, n)
+
+    pop_2022 = np.maximum(rng.lognormal(15, 2, n), 500).round()
+    growth = np.clip(rng.normal(1.01 - 0.02 * development, 0.012), 0.9, 1.07)
+    area_km2 = np.maximum(rng.lognormal(11, 2.2, n), 1).round()
+
+    population = pd.DataFrame({
+        "Rank": pd.Series(pop_2022).rank(ascending=False, method="first").astype(int),
+        "CCA3": _codes(n),
+        "Country/Territory": names,
+        "Capital": [f"{name} City" for name in names],
+        "Continent": continent,
+    })
+    for year in POPULATION_YEARS:
+        drift = growth ** (year - 2022) * rng.normal(1, 0.01, n)
+        population[f"{year} Population"] = np.maximum(pop_2022 * drift, 1).round().astype(np.int64)
+    population["Area (km²)"] = area_km2.astype(np.int64)
+    population["Density (per km²)"] = (pop_2022 / area_km2).round(4)
+    population["Growth Rate"] = growth.round(4)
+    population["World Population Percentage"] = (100 * pop_2022 / pop_2022.sum()).round(2)
+
+    # Indicators: one latent level plus noise
+    def noise(scale):
+        return rng.normal(0, scale, n)
+
+    agriculture = np.clip(0.55 * (1 - development) + noise(0.05), 0.001, 0.9)
+    industry = np.clip(0.2 + 0.15 * development + noise(0.06), 0.02, 0.8)
+    features = {
+        "Pop. Density (per sq. mi.)": pop_2022 / (area_km2 * 0.386),
+        "Coastline (coast/area ratio)": np.abs(rng.lognormal(-1, 1.5, n)),
+        "Net migration": noise(4) + 3 * (development - 0.5),
+        "Infant mortality (per 1000 births)": np.clip(150 * (1 - development) ** 2 + 2 + noise(5), 2, 190),
+        "GDP ($ per capita)": np.round(np.exp(6 + 4.5 * development + noise(0.35)), -2),
+        "Literacy (%)": np.clip(30 + 70 * np.sqrt(development) + noise(5), 15, 100),
+        "Phones (per 1000)": np.clip(1000 * development ** 2 + noise(40), 0.2, 1000),
+        "Arable (%)": np.clip(rng.gamma(2, 7, n), 0, 70),
+        "Crops (%)": np.clip(rng.gamma(1, 4, n), 0, 50),
+        "Climate": rng.choice([1, 1.5, 2, 2.5, 3, 4], n, p=[0.2, 0.05, 0.4, 0.05, 0.2, 0.1]),
+        "Birthrate": np.clip(50 - 40 * development + noise(3), 7, 50),
+        "Deathrate": np.clip(rng.normal(9, 3, n), 2, 30),
+        "Agriculture": agriculture,
+        "Industry": industry,
+        "Service": np.clip(1 - agriculture - industry, 0.05, 1),
+    }
+    features["Other (%)"] = np.clip(100 - features["Arable (%)"] - features["Crops (%)"], 0, 100)
+
+    # Countries side: drop some matches, perturb names, add unmatched rows
+    kept = np.flatnonzero(rng.random(n) >= unmatched_rate)
+    country_names = names[kept].copy()
+    n_fuzzy = min(int(fuzzy_rate * len(kept)), max_fuzzy)
+    fuzzy = rng.choice(len(kept), n_fuzzy, replace=False)
+    perturbed = np.flatnonzero(rng.random(len(kept)) < perturb_rate)
+    for i in perturbed:
+        country_names[i] = perturb_name(country_names[i], rng, fuzzy=False)
+    for i in fuzzy:
+        country_names[i] = perturb_name(names[kept][i], rng, fuzzy=True)
+
+    n_extra = min(int(unmatched_rate * n), max_fuzzy)
+    extra_names = [f"Zz{name.lower()} Territory" for name in _names(np.arange(n_extra) + 2 * n)]
+    rows = np.concatenate([kept, rng.integers(0, n, n_extra)])
+    countries = pd.DataFrame({
+        "Country": [f"{name} " for name in np.concatenate([country_names, extra_names])],
+        "Region": [f"{r:<35}" for r in region[rows]],
+        "Population": (pop_2022[rows] * rng.normal(0.8, 0.05, len(rows))).round().astype(np.int64),
+        "Area (sq. mi.)": (area_km2[rows] * 0.386).round().astype(np.int64),
+    })
+    for col in COUNTRY_NUMERIC_COLUMNS:
+        values = np.asarray(features[col], dtype=np.float64)[rows].copy()
+        values[rng.random(len(rows)) < missing_rate] = np.nan
+        countries[col] = values
+    countries = countries.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+    # Exports: the already-merged shape, one row per matched country
+    exports = population.iloc[kept].reset_index(drop=True)
+    side = pd.DataFrame({
+        "Country": [f"{name} " for name in names[kept]],
+        "Region": [f"{r:<35}" for r in region[kept]],
+        "Population": (pop_2022[kept] * 0.8).round().astype(np.int64),
+        "Area (sq. mi.)": (area_km2[kept] * 0.386).round().astype(np.int64),
+    })
+    for col in COUNTRY_NUMERIC_COLUMNS:
+        side[col] = np.asarray(features[col], dtype=np.float64)[kept].round(2)
+    exports = pd.concat([exports, side], axis=1)
+
+    return {"population": population, "countries": countries, "exports": exports}
+
+
+def write_datasets(frames, out_dir):
+    """Write generated frames under the source file names and formats"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, df in frames.items():
+        schema = SCHEMAS[name]
+        if schema.decimal == ",":
+            df = df.copy()
+            for col in COUNTRY_NUMERIC_COLUMNS:
+                values = df[col].to_numpy(dtype=np.float64)
+                if col == "Climate":
+                    # Climate zones are written as "2" or "2,5"
+                    df[col] = [None if v != v else f"{v:g}".replace(".", ",") for v in values]
+                else:
+                    df[col] = _format_decimal_comma(values)
+        df.to_csv(out_dir / schema.filename, index=False)
+    return out_dir
@@ -2,40 +2,42 @@
 Data visualization module for market insights
 """
 
-import matplotlib.pyplot as plt
-import seaborn as sns
+from chart_pipeline import ChartPipeline, ChartSpec, render_spec
 
 class MarketVisualizer:
-    def __init__(self):
-        sns.set_style("whitegrid")
-        self.colors = sns.color_palette("husl", 10)
-    
-    def plot_top_markets(self, recommendations, metric="mos_score"):
-        """Create bar chart of top markets"""
+    def __init__(self, pipeline=None, dpi=300, fmt="png"):
+        self.pipeline = pipeline or ChartPipeline()
+        self.dpi = dpi
+        self.fmt = fmt
+
+    def top_markets_spec(self, recommendations, metric="mos_score"):
+        """Describe the top markets bar chart"""
         countries = [r["country"] for r in recommendations]
         scores = [r.get(metric, r.get("score", 0)) for r in recommendations]
+        data = {"countries": countries, "scores": scores, "metric": metric}
+        return ChartSpec("top_markets", data, "top_markets", self.dpi, self.fmt, "visualization")
 
-        plt.figure(figsize=(12, 6))
-        plt.barh(countries, scores, color=self.colors)
-        plt.xlabel(f'{metric.replace("_", " ").title()}')
-        plt.ylabel("Country")
-        plt.title("Top Export Markets")
-        plt.tight_layout()
-        plt.savefig("top_markets.png", dpi=300, bbox_inches="tight")
-        plt.close()
-        print("✓ Saved visualization: top_markets.png")
-    
-    def plot_regional_distribution(self, data):
-        """Create pie chart of regional opportunities"""
+    def regional_distribution_spec(self, data):
+        """Describe the regional pie chart, or None without a Region column"""
         if 'Region' not in data.columns:
-            return
-        
+            return None
+
         region_counts = data['Region'].value_counts()
-        
-        plt.figure(figsize=(10, 8))
-        plt.pie(region_counts.values, labels=region_counts.index, autopct='%1.1f%%')
-        plt.title('Market Distribution by Region')
-        plt.tight_layout()
-        plt.savefig('regional_distribution.png', dpi=300, bbox_inches='tight')
-        plt.close()
-        print("✓ Saved visualization: regional_distribution.png")
+        region_counts = region_counts[region_counts > 0]
+        chart = {"regions": [str(r) for r in region_counts.index], "counts": region_counts.tolist()}
+        return ChartSpec(
+            "regional_distribution", chart, "regional_distribution", self.dpi, self.fmt, "visualization"
+        )
+
+    def _render(self, spec, background):
+        if spec is None:
+            return None
+        return render_spec(spec, self.pipeline, background)
+
+    def plot_top_markets(self, recommendations, metric="mos_score", background=False):
+        """Create bar chart of top markets"""
+        return self._render(self.top_markets_spec(recommendations, metric), background)
+
+    def plot_regional_distribution(self, data, background=False):
+        """Create pie chart of regional opportunities"""
+        return self._render(self.regional_distribution_spec(data), background)
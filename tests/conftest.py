@@ -0,0 +1,47 @@
+"""
+Shared test fixtures
+The application modules live flat in src/, so it is put on the import path here
+"""
+
+import os
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src"))
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+SOURCE_CSVS = [
+    "world_population.csv",
+    "countries of the world.csv",
+    "combined_exportmap_dataset.csv",
+]
+
+
+@pytest.fixture(scope="session")
+def data_dir(tmp_path_factory):
+    """A private copy of the source CSVs, so tests never write next to the originals"""
+    path = tmp_path_factory.mktemp("data")
+    for name in SOURCE_CSVS:
+        shutil.copy(ROOT / name, path / name)
+    return path
+
+
+@pytest.fixture
+def loader(data_dir):
+    from data_loader import DataLoader
+
+    return DataLoader(data_dir)
+
+
+@pytest.fixture
+def analyzer(loader):
+    """A freshly merged and scored analyzer over the real datasets"""
+    from market_analyzer import MarketAnalyzer
+
+    analyzer = MarketAnalyzer(loader.load_all_datasets())
+    analyzer.calculate_mos()
+    return analyzer
@@ -0,0 +1,177 @@
+"""
+Local stub of the World Bank indicators API
+Serves deterministic, paged responses with ETags, and injects latency,
+503s with Retry-After, or a full outage, so indicator_api can be tested and
+timed without the network. Run directly to time a cold and a warm fetch:
+
+    python tests/stub_api.py --indicators 40 --latency 0.02 --failure-rate 0.05
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+ROOT = Path(__file__).resolve().parents[1]
+YEARS = (2020, 2021, 2022)
+
+
+def stub_value(country, indicator, year):
+    """The value served for a cell; the latest year is always missing"""
+    if year == YEARS[-1]:
+        return None
+    return zlib.crc32(f"{country}/{indicator}/{year}".encode()) % 1000
+
+
+class StubWorldBank:
+    """
+    World Bank v2 stub on a free local port
+
+    Every country x indicator request returns YEARS rows split over pages.
+    failure_rate answers that share of attempts with 503 (chosen by a hash
+    of the URL and attempt, so runs are repeatable), fail_first fails the
+    first attempts at every URL, and down fails everything. 503s carry
+    Retry-After: retry_after. ETags change with version; a matching
+    If-None-Match gets 304. Every request is logged as (path, query,
+    headers, status).
+    """
+
+    def __init__(self, pages=2, latency=0.0, failure_rate=0.0, fail_first=0, retry_after=0):
+        self.pages = pages
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.fail_first = fail_first
+        self.retry_after = retry_after
+        self.version = 1
+        self.down = False
+        self.log = []
+        self._attempts = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def etag(self):
+        return f'"v{self.version}"'
+
+    def start(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                status, headers, body = stub.respond(self.path, self.headers)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def _failing(self, url):
+        with self._lock:
+            attempt = self._attempts.get(url, 0)
+            self._attempts[url] = attempt + 1
+        if self.down or attempt < self.fail_first:
+            return True
+        roll = zlib.crc32(f"{url}#{attempt}".encode()) % 10_000
+        return roll < self.failure_rate * 10_000
+
+    def respond(self, url, headers):
+        """(status, headers, body) for one GET"""
+        if self.latency:
+            time.sleep(self.latency)
+        parts = urlsplit(url)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        status, out, body = self._respond(url, parts.path, query, headers)
+        with self._lock:
+            self.log.append((parts.path, query, dict(headers), status))
+        return status, out, body
+
+    def _respond(self, url, path, query, headers):
+        if self._failing(url):
+            return 503, {"Retry-After": str(self.retry_after)}, b""
+        if headers.get("If-None-Match") == self.etag:
+            return 304, {"ETag": self.etag}, b""
+
+        segments = path.strip("/").split("/")
+        try:
+            countries = segments[segments.index("country") + 1].split(";")
+            indicator = segments[segments.index("indicator") + 1]
+        except (ValueError, IndexError):
+            return 404, {}, b""
+        rows = [
+            {"countryiso3code": c, "country": {"id": c}, "date": str(year),
+             "value": stub_value(c, indicator, year)}
+            for c in countries for year in YEARS
+        ]
+        page = int(query.get("page", 1))
+        size = -(-len(rows) // self.pages)
+        data = rows[(page - 1) * size:page * size]
+        body = json.dumps([{"page": page, "pages": self.pages, "total": len(rows)}, data])
+        return 200, {"ETag": self.etag, "Content-Type": "application/json"}, body.encode()
+
+
+def main(argv=None):
+    sys.path.insert(0, str(ROOT / "src"))
+    import pandas as pd
+
+    from indicator_api import ApiClient, HttpCache, WorldBankSource, fetch_sources
+
+    parser = argparse.ArgumentParser(description="Time indicator fetches against the stub API")
+    parser.add_argument("--indicators", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds per response")
+    parser.add_argument("--failure-rate", type=float, default=0.05, help="Share of 503s")
+    parser.add_argument("--retry-after", type=float, default=0.5, help="Retry-After on 503s")
+    parser.add_argument("--workers", type=int, default=16)
+    args = parser.parse_args(argv)
+
+    countries = pd.read_csv(ROOT / "world_population.csv", usecols=["CCA3"])["CCA3"].dropna().unique()
+    indicators = [f"STUB.IND.{i}" for i in range(args.indicators)]
+    stub = StubWorldBank(latency=args.latency, failure_rate=args.failure_rate,
+                         retry_after=args.retry_after)
+    with stub, tempfile.TemporaryDirectory() as cache_dir:
+        source = WorldBankSource(indicators, stub.base_url)
+        for label in ("cold", "warm"):
+            with ApiClient(HttpCache(cache_dir), max_workers=args.workers) as client:
+                start = time.perf_counter()
+                fetch_sources(client, [source], countries)
+                seconds = time.perf_counter() - start
+            stats = ", ".join(f"{k} {v}" for k, v in client.stats.items())
+            print(f"✓ {label}: {len(countries)} countries x {len(indicators)} indicators "
+                  f"in {seconds:.2f}s ({stats})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import json
+
+import benchmarks
+import main
+
+
+def bench_args(tmp_path, *extra):
+    return main.parse_args([
+        "bench", "--sizes", "200", "--stages", "load", "mos", "--repeats", "1", "--no-memory",
+        "--output", str(tmp_path / "results.json"), "--baseline", str(tmp_path / "baseline.json"),
+        *extra,
+    ])
+
+
+def test_committed_baseline_covers_the_default_run():
+    with open(benchmarks.BASELINE_PATH) as f:
+        baseline = json.load(f)
+    covered = {(row["size"], row["stage"]) for row in baseline["results"]}
+    assert covered == {(size, stage) for size in benchmarks.DEFAULT_SIZES for stage in benchmarks.STAGES}
+
+
+def test_compare_flags_only_slowdowns_beyond_threshold_and_noise_floor():
+    def report(*seconds):
+        return {"results": [
+            {"size": 10, "stage": stage, "seconds": s, "peak_mb": 1.0}
+            for stage, s in zip(["load", "mos", "plot"], seconds)
+        ]}
+
+    rows = benchmarks.compare(report(0.2, 0.002, 0.1), report(0.1, 0.001, 0.1), time_threshold=0.25)
+    assert [row["regression"] for row in rows] == [True, False, False]
+
+
+def test_bench_saves_a_baseline_and_compares_against_it(tmp_path, capsys):
+    assert benchmarks.run(bench_args(tmp_path, "--save-baseline")) == 0
+    saved = json.loads((tmp_path / "baseline.json").read_text())
+    assert {row["stage"] for row in saved["results"]} == {"load", "mos"}
+
+    assert benchmarks.run(bench_args(tmp_path, "--threshold", "100")) == 0
+    assert "✓ No regressions" in capsys.readouterr().out
+
+
+def test_bench_rejects_unknown_stages_and_missing_baselines(tmp_path, capsys):
+    args = bench_args(tmp_path)
+    args.stages = ["load", "teleport"]
+    assert benchmarks.run(args) == 1
+    assert "✗ Unknown stages: teleport" in capsys.readouterr().out
+
+    assert benchmarks.run(bench_args(tmp_path)) == 1
+    assert "✗ Baseline not found" in capsys.readouterr().out
@@ -0,0 +1,69 @@
+import json
+
+import pandas as pd
+import pytest
+
+from bulk_scoring import ClientProfile, load_profiles, run_bulk
+from category_profiles import CATEGORY_PROFILES
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return {record["client_id"]: record for record in map(json.loads, f)}
+
+
+def test_profiles_rank_like_the_analyzer(analyzer, tmp_path):
+    profiles = [ClientProfile(name, name, top_n=8) for name in CATEGORY_PROFILES]
+    run_bulk(analyzer.merged_data, profiles, tmp_path / "out.jsonl", n_jobs=1, verbose=False)
+
+    results = read_jsonl(tmp_path / "out.jsonl")
+    for name in CATEGORY_PROFILES:
+        expected = [r["country"] for r in analyzer.get_market_recommendations(name, top_n=8)]
+        assert [m["country"] for m in results[name]["markets"]] == expected
+
+
+def test_exclusions_and_filters_apply(analyzer, tmp_path):
+    profiles = [
+        ClientProfile("no-europe", exclude_regions=["western europe"], top_n=20),
+        ClientProfile("rich", filters={"min_gdp": 30_000}, top_n=20),
+    ]
+    run_bulk(analyzer.merged_data, profiles, tmp_path / "out.jsonl", n_jobs=1, verbose=False)
+
+    results = read_jsonl(tmp_path / "out.jsonl")
+    assert all("WESTERN EUROPE" not in m["region"] for m in results["no-europe"]["markets"])
+    assert all(m["gdp_per_capita"] >= 30_000 for m in results["rich"]["markets"])
+
+
+def test_parallel_csv_output_matches_serial_and_resumes(analyzer, tmp_path):
+    profiles = [ClientProfile(f"c{i}", "basics", top_n=1 + i % 5) for i in range(40)]
+    run_bulk(analyzer.merged_data, profiles, tmp_path / "serial.csv", n_jobs=1, shard_size=8,
+             verbose=False)
+    run_bulk(analyzer.merged_data, profiles, tmp_path / "parallel.csv", n_jobs=2, shard_size=8,
+             verbose=False)
+
+    serial = pd.read_csv(tmp_path / "serial.csv").sort_values(["client_id", "rank"], ignore_index=True)
+    parallel = pd.read_csv(tmp_path / "parallel.csv").sort_values(["client_id", "rank"], ignore_index=True)
+    pd.testing.assert_frame_equal(serial, parallel)
+
+    stats = run_bulk(analyzer.merged_data, profiles, tmp_path / "serial.csv", n_jobs=1, verbose=False)
+    assert (stats["profiles"], stats["skipped"]) == (0, 40)
+    assert len(pd.read_csv(tmp_path / "serial.csv")) == len(serial)
+
+
+def test_profiles_load_from_csv_and_validate(tmp_path):
+    path = tmp_path / "profiles.csv"
+    path.write_text(
+        "client_id,category,top_n,exclude_regions,weights,filters\n"
+        '007,luxury,3,ASIA (EX. NEAR EAST);OCEANIA,,"{""min_gdp"": 1000}"\n'
+        '8,,,,"{""Literacy (%)"": 1.0}",\n'
+    )
+    first, second = load_profiles(path)
+    assert (first.client_id, first.category, first.top_n) == ("007", "luxury", 3)
+    assert first.exclude_regions == ["ASIA (EX. NEAR EAST)", "OCEANIA"]
+    assert first.resolved_filters()["min_gdp"] == 1000
+    assert second.resolved_weights() == {"Literacy (%)": 1.0}
+
+    with pytest.raises(ValueError, match="unknown category"):
+        ClientProfile("x", "jewellery")
+    with pytest.raises(ValueError, match="unique"):
+        run_bulk(pd.DataFrame(), [ClientProfile("x"), ClientProfile("x")], tmp_path / "o.jsonl")
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import category_profiles
+from category_profiles import (
+    CATEGORY_PROFILES, CategoryProfile, CategoryScores, ProfileRegistry, filter_mask,
+    register_profile, registry_version,
+)
+
+
+@pytest.fixture
+def restore_registry():
+    saved = dict(CATEGORY_PROFILES)
+    yield
+    CATEGORY_PROFILES._profiles.clear()
+    for profile in saved.values():
+        register_profile(profile)
+
+
+def test_registry_is_read_only_and_versioned():
+    registry = ProfileRegistry()
+    assert registry.version == 0
+    registry.register(CategoryProfile("socks", {"Birthrate": 1.0}))
+    assert registry.version == 1 and list(registry) == ["socks"]
+    with pytest.raises(TypeError):
+        registry["hats"] = CategoryProfile("hats", {})
+    assert not hasattr(category_profiles, "_registry_version")
+
+
+def test_scores_skip_rows_missing_a_weighted_feature():
+    df = pd.DataFrame({"Country/Territory": list("abc"), "x": [0.0, 1.0, np.nan], "y": [1.0, 0.0, 1.0]})
+    scores = CategoryScores(df, [CategoryProfile("p", {"x": 1.0}), CategoryProfile("q", {"y": 1.0})])
+    frame = scores.score_frame()
+    assert frame.loc["b", "p"] == 1.0 and np.isnan(frame.loc["c", "p"])
+    assert scores.top("p", 5)["Country/Territory"].tolist() == ["b", "a"]
+
+
+def test_filters_apply_to_rankings():
+    df = pd.DataFrame({"Region": [" WEST ", "EAST"], "2022 Population": [5e6, 5e5]})
+    assert filter_mask(df, {"region": "west"}).tolist() == [True, False]
+    assert filter_mask(df, {"min_population": 1_000_000}).tolist() == [True, False]
+
+
+def test_workwear_respects_its_population_filter(analyzer):
+    records = analyzer.get_market_recommendations("workwear", top_n=20)
+    assert records and all(r["population"] >= 1_000_000 for r in records)
+
+
+def test_unknown_category_is_rejected(analyzer):
+    with pytest.raises(ValueError, match="Unknown product category"):
+        analyzer.get_market_recommendations("hats")
+
+
+def test_registering_a_profile_invalidates_cached_scores(analyzer, restore_registry):
+    analyzer.category_scores()
+    version = registry_version()
+    register_profile(CategoryProfile("socks", {"Birthrate": 1.0}))
+    assert registry_version() == version + 1
+    records = analyzer.get_market_recommendations("socks", top_n=3)
+    expected = analyzer.merged_data.nlargest(3, "Birthrate")["Country/Territory"].tolist()
+    assert [r["country"] for r in records] == expected
+
+
+def test_mos_reads_the_registered_weights(analyzer, restore_registry):
+    register_profile(CategoryProfile("children_clothing", {"Birthrate": 1.0}))
+    analyzer.calculate_mos()
+    expected = analyzer.merged_data.nlargest(5, "Birthrate")["Country/Territory"].tolist()
+    assert [r["country"] for r in analyzer.get_market_recommendations(top_n=5)] == expected
+
+    stability = analyzer.rank_stability(n_samples=5, noise=0.0)
+    assert stability.summary(top_n=5)["Country"].tolist() == expected
+
+    analyzer.enable_incremental()
+    assert [key for key, _ in analyzer.incremental.top(5)] == analyzer.merged_data.index[:5].tolist()
+
+
+def test_mos_rejects_weights_outside_the_feature_store(analyzer):
+    with pytest.raises(ValueError, match="unknown features"):
+        analyzer.calculate_mos({"Industry": 1.0})
@@ -0,0 +1,40 @@
+import numpy as np
+
+from chart_pipeline import ChartPipeline, ChartSpec
+
+SPEC_DATA = {
+    "countries": ["A", "B", "C"],
+    "scores": np.array([3.0, 2.0, 1.0]),
+    "metric": "mos_score",
+}
+
+
+def spec(**data):
+    return ChartSpec("top_markets", dict(SPEC_DATA, **data), "top_markets", dpi=40)
+
+
+def test_content_hash_tracks_data_and_settings():
+    assert spec().content_hash() == spec().content_hash()
+    assert spec(scores=np.array([3.0, 2.0, 0.5])).content_hash() != spec().content_hash()
+    other = spec()
+    other.fmt = "svg"
+    assert other.content_hash() != spec().content_hash()
+
+
+def test_unchanged_charts_are_skipped(tmp_path, capsys):
+    pipeline = ChartPipeline(tmp_path)
+    assert pipeline.render_now(spec()) == str(tmp_path / "top_markets.png")
+    assert (tmp_path / "top_markets.png").stat().st_size > 0
+
+    assert ChartPipeline(tmp_path).render_now(spec()) is None
+    assert "Up to date: top_markets.png" in capsys.readouterr().out
+    assert ChartPipeline(tmp_path).render_now(spec(metric="gdp_per_capita")) is not None
+
+
+def test_background_rendering_in_a_process_pool(tmp_path):
+    with ChartPipeline(tmp_path, max_workers=2, fmt="svg") as pipeline:
+        future = pipeline.submit(spec())
+    assert future.result() == str(tmp_path / "top_markets.svg")
+    svg = spec()
+    svg.fmt = "svg"
+    assert ChartPipeline(tmp_path).is_current(svg)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from compact_data import FLOAT32_ATTR, compact_frame, float64_values
+from market_analyzer import MarketAnalyzer
+
+
+def test_compact_frame_downcasts_exact_floats_and_records_them():
+    frame = pd.DataFrame({
+        "Country": ["A", "B"],
+        "Region": [" EUROPE ", "EUROPE"],
+        "Literacy (%)": [99.5, 87.25],
+        "Ratio": [1 / 3, 2 / 3],
+        "Population": [1_000, 2_000],
+    })
+    compact = compact_frame(frame)
+
+    assert "Country" not in compact.columns
+    assert list(compact["Region"].cat.categories) == ["EUROPE"]
+    assert compact["Literacy (%)"].dtype == np.float32
+    assert compact["Ratio"].dtype == np.float64
+    assert compact["Population"].dtype == np.int16
+    assert compact.attrs[FLOAT32_ATTR] == ("Literacy (%)",)
+    assert compact_frame(compact).attrs[FLOAT32_ATTR] == ("Literacy (%)",)
+    np.testing.assert_array_equal(float64_values(compact["Literacy (%)"]), [99.5, 87.25])
+
+
+def test_caller_float32_data_is_not_rounded():
+    values = np.array([0.123456789, 12345.6789], dtype=np.float32)
+    frame = pd.DataFrame({"Literacy (%)": values})
+    np.testing.assert_array_equal(float64_values(frame)[:, 0], values.astype(np.float64))
+
+
+def test_widened_columns_survive_slicing_and_joins(data_dir, loader):
+    full = MarketAnalyzer(loader.load_all_datasets())
+    compact = MarketAnalyzer(loader.load_all_datasets(), compact=True)
+    features = pd.DataFrame({"Country": ["France", "Japan"], "Tariff": [2.5, 4.0]})
+    for analyzer in (full, compact):
+        analyzer.add_country_features(features, "Country")
+        analyzer.calculate_mos()
+
+    assert compact.merged_data.attrs[FLOAT32_ATTR]
+    expected = full.get_market_recommendations(top_n=10)
+    assert [r["country"] for r in compact.get_market_recommendations(top_n=10)] == [
+        r["country"] for r in expected
+    ]
+    np.testing.assert_array_equal(
+        compact.feature_store().view(["Literacy (%)", "MOS"]),
+        full.feature_store().view(["Literacy (%)", "MOS"]),
+    )
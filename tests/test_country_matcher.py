@@ -0,0 +1,44 @@
+import pandas as pd
+
+from country_matcher import COMMON_ALIASES, CountryMatcher, normalize_name
+
+REFERENCE = ["United States", "South Korea", "Ivory Coast", "Bosnia and Herzegovina", "Myanmar"]
+CODES = ["USA", "KOR", "CIV", "BIH", "MMR"]
+
+
+def matcher(**kwargs):
+    return CountryMatcher(REFERENCE, codes=CODES, **kwargs)
+
+
+def test_normalize_name_ignores_case_punctuation_and_ampersands():
+    assert normalize_name("  Bosnia & Herzegovina ") == "bosnia and herzegovina"
+    assert normalize_name("Korea, South") == "korea south"
+
+
+def test_fast_paths_report_their_method():
+    table = matcher().match_table(["United States", "united states.", "KOR", "Korea, South"])
+    assert table["match"].tolist() == ["United States", "United States", "South Korea", "South Korea"]
+    assert table["method"].tolist() == ["exact", "normalized", "alias", "alias"]
+    assert table["score"].iloc[0] == 100.0
+
+
+def test_fuzzy_pass_respects_threshold():
+    table = matcher().match_table(["Unted States", "Atlantis", None])
+    assert table.loc[0, "match"] == "United States"
+    assert table.loc[0, "method"] == "fuzzy"
+    assert pd.isna(table.loc[1, "match"]) and pd.isna(table.loc[1, "method"])
+    assert pd.isna(table.loc[2, "match"]) and pd.isna(table.loc[2, "score"])
+
+
+def test_aliases_are_opt_in():
+    assert matcher().match(["Burma"]) == [None]
+    assert matcher(aliases=COMMON_ALIASES).match(["Burma"]) == ["Myanmar"]
+
+
+def test_blocked_fuzzy_scoring_matches_one_pass(monkeypatch):
+    import country_matcher
+
+    names = ["Unted States", "Sout Korea", "Ivory Cost", "Bosnia Herzegovina", "Atlantis"]
+    expected = matcher().match_table(names)
+    monkeypatch.setattr(country_matcher, "FUZZY_BLOCK_CELLS", len(REFERENCE))
+    pd.testing.assert_frame_equal(matcher().match_table(names), expected)
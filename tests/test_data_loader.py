@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import COUNTRY_NUMERIC_COLUMNS
+from market_analyzer import MarketAnalyzer, analysis_columns
+
+
+def test_schemas_parse_decimal_commas_at_read_time(loader):
+    countries = loader.read_source("countries")
+    for col in COUNTRY_NUMERIC_COLUMNS:
+        assert pd.api.types.is_float_dtype(countries[col]), col
+    assert isinstance(countries["Region"].dtype, pd.CategoricalDtype)
+
+
+def test_projection_keeps_key_columns(loader):
+    population = loader.read_source("population", columns=["Growth Rate", "Not A Column"])
+    assert list(population.columns) == ["CCA3", "Country/Territory", "Growth Rate"]
+
+
+def test_columnar_copy_reads_the_same_frame(data_dir, tmp_path):
+    from data_loader import DataLoader
+
+    loader = DataLoader(data_dir, columnar_dir=tmp_path / "columnar")
+    from_csv = loader.read_source("countries")
+    loader.convert_to_columnar()
+    pd.testing.assert_frame_equal(loader.read_source("countries"), from_csv)
+
+
+def test_analysis_projection_matches_a_full_load(loader):
+    full = MarketAnalyzer(loader.load_all_datasets())
+    projected = MarketAnalyzer(loader.load_all_datasets(analysis_columns()))
+    for analyzer in (full, projected):
+        analyzer.calculate_mos()
+
+    for category in ("children_clothing", "workwear", "basics"):
+        assert projected.get_market_recommendations(category, horizon=2035) == (
+            full.get_market_recommendations(category, horizon=2035)
+        )
+
+
+def test_clean_all_numeric_columns_converts_comma_strings(loader):
+    df = pd.DataFrame({"Birthrate": ["12,5", "n/a"], "Region": ["A", "B"]})
+    cleaned = loader.clean_all_numeric_columns(df)
+    np.testing.assert_array_equal(cleaned["Birthrate"], [12.5, np.nan])
+    assert cleaned["Region"].tolist() == ["A", "B"]
+
+    single = loader.clean_numeric_column(pd.DataFrame({"Deathrate": ["7,25"]}), "Deathrate")
+    assert single["Deathrate"].tolist() == [7.25]
+
+
+def test_iter_chunks_yields_cleaned_bounded_chunks(loader, tmp_path):
+    path = tmp_path / "flows.csv"
+    pd.DataFrame({"country": list("abcde"), "value": ["1,5", "2", "3", "4", "5"]}).to_csv(path, index=False)
+    chunks = list(loader.iter_chunks(path, ["value"], chunksize=2))
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert chunks[0]["value"].tolist() == [1.5, 2.0]
+
+
+def test_aggregate_country_features_combines_chunks(loader, tmp_path):
+    path = tmp_path / "flows.csv"
+    pd.DataFrame({
+        "reporter": ["FRA", "DEU", "FRA", "FRA", "DEU"],
+        "value": [1.0, 10.0, 2.0, np.nan, 20.0],
+    }).to_csv(path, index=False)
+    features = loader.aggregate_country_features(
+        path, "reporter", sum_cols=["value"], mean_cols=["value"], chunksize=2
+    )
+    features = features.set_index("reporter").sort_index()
+    assert features.loc["FRA", "value"] == 3.0
+    assert features.loc["FRA", "value (mean)"] == 1.5
+    assert features.loc["FRA", "flows Records"] == 3
+    assert features.loc["DEU", "value (mean)"] == 15.0
+
+
+def test_aggregate_country_features_empty_file_has_same_columns(loader, tmp_path):
+    path = tmp_path / "flows.csv"
+    pd.DataFrame({"reporter": ["FRA"], "value": [1.0], "price": [2.0]}).to_csv(path, index=False)
+    full = loader.aggregate_country_features(path, "reporter", sum_cols=["value"], mean_cols=["price"])
+
+    path.write_text("reporter,value,price\n")
+    empty = loader.aggregate_country_features(path, "reporter", sum_cols=["value"], mean_cols=["price"])
+    assert empty.empty
+    assert list(empty.columns) == list(full.columns) == ["reporter", "value", "price (mean)", "flows Records"]
+
+
+def test_aggregated_sources_join_side_by_side(analyzer, loader, tmp_path):
+    for name, column in (("exports", "exported"), ("imports", "imported")):
+        pd.DataFrame({"reporter": ["FRA", "DEU"], column: [1.0, 2.0]}).to_csv(
+            tmp_path / f"{name}.csv", index=False
+        )
+        features = loader.aggregate_country_features(
+            tmp_path / f"{name}.csv", "reporter", sum_cols=[column]
+        )
+        analyzer.add_country_features(features, "reporter")
+
+    france = analyzer.merged_data.set_index("CCA3").loc["FRA"]
+    assert france["exports Records"] == france["imports Records"] == 1
@@ -0,0 +1,56 @@
+import pandas as pd
+
+from data_loader import DataLoader
+from dataset_cache import DatasetCache
+from market_analyzer import MarketAnalyzer
+
+
+def test_cache_hit_reuses_merge(loader, tmp_path, capsys):
+    cache = DatasetCache(tmp_path / "cache")
+    cold = MarketAnalyzer.from_loader(loader, cache=cache)
+    warm = MarketAnalyzer.from_loader(loader, cache=cache)
+
+    assert "Loaded merged data from cache" in capsys.readouterr().out
+    pd.testing.assert_frame_equal(
+        warm.merged_data.reset_index(drop=True), cold.merged_data.reset_index(drop=True)
+    )
+    assert warm.match_table is not None
+
+
+def test_cache_hit_loads_sources_on_first_access(loader, tmp_path, monkeypatch):
+    cache = DatasetCache(tmp_path / "cache")
+    MarketAnalyzer.from_loader(loader, cache=cache)
+
+    reads = []
+    original = DataLoader.load_all_datasets
+
+    def load_all_datasets(self, columns=None):
+        reads.append(columns)
+        return original(self, columns)
+
+    monkeypatch.setattr(DataLoader, "load_all_datasets", load_all_datasets)
+    warm = MarketAnalyzer.from_loader(loader, cache=cache)
+    assert reads == []
+    assert set(warm.data) == {"population", "countries", "exports"}
+    assert set(warm.data) == {"population", "countries", "exports"}
+    assert reads == [None]
+
+
+def test_changed_input_or_settings_miss(data_dir, tmp_path):
+    cache = DatasetCache(tmp_path / "cache")
+    loader = DataLoader(data_dir)
+    key = cache.make_key(loader.fingerprint(), None, MarketAnalyzer({}).matcher_settings())
+    MarketAnalyzer.from_loader(loader, cache=cache)
+    assert cache.load(key) is not None
+
+    other = cache.make_key(loader.fingerprint(), None, MarketAnalyzer({}, match_threshold=90).matcher_settings())
+    assert other != key and cache.load(other) is None
+
+
+def test_eviction_keeps_cache_within_bound(tmp_path):
+    frame = pd.DataFrame({"a": range(1000)})
+    cache = DatasetCache(tmp_path / "cache", max_bytes=1)
+    cache.store("first", frame)
+    cache.store("second", frame)
+    assert cache.load("first") is None
+    assert cache.load("second") is not None
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+import market_analyzer
+from feature_store import FeatureStore
+from market_analyzer import FEATURE_STORE_COLUMNS, MOS_FEATURES, MarketAnalyzer
+from predictive_models import GDPPredictor, MarketClassifier
+
+
+def frame():
+    return pd.DataFrame({"a": [1.0, 2.0, np.nan], "b": [4.0, 5.0, 6.0], "c": ["x", "y", "z"]})
+
+
+def test_adjacent_columns_are_views():
+    store = FeatureStore(frame(), ["a", "b", "missing"])
+    assert store.columns == ["a", "b"]
+    assert np.shares_memory(store.view(["a", "b"]), store.values)
+    assert store.valid_mask(["a", "b"]).tolist() == [True, True, False]
+
+
+def test_with_column_and_take_match_a_rebuild():
+    df = frame()
+    store = FeatureStore(df, ["a", "b"])
+    store.scaled(["b"])
+    derived = store.with_column("d", [3.0, 1.0, 2.0]).take([1, 2, 0])
+
+    rebuilt = FeatureStore(df.assign(d=[3.0, 1.0, 2.0]).iloc[[1, 2, 0]], ["a", "b", "d"])
+    np.testing.assert_array_equal(derived.values, rebuilt.values)
+    assert derived.values.flags.f_contiguous
+    assert list(derived.row_labels) == list(rebuilt.row_labels)
+    np.testing.assert_array_equal(derived.scaled(["b"]), rebuilt.scaled(["b"]))
+    # The original store is untouched
+    assert store.columns == ["a", "b"] and store.values[0, 0] == 1.0
+
+
+def test_store_after_mos_matches_a_fresh_build(analyzer):
+    store = analyzer.feature_store()
+    fresh = FeatureStore(analyzer.merged_data, FEATURE_STORE_COLUMNS)
+    assert store.columns == fresh.columns
+    np.testing.assert_array_equal(store.values, fresh.values)
+    assert store.row_labels.equals(fresh.row_labels)
+    np.testing.assert_array_equal(store.scaled(MOS_FEATURES), fresh.scaled(MOS_FEATURES))
+
+
+def test_a_normal_run_builds_the_store_once(loader, monkeypatch):
+    builds = []
+
+    class CountingStore(FeatureStore):
+        def __init__(self, df, columns):
+            builds.append(len(df))
+            super().__init__(df, columns)
+
+    monkeypatch.setattr(market_analyzer, "FeatureStore", CountingStore)
+    analyzer = MarketAnalyzer(loader.load_all_datasets())
+    analyzer.calculate_mos()
+    analyzer.add_population_forecast([2030])
+    analyzer.get_market_recommendations("basics", horizon=2030)
+    for model in (GDPPredictor(), MarketClassifier()):
+        model.train(analyzer.feature_store())
+    assert len(builds) == 1
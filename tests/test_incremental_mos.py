@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from incremental_mos import IncrementalMOS
+from market_analyzer import MOS_FEATURES
+
+WEIGHTS = {"a": 0.5, "b": 0.5}
+
+
+def brute_force(raw, weights):
+    raw = np.asarray(raw, dtype=np.float64)
+    scaled = (raw - np.nanmin(raw, axis=0)) / (np.nanmax(raw, axis=0) - np.nanmin(raw, axis=0))
+    return scaled @ np.array([weights[f] for f in ["a", "b"]])
+
+
+def test_interior_update_rescores_one_row():
+    raw = [[0.0, 0.0], [5.0, 5.0], [10.0, 10.0]]
+    inc = IncrementalMOS(["x", "y", "z"], raw, ["a", "b"], WEIGHTS)
+    assert inc.upsert("y", {"a": 7.0}) is False
+    np.testing.assert_allclose(inc.scores, brute_force([[0, 0], [7, 5], [10, 10]], WEIGHTS))
+    assert [key for key, _ in inc.top(3)] == ["z", "y", "x"]
+
+
+def test_range_change_rescores_everything():
+    inc = IncrementalMOS(["x", "y"], [[0.0, 0.0], [10.0, 10.0]], ["a", "b"], WEIGHTS)
+    assert inc.upsert("w", {"a": 20.0, "b": 5.0}) is True
+    np.testing.assert_allclose(
+        inc.scores, brute_force([[0, 0], [10, 10], [20, 5]], WEIGHTS)
+    )
+    assert inc.full_rescores >= 1
+
+
+def test_update_country_matches_full_recompute(analyzer):
+    analyzer.enable_incremental()
+    analyzer.update_country("Germany", {"GDP ($ per capita)": 1_000_000})
+    analyzer.update_country("Atlantis", {f: 1.0 for f in MOS_FEATURES})
+    incremental = analyzer.get_market_recommendations(top_n=10)
+
+    analyzer.calculate_mos()
+    full = analyzer.get_market_recommendations(top_n=10)
+    assert [r["country"] for r in incremental] == [r["country"] for r in full]
+    np.testing.assert_allclose([r["mos_score"] for r in incremental], [r["mos_score"] for r in full])
+    assert incremental[0]["country"] == "Germany"
+
+
+def test_update_country_requires_incremental_mode(analyzer):
+    with pytest.raises(ValueError, match="enable_incremental"):
+        analyzer.update_country("Germany", {"Birthrate": 1.0})
+
+
+def test_enable_incremental_rescores_with_new_weights(analyzer):
+    custom = {"GDP ($ per capita)": 0.0, "Literacy (%)": 0.0, "Phones (per 1000)": 0.0, "Birthrate": 1.0}
+    analyzer.enable_incremental(weights=custom)
+    top = analyzer.get_market_recommendations(top_n=5)
+    by_birthrate = analyzer.merged_data.nlargest(5, "Birthrate")["Country/Territory"].tolist()
+    assert [r["country"] for r in top] == by_birthrate
+    assert analyzer.merged_data.nlargest(5, "MOS")["Country/Territory"].tolist() == by_birthrate
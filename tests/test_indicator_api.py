@@ -0,0 +1,93 @@
+import time
+
+import pytest
+import requests
+
+from indicator_api import ApiClient, HttpCache, WorldBankSource, fetch_sources
+from stub_api import StubWorldBank, stub_value
+
+COUNTRIES = ["FRA", "DEU", "JPN"]
+
+
+@pytest.fixture
+def stub():
+    with StubWorldBank() as stub:
+        yield stub
+
+
+def fetch(stub, client, indicators=("GDP",), countries=COUNTRIES):
+    source = WorldBankSource(list(indicators), stub.base_url)
+    return fetch_sources(client, [source], countries)["world_bank"]
+
+
+def test_fetch_follows_pages_into_one_row_per_country(stub):
+    stub.pages = 3
+    with ApiClient(max_workers=4) as client:
+        frame = fetch(stub, client, indicators=("GDP", "POP")).set_index("Country")
+
+    assert sorted(frame.index) == sorted(COUNTRIES)
+    # The latest year has no value, so the one before is reported
+    assert frame.loc["JPN", "GDP"] == stub_value("JPN", "GDP", 2021)
+    assert (frame["POP (year)"] == 2021).all()
+    pages = sorted(int(query["page"]) for _, query, _, _ in stub.log)
+    assert pages == [1, 1, 2, 2, 3, 3]
+
+
+def test_503s_are_retried_after_the_advertised_delay(stub):
+    stub.fail_first, stub.retry_after = 2, 0.2
+    # A backoff this long would time the test out if Retry-After were ignored
+    with ApiClient(max_workers=1, backoff=30) as client:
+        start = time.perf_counter()
+        frame = fetch(stub, client)
+        elapsed = time.perf_counter() - start
+
+    assert len(frame) == 3
+    assert client.stats["retries"] == 2 * stub.pages
+    assert 0.8 <= elapsed < 5
+    assert [status for *_, status in stub.log].count(503) == 4
+
+
+def test_stale_entries_are_revalidated_with_etags(stub, tmp_path):
+    cache = HttpCache(tmp_path, ttl=3600)
+    with ApiClient(cache, max_workers=1) as client:
+        first = fetch(stub, client)
+        assert fetch(stub, client).equals(first)
+    assert client.stats["fetched"] == 2 and client.stats["cached"] == 2
+    assert len(stub.log) == 2
+
+    cache.ttl = 0
+    with ApiClient(cache, max_workers=1) as client:
+        assert fetch(stub, client).equals(first)
+    assert client.stats["revalidated"] == 2
+    assert all(headers.get("If-None-Match") == stub.etag for _, _, headers, _ in stub.log[2:])
+
+    stub.version += 1
+    with ApiClient(cache, max_workers=1) as client:
+        fetch(stub, client)
+    assert client.stats["fetched"] == 2
+
+
+def test_outages_fall_back_to_the_cached_copy(stub, tmp_path):
+    cache = HttpCache(tmp_path, ttl=0)
+    with ApiClient(cache, max_workers=1) as client:
+        first = fetch(stub, client)
+
+    stub.down = True
+    with ApiClient(cache, max_workers=1, retries=1, backoff=0) as client:
+        assert fetch(stub, client).equals(first)
+    assert client.stats["stale"] == 2
+
+    with ApiClient(max_workers=1, retries=1, backoff=0) as client:
+        with pytest.raises(requests.HTTPError, match="503"):
+            fetch(stub, client)
+
+
+def test_seeded_failures_are_repeatable(tmp_path):
+    runs = []
+    for _ in range(2):
+        with StubWorldBank(failure_rate=0.3) as stub:
+            with ApiClient(max_workers=4, backoff=0) as client:
+                frame = fetch(stub, client, indicators=("A", "B", "C"))
+        runs.append((client.stats["retries"], frame))
+    assert runs[0][0] == runs[1][0] > 0
+    assert runs[0][1].equals(runs[1][1])
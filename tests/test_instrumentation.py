@@ -0,0 +1,71 @@
+import json
+import tracemalloc
+
+import pytest
+
+import instrumentation
+from instrumentation import NULL_SPAN, annotate, count, instrumented, span
+
+
+@pytest.fixture
+def recorder():
+    recorder = instrumentation.enable()
+    yield recorder
+    instrumentation.disable()
+
+
+def test_disabled_instrumentation_is_a_shared_no_op():
+    assert instrumentation.recorder() is None
+    with span("load", rows=3) as s:
+        s.count("rows", 3)
+        count("rows")
+        annotate(source="csv")
+    assert s is NULL_SPAN
+
+
+def test_spans_nest_and_carry_counters_and_attributes(recorder):
+    with span("pipeline"):
+        with span("load", source="csv"):
+            count("rows", 5)
+            count("rows", 2)
+        with span("merge"):
+            annotate(method="fuzzy")
+    count("outside")
+
+    records = {r["path"]: r for r in recorder.report()["spans"]}
+    assert set(records) == {"pipeline", "pipeline/load", "pipeline/merge"}
+    assert records["pipeline/load"]["depth"] == 1
+    assert records["pipeline/load"]["counters"] == {"rows": 7}
+    assert records["pipeline/load"]["attrs"] == {"source": "csv"}
+    assert records["pipeline/merge"]["attrs"] == {"method": "fuzzy"}
+    assert recorder.report()["counters"] == {"rows": 7, "outside": 1}
+    assert records["pipeline"]["seconds"] >= records["pipeline/load"]["seconds"]
+
+
+def test_failed_spans_record_the_error_and_reraise(recorder):
+    @instrumented("train")
+    def train():
+        raise ValueError("no data")
+
+    with pytest.raises(ValueError):
+        train()
+    assert recorder.records[0]["error"] == "ValueError"
+
+
+def test_memory_peaks_profiles_and_json_report(tmp_path):
+    recorder = instrumentation.enable(memory=True, profile_dir=tmp_path / "prof")
+    try:
+        with span("alloc"):
+            block = bytearray(4 * 2**20)
+            del block
+    finally:
+        assert instrumentation.disable() is recorder
+    assert not tracemalloc.is_tracing()
+
+    record = recorder.records[0]
+    assert record["peak_mb"] >= 4
+    assert [p.name for p in (tmp_path / "prof").iterdir()] == ["01_alloc.prof"]
+
+    recorder.write_json(tmp_path / "trace.json")
+    assert json.loads((tmp_path / "trace.json").read_text())["spans"][0]["name"] == "alloc"
+    assert recorder.summary().startswith("alloc")
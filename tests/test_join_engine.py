@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+
+from data_loader import DataLoader
+from join_engine import JoinEngine, JoinSource, KeyMap, build_combined, main
+
+REFERENCE = pd.DataFrame({
+    "CCA3": ["FRA", "DEU", "JPN"],
+    "Country/Territory": ["France", "Germany", "Japan"],
+})
+
+
+def test_left_and_inner_joins_by_name_and_key():
+    engine = JoinEngine(REFERENCE)
+    tariffs = JoinSource("tariffs", pd.DataFrame({"country": ["Japan", "france"], "Tariff": [4.0, 2.5]}), "country")
+    ports = JoinSource(
+        "ports", pd.DataFrame({"iso3": ["JPN", "JPN", "DEU"], "Port": ["Tokyo", "Osaka", "Hamburg"]}),
+        "iso3", by="key", how="inner",
+    )
+    joined = engine.join([tariffs, ports])
+
+    assert joined["Country/Territory"].tolist() == ["Germany", "Japan", "Japan"]
+    assert joined["Port"].tolist() == ["Hamburg", "Tokyo", "Osaka"]
+    assert joined["Tariff"].tolist()[1:] == [4.0, 4.0]
+    assert pd.isna(joined["Tariff"].iloc[0])
+    assert "iso3" not in joined.columns
+
+
+def test_key_map_round_trips_and_skips_resolved_names(tmp_path):
+    engine = JoinEngine(REFERENCE)
+    engine.resolve(["Japan", "Atlantis"])
+    path = tmp_path / "keys.csv"
+    engine.key_map.save(path)
+
+    key_map = KeyMap.load(path)
+    assert len(key_map.missing(["Japan", "Atlantis", "Germany"])) == 1
+    rows = key_map.lookup(["Japan", "Atlantis"])
+    assert rows["key"].iloc[0] == "JPN"
+    assert pd.isna(rows["key"].iloc[1])
+
+
+def test_build_combined_keeps_padding_and_resolves_aliases(data_dir):
+    combined, _ = build_combined(DataLoader(data_dir))
+    by_key = combined.set_index("CCA3")
+
+    assert by_key.loc["AFG", "Country"] == "Afghanistan "
+    assert by_key.loc["VGB", "Country"].strip() == "British Virgin Is."
+    assert by_key.loc["VIR", "Country"].strip() == "Virgin Islands"
+    assert by_key.loc["MMR", "Country"].strip() == "Burma"
+
+
+def test_cli_needs_an_explicit_output(data_dir, tmp_path):
+    with pytest.raises(SystemExit):
+        main(["--data-dir", str(data_dir)])
+    output = tmp_path / "combined.csv"
+    assert main(["--data-dir", str(data_dir), "--output", str(output)]) == 0
+    assert len(pd.read_csv(output)) > 200
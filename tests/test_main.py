@@ -0,0 +1,32 @@
+import main
+
+
+def test_recommend_path_imports_no_model_or_plot_stack():
+    seconds, forbidden = main.check_import_budget()
+    assert forbidden == []
+    assert seconds > 0
+
+
+def test_subcommands_parse_their_options():
+    args = main.parse_args(["--no-cache", "recommend", "--top-n", "3", "--horizon", "2030"])
+    assert (args.command, args.top_n, args.horizon, args.forecast_method) == ("recommend", 3, 2030, "loglinear")
+    assert main.parse_args([]).command is None
+
+
+def test_recommend_prints_the_top_markets(data_dir, monkeypatch, capsys):
+    monkeypatch.chdir(data_dir)
+    assert main.main(["--no-cache", "recommend", "--top-n", "3"]) == 0
+    out = capsys.readouterr().out
+    assert "Top Markets for Children's Clothing Exports:" in out
+    assert "Luxembourg" in out
+
+
+def test_similar_reports_unknown_countries_without_a_traceback(data_dir, monkeypatch, capsys):
+    monkeypatch.chdir(data_dir)
+    assert main.main(["--no-cache", "similar", "Germany", "Atlantis"]) == 1
+    out = capsys.readouterr().out
+    assert "✗ No market with complete features for ['Atlantis']" in out
+    assert "Markets similar to" not in out
+
+    assert main.main(["--no-cache", "similar", "Germany", "--k", "3"]) == 0
+    assert "Markets similar to Germany:" in capsys.readouterr().out
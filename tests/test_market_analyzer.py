@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+
+def test_merge_resolves_names_to_cca3(analyzer):
+    df = analyzer.merged_data
+    assert df["CCA3"].notna().all()
+    assert {"United States", "Germany", "Japan"} <= set(df["Country/Territory"])
+    assert set(analyzer.match_table["method"].dropna()) <= {"exact", "normalized", "alias", "fuzzy"}
+
+
+def test_add_country_features_joins_by_name_or_code(analyzer):
+    features = pd.DataFrame({"Country": ["FRA", "Germany"], "Tariff": [2.5, 3.0]})
+    analyzer.add_country_features(features, "Country")
+    df = analyzer.merged_data.set_index("CCA3")
+    assert df.loc["FRA", "Tariff"] == 2.5
+    assert df.loc["DEU", "Tariff"] == 3.0
+    assert df["Tariff"].notna().sum() == 2
+
+
+def test_add_country_features_rejects_rows_for_the_same_country(analyzer):
+    features = pd.DataFrame({"Country": ["FRA", "France", "DEU"], "Tariff": [1.0, 2.0, 3.0]})
+    with pytest.raises(ValueError, match="same country.*FRA"):
+        analyzer.add_country_features(features, "Country")
+    assert "Tariff" not in analyzer.merged_data.columns
+
+
+def test_add_country_features_rejects_existing_columns(analyzer):
+    features = pd.DataFrame({"Country": ["FRA"], "GDP ($ per capita)": [1.0]})
+    with pytest.raises(ValueError, match="already in merged data"):
+        analyzer.add_country_features(features, "Country")
+    assert "GDP ($ per capita)_features" not in analyzer.merged_data.columns
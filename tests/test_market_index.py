@@ -0,0 +1,61 @@
+import pickle
+
+import pandas as pd
+import pytest
+
+from market_index import MarketIndex, build_records, record_type
+
+
+def brute_force(df, region=None, min_population=None, max_gdp=None):
+    df = df[df["MOS"].notna()].sort_values("MOS", ascending=False, kind="stable")
+    if region is not None:
+        df = df[df["Region"].astype(str).str.strip().str.casefold() == region.strip().casefold()]
+    if min_population is not None:
+        df = df[df["2022 Population"] >= min_population]
+    if max_gdp is not None:
+        df = df[df["GDP ($ per capita)"] <= max_gdp]
+    return df["Country/Territory"].tolist()
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"region": "western europe"},
+    {"min_population": 10_000_000},
+    {"region": "SUB-SAHARAN AFRICA", "min_population": 5_000_000, "max_gdp": 2_000},
+])
+def test_query_matches_a_filtered_scan(analyzer, filters):
+    expected = brute_force(analyzer.merged_data, **filters)
+    assert analyzer.market_index().count(**filters) == len(expected)
+    pages = [analyzer.query_markets(offset=o, limit=7, **filters) for o in range(0, len(expected) + 7, 7)]
+    assert [r["country"] for page in pages for r in page] == expected
+
+
+def test_index_is_rebuilt_when_data_changes(analyzer):
+    index = analyzer.market_index()
+    assert analyzer.market_index() is index
+    analyzer.calculate_mos()
+    assert analyzer.market_index() is not index
+
+
+def test_build_records_defaults_missing_columns():
+    records = build_records(pd.DataFrame({"Country/Territory": ["A"], "MOS": [0.5]}))
+    assert records == [{
+        "country": "A", "mos_score": 0.5, "population": 0, "gdp_per_capita": 0,
+        "literacy": 0, "birthrate": 0, "region": "Unknown", "continent": "Unknown",
+    }]
+
+
+def test_compact_records_behave_like_dicts():
+    df = pd.DataFrame({"Country/Territory": ["A"], "MOS": [0.5]})
+    record = build_records(df, compact=True)[0]
+    assert dict(record) == build_records(df)[0]
+    assert record["country"] == "A" and not hasattr(record, "__dict__")
+    assert dict(pickle.loads(pickle.dumps(record))) == dict(record)
+    with pytest.raises(ValueError, match="unusable"):
+        record_type(("values",))
+
+
+def test_unscored_rows_are_left_out():
+    df = pd.DataFrame({"Country/Territory": ["A", "B", "C"], "MOS": [0.1, None, 0.9]})
+    index = MarketIndex(df)
+    assert [r["country"] for r in index.query(limit=5)] == ["C", "A"]
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression, Ridge
+
+import model_evaluation
+from model_evaluation import confidence_interval, cross_validate_grid
+from predictive_models import GDPPredictor, MarketClassifier
+
+CANDIDATES = [
+    ("linear", {}, LinearRegression()),
+    ("ridge", {"alpha": 1e4}, Ridge(alpha=1e4)),
+]
+
+
+@pytest.fixture
+def regression_data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(60, 3))
+    return X, X @ [1.0, -2.0, 0.5] + rng.normal(0, 0.1, 60)
+
+
+def test_grid_is_sorted_best_first_with_intervals(regression_data):
+    results = cross_validate_grid(*regression_data, CANDIDATES, "regression", n_splits=3, n_repeats=2)
+    assert results["model"].tolist() == ["linear", "ridge"]
+    assert (results["n_folds"] == 6).all()
+    assert (results["r2_ci_low"] <= results["r2_mean"]).all()
+    assert (results["r2_mean"] <= results["r2_ci_high"]).all()
+
+
+def test_results_do_not_depend_on_the_worker_count(regression_data):
+    serial = cross_validate_grid(*regression_data, CANDIDATES, "regression", n_splits=3, n_repeats=2, n_jobs=1)
+    pooled = cross_validate_grid(*regression_data, CANDIDATES, "regression", n_splits=3, n_repeats=2, n_jobs=2)
+    pd.testing.assert_frame_equal(serial, pooled)
+
+
+def test_small_grids_run_without_a_process_pool_by_default(regression_data, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started for a small grid")
+
+    monkeypatch.setattr(model_evaluation, "ProcessPoolExecutor", no_pool)
+    cross_validate_grid(*regression_data, CANDIDATES, "regression", n_splits=3, n_repeats=2)
+
+
+def test_explicit_n_jobs_is_respected(regression_data, monkeypatch):
+    workers = []
+
+    class RecordingPool(model_evaluation.ProcessPoolExecutor):
+        def __init__(self, max_workers, **kwargs):
+            workers.append(max_workers)
+            super().__init__(max_workers, **kwargs)
+
+    monkeypatch.setattr(model_evaluation, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(model_evaluation.os, "cpu_count", lambda: 3)
+    cross_validate_grid(*regression_data, CANDIDATES, "regression", n_splits=3, n_repeats=2, n_jobs=2)
+    cross_validate_grid(*regression_data, CANDIDATES, "regression", n_splits=3, n_repeats=2, n_jobs=-1)
+    assert workers == [2, 3]
+
+
+def test_resolve_jobs_follows_joblib(monkeypatch):
+    monkeypatch.setattr(model_evaluation.os, "cpu_count", lambda: 4)
+    assert [model_evaluation.resolve_jobs(n) for n in (None, 1, 3, -1, -2, -8)] == [4, 1, 3, 4, 3, 1]
+    with pytest.raises(ValueError, match="n_jobs"):
+        model_evaluation.resolve_jobs(0)
+
+
+def test_confidence_interval_of_one_value_is_a_point():
+    assert confidence_interval([0.5]) == (0.5, 0.5)
+
+
+def test_refit_keeps_the_train_metric_keys(analyzer):
+    store = analyzer.feature_store()
+    gdp = GDPPredictor()
+    gdp.cross_validate(store, n_splits=3, n_repeats=1, refit=True)
+    assert gdp.is_trained
+    assert {"r2_score", "n_train", "n_test"} <= set(gdp.metrics)
+    assert gdp.metrics["r2_score"] == gdp.metrics["cv"]["r2_mean"]
+
+    classifier = MarketClassifier()
+    results = classifier.cross_validate(store, n_splits=3, n_repeats=1, refit=True)
+    assert {"accuracy", "roc_auc", "n_train", "n_test"} <= set(classifier.metrics)
+    assert classifier.metrics["cv"]["params"] == results.iloc[0]["params"]
+    assert 0 <= classifier.predict_probability(store_row(analyzer, classifier)) <= 1
+
+
+def store_row(analyzer, model):
+    return analyzer.merged_data[model.features].dropna().iloc[0].to_dict()
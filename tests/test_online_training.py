@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+from online_training import (
+    OnlineMarketClassifier, RollingHoldout, RunningQuantile, frame_batches,
+)
+
+
+@pytest.fixture
+def observations(analyzer):
+    """Complete feature + MOS rows, repeated into a stream of 24 batches of 100"""
+    columns = OnlineMarketClassifier().features + ["MOS"]
+    rows = analyzer.merged_data[columns].dropna()
+    rng = np.random.default_rng(0)
+    return rows.sample(2400, replace=True, random_state=0).reset_index(drop=True).assign(
+        MOS=lambda df: df["MOS"] + rng.normal(0, 0.01, len(df))
+    )
+
+
+def test_running_quantile_is_within_one_bin():
+    values = np.random.default_rng(1).random(10_000)
+    quantile = RunningQuantile(0.5, bins=100)
+    for chunk in np.array_split(values, 10):
+        quantile.update(chunk)
+    assert abs(quantile.value() - np.median(values)) <= 0.01
+    with pytest.raises(ValueError):
+        RunningQuantile(1.5)
+
+
+def test_rolling_holdout_keeps_the_latest_rows():
+    holdout = RollingHoldout(3, 1)
+    holdout.add(np.arange(5.0)[:, None], np.arange(5.0))
+    holdout.add(np.array([[9.0]]), np.array([9.0]))
+    assert len(holdout) == 3
+    assert sorted(holdout.rows()[1]) == [3.0, 4.0, 9.0]
+
+
+def test_resumed_stream_skips_consumed_batches(observations, tmp_path):
+    stream = {"path": "observations.csv", "batch_size": 100}
+    batches = list(frame_batches(observations, 100))
+
+    uninterrupted = OnlineMarketClassifier(holdout_size=200)
+    uninterrupted.fit_stream(iter(batches), verbose=False, stream=stream)
+
+    # Stop after 10 batches (checkpointed every 5), then rerun the whole stream
+    checkpoint = tmp_path / "online.ckpt"
+    first = OnlineMarketClassifier(holdout_size=200)
+    first.fit_stream(iter(batches[:10]), checkpoint=checkpoint, checkpoint_every=5,
+                     verbose=False, stream=stream)
+    resumed = OnlineMarketClassifier.resume(checkpoint)
+    assert resumed.stream_batches == 10
+    resumed.fit_stream(iter(batches), verbose=False, stream=stream)
+
+    assert resumed.batches_seen == uninterrupted.batches_seen == 24
+    assert resumed.rows_seen == uninterrupted.rows_seen
+    np.testing.assert_allclose(resumed.model.coef_, uninterrupted.model.coef_)
+
+
+def test_train_shuffles_mos_sorted_data(observations):
+    ordered = observations.sort_values("MOS", ascending=False)
+    classifier = OnlineMarketClassifier(holdout_size=500)
+    results = classifier.train(ordered, batch_size=100)
+
+    assert classifier.threshold.value() == pytest.approx(ordered["MOS"].median(), abs=0.01)
+    assert 0 < results["y_test"].sum() < len(results["y_test"])
+    assert results["accuracy"] > 0.7
+
+
+def test_cli_only_resumes_streams(data_dir, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(data_dir)
+    argv = ["--no-cache", "--model-dir", str(tmp_path), "train-online", "--batch-size", "50"]
+    assert main.main(argv) == 0
+    assert (tmp_path / "market_classifier_online.ckpt").exists()
+    capsys.readouterr()
+
+    assert main.main(argv) == 0
+    out = capsys.readouterr().out
+    assert "only --stream runs resume" in out
+    assert "Resumed checkpoint" not in out
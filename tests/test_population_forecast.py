@@ -0,0 +1,68 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from population_forecast import PopulationForecaster, forecast_frame, projected_column
+
+YEARS = [2000, 2010, 2020]
+
+
+def test_methods_recover_constant_growth():
+    rate = np.log(1.02)
+    populations = np.array([[100 * np.exp(rate * (y - 2000)) for y in YEARS]])
+    for method in ("cagr", "loglinear", "piecewise"):
+        projected = PopulationForecaster(method).fit(YEARS, populations).project([2030])
+        assert projected[0, 0] == pytest.approx(100 * np.exp(rate * 30))
+
+
+def test_projection_starts_from_the_latest_observation():
+    populations = np.array([[100.0, 110.0, np.nan], [np.nan, np.nan, np.nan]])
+    forecaster = PopulationForecaster("cagr").fit(YEARS, populations)
+    assert forecaster.base_year[0] == 2010
+    assert forecaster.project([2010])[0, 0] == pytest.approx(110.0)
+    assert np.isnan(forecaster.project([2030])[1, 0])
+
+
+def test_growth_rate_method_needs_the_column():
+    frame = pd.DataFrame({"2010 Population": [100.0], "2020 Population": [110.0]})
+    with pytest.raises(ValueError, match="Growth Rate"):
+        forecast_frame(frame, [2030], method="growth_rate")
+    with pytest.raises(ValueError, match="Unknown forecast method"):
+        PopulationForecaster("linear")
+
+
+def test_horizon_recommendations_do_not_mutate_the_analyzer(analyzer):
+    columns = list(analyzer.merged_data.columns)
+    version = analyzer.data_version
+
+    records = analyzer.get_market_recommendations("workwear", top_n=5, horizon=2035)
+    mos_records = analyzer.get_market_recommendations(top_n=5, horizon=2035)
+
+    assert list(analyzer.merged_data.columns) == columns
+    assert analyzer.data_version == version
+    assert all(r["projected_population"] > 0 for r in records + mos_records)
+
+
+def test_on_the_fly_projection_matches_the_added_forecast(analyzer):
+    expected = analyzer.get_market_recommendations("workwear", top_n=10, horizon=2035)
+    analyzer.add_population_forecast([2035])
+    assert projected_column(2035) in analyzer.merged_data.columns
+    assert analyzer.get_market_recommendations("workwear", top_n=10, horizon=2035) == expected
+
+
+def test_concurrent_horizon_reads_agree(analyzer):
+    expected = analyzer.get_market_recommendations("basics", top_n=10, horizon=2040)
+    analyzer._projection = analyzer._category_scores = None
+    results = [None] * 8
+
+    def read(i):
+        results[i] = analyzer.get_market_recommendations("basics", top_n=10, horizon=2040)
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(len(results))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(result == expected for result in results)
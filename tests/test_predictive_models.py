@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from predictive_models import GDPPredictor, MarketClassifier
+
+
+@pytest.fixture
+def trained(analyzer):
+    store = analyzer.feature_store()
+    gdp, classifier = GDPPredictor(), MarketClassifier()
+    gdp.train(store)
+    classifier.train(store)
+    rows = analyzer.merged_data[gdp.features].dropna().head(25)
+    return gdp, classifier, rows
+
+
+def test_single_rows_match_batch_predictions(trained):
+    gdp, classifier, rows = trained
+    gdp_batch = gdp.predict_many(rows)
+    prob_batch = classifier.predict_proba_many(rows)
+    for i, row in enumerate(rows.to_dict("records")):
+        assert gdp.predict(row) == gdp_batch[i]
+        assert classifier.predict_probability(row) == prob_batch[i]
+
+
+def test_batch_inputs_agree(trained):
+    gdp, classifier, rows = trained
+    from_frame = gdp.predict_many(rows)
+    np.testing.assert_array_equal(gdp.predict_many(rows.to_numpy()), from_frame)
+    np.testing.assert_array_equal(gdp.predict_many(rows.to_dict("records"), chunk_size=4), from_frame)
+    np.testing.assert_array_equal(gdp.predict_many(rows, chunk_size=1), from_frame)
+    np.testing.assert_array_equal(
+        classifier.predict_proba_many(rows.to_dict("records"), chunk_size=4),
+        classifier.predict_proba_many(rows),
+    )
+    assert len(gdp.predict_many([])) == 0
+
+
+def test_linear_decision_matches_the_estimator(trained):
+    gdp, classifier, rows = trained
+    # The estimator sums in BLAS order, so only rounding may differ
+    np.testing.assert_allclose(gdp.predict_many(rows), gdp.model.predict(rows))
+    np.testing.assert_allclose(
+        classifier.predict_proba_many(rows), classifier.model.predict_proba(rows)[:, 1]
+    )
+
+
+def test_missing_features_raise_value_error(trained):
+    gdp, classifier, rows = trained
+    row = rows.iloc[0].drop("Birthrate").to_dict()
+    with pytest.raises(ValueError, match="Missing features.*Birthrate"):
+        gdp.predict(row)
+    with pytest.raises(ValueError, match="Missing features.*Birthrate"):
+        classifier.predict_probability(row)
+    with pytest.raises(ValueError, match="Missing features.*Birthrate"):
+        gdp.predict_many([row])
+    with pytest.raises(ValueError, match="Missing features.*Birthrate"):
+        classifier.predict_proba_many(rows.drop(columns="Birthrate"))
+    with pytest.raises(ValueError, match="Expected 4 feature columns"):
+        gdp.predict_many(np.ones((2, 3)))
+
+
+def test_untrained_models_refuse_to_predict():
+    with pytest.raises(ValueError, match="trained"):
+        GDPPredictor().predict({})
+    with pytest.raises(ValueError, match="trained"):
+        MarketClassifier().predict_proba_many(np.ones((1, 4)))
+
+
+def test_load_or_train_reuses_a_model_for_unchanged_data(analyzer, tmp_path, capsys):
+    path = tmp_path / "gdp.joblib"
+    store = analyzer.feature_store()
+    first, results = GDPPredictor.load_or_train(path, store)
+    assert results is not None and path.exists()
+
+    second, results = GDPPredictor.load_or_train(path, store)
+    assert results is None and "Loaded model" in capsys.readouterr().out
+    assert second.metrics == first.metrics
+    np.testing.assert_array_equal(second.model.coef_, first.model.coef_)
+
+
+def test_load_or_train_retrains_on_changed_data_or_request(analyzer, tmp_path):
+    path = tmp_path / "classifier.joblib"
+    MarketClassifier.load_or_train(path, analyzer.feature_store())
+    _, results = MarketClassifier.load_or_train(path, analyzer.feature_store(), retrain=True)
+    assert results is not None
+
+    analyzer.merged_data.loc[analyzer.merged_data.index[0], "Birthrate"] += 1
+    analyzer.data_version += 1
+    _, results = MarketClassifier.load_or_train(path, analyzer.feature_store())
+    assert results is not None
+
+
+def test_load_rejects_another_model_class(analyzer, tmp_path):
+    path = tmp_path / "gdp.joblib"
+    GDPPredictor.load_or_train(path, analyzer.feature_store())
+    with pytest.raises(ValueError, match="does not contain a MarketClassifier"):
+        MarketClassifier.load(path)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from rank_stability import noise_vector, rank_stability, replicate_ranks
+
+FEATURES = ["a", "b"]
+WEIGHTS = {"a": 0.7, "b": 0.3}
+RAW = np.array([[10.0, 1.0], [5.0, 5.0], [1.0, 10.0], [np.nan, 3.0]])
+COUNTRIES = ["First", "Second", "Third", "Missing"]
+
+
+def test_replicate_ranks_match_min_max_scoring():
+    ranks = replicate_ranks(RAW[None, :3], np.array([0.7, 0.3]))
+    assert ranks.tolist() == [[1, 2, 3]]
+
+
+def test_noise_free_replicates_keep_the_baseline():
+    result = rank_stability(RAW, WEIGHTS, COUNTRIES, FEATURES, noise=0.0, n_samples=50)
+    assert result.countries.tolist() == COUNTRIES[:3]
+    assert (result.ranks == result.baseline[:, None]).all()
+    assert result.top_k_probability(1).tolist() == [1.0, 0.0, 0.0]
+    assert result.rank_distribution("Second").tolist() == [0, 50, 0]
+    with pytest.raises(ValueError, match="Unknown country"):
+        result.rank_distribution("Missing")
+
+
+def test_results_do_not_depend_on_chunking_or_workers():
+    serial = rank_stability(RAW, WEIGHTS, COUNTRIES, FEATURES, noise=0.5, n_samples=200, chunk_size=64)
+    parallel = rank_stability(
+        RAW, WEIGHTS, COUNTRIES, FEATURES, noise=0.5, n_samples=200, chunk_size=64, n_jobs=2
+    )
+    np.testing.assert_array_equal(serial.ranks, parallel.ranks)
+    assert serial.n_samples == 200
+
+    summary = serial.summary(k=1, level=0.9)
+    assert summary["Rank"].tolist() == [1, 2, 3]
+    assert (summary["Rank Low"] <= summary["Rank High"]).all()
+    assert summary["P(Top 1)"].sum() == pytest.approx(1.0)
+
+
+def test_noise_vector_accepts_per_feature_dicts():
+    assert noise_vector({"b": 0.2}, FEATURES).tolist() == [0.0, 0.2]
+    assert noise_vector(0.1, FEATURES).tolist() == [0.1, 0.1]
+
+
+def test_analyzer_rank_stability_follows_mos(analyzer):
+    result = analyzer.rank_stability(n_samples=100, noise=0.05)
+    top = analyzer.get_market_recommendations(top_n=1)[0]["country"]
+    assert result.summary(k=5, top_n=1)["Country"].tolist() == [top]
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from market_analyzer import MOS_FEATURES, mos_weights
+from scenarios import minmax_scale, normalize_weights, score_scenarios
+
+
+def test_minmax_scale_keeps_nans_and_zeroes_constant_columns():
+    scaled = minmax_scale([[1.0, 5.0], [3.0, 5.0], [np.nan, 5.0]])
+    np.testing.assert_array_equal(scaled[:, 0], [0.0, 1.0, np.nan])
+    np.testing.assert_array_equal(scaled[:, 1], [0.0, 0.0, 0.0])
+
+
+def test_normalize_weights_accepts_dicts_and_checks_width():
+    W = normalize_weights([{"a": 1.0}, {"b": 2.0}], ["a", "b"])
+    np.testing.assert_array_equal(W, [[1.0, 0.0], [0.0, 2.0]])
+    with pytest.raises(ValueError, match="Expected 2 weights"):
+        normalize_weights([[1.0, 2.0, 3.0]], ["a", "b"])
+
+
+def test_default_weights_reproduce_calculate_mos(analyzer):
+    result = analyzer.score_scenarios([mos_weights()], top_k=10)
+    expected = analyzer.merged_data.nlargest(10, "MOS")["Country/Territory"].tolist()
+    assert result.top_countries(0) == expected
+
+
+def test_chunking_does_not_change_results():
+    rng = np.random.default_rng(0)
+    scaled = rng.random((50, 4))
+    scaled[3, 1] = np.nan
+    weights = rng.dirichlet(np.ones(4), 7)
+    countries = np.arange(50)
+    whole = score_scenarios(scaled, weights, countries, MOS_FEATURES, top_k=5)
+    chunked = score_scenarios(scaled, weights, countries, MOS_FEATURES, top_k=5, chunk_size=2)
+    np.testing.assert_array_equal(whole.ranks, chunked.ranks)
+    np.testing.assert_array_equal(whole.top_indices, chunked.top_indices)
+    # The row with a missing feature ranks last in every scenario
+    assert (whole.ranks[3] == 50).all()
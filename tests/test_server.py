@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+import load_generator
+from server import RecommendationServer, load_state
+
+
+@pytest.fixture(scope="module")
+def state(data_dir, tmp_path_factory):
+    return load_state(data_dir, cache_dir=None, model_dir=tmp_path_factory.mktemp("models"))
+
+
+def run_with_server(state, scenario):
+    """Start a server on a free port, run scenario(server) and stop it"""
+    async def main():
+        server = RecommendationServer(lambda version: state, port=0, workers=2)
+        await server.start()
+        try:
+            return await scenario(server)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+async def raw_exchange(server, data):
+    """Send raw bytes and return (status, JSON body) of the reply"""
+    reader, writer = await asyncio.open_connection(server.host, server.port)
+    writer.write(data)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    headers = dict(line.lower().split(": ", 1) for line in lines[1:] if line)
+    body = await reader.readexactly(int(headers["content-length"]))
+    writer.close()
+    return int(lines[0].split(" ", 2)[1]), json.loads(body)
+
+
+def test_recommendations_are_served_and_cached(state):
+    async def scenario(server):
+        request = b"GET /recommendations?top_n=3 HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n"
+        first = await raw_exchange(server, request)
+        second = await raw_exchange(server, request)
+        return first, second, server.cache.hits
+
+    (status, body), second, hits = run_with_server(state, scenario)
+    assert status == 200
+    assert len(body["markets"]) == 3
+    assert second == (status, body)
+    assert hits == 1
+
+
+def test_state_loads_only_the_analysis_columns(state):
+    assert "Coastline (coast/area ratio)" not in state.analyzer.merged_data
+    assert "Literacy (%)" in state.analyzer.merged_data
+
+
+@pytest.mark.parametrize("request_bytes, status", [
+    (b"POST /predict HTTP/1.1\r\nContent-Length: abc\r\n\r\n", 400),
+    (b"POST /predict HTTP/1.1\r\nContent-Length: -5\r\n\r\n", 400),
+    (b"POST /predict HTTP/1.1\r\nContent-Length: 999999999999\r\n\r\n", 413),
+    (b"GARBAGE\r\n\r\n", 400),
+    (b"GET / HTTP/1.1\r\nX-Big: " + b"a" * 70_000 + b"\r\n\r\n", 431),
+])
+def test_malformed_requests_get_an_error_reply(state, request_bytes, status):
+    async def scenario(server):
+        return await raw_exchange(server, request_bytes)
+
+    reply_status, body = run_with_server(state, scenario)
+    assert reply_status == status
+    assert "error" in body
+
+
+def test_truncated_head_gets_a_400(state):
+    async def scenario(server):
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+        writer.write(b"GET /health HTTP/1.1\r\nHost: x")
+        writer.write_eof()
+        reply = await reader.read()
+        writer.close()
+        return reply
+
+    assert run_with_server(state, scenario).startswith(b"HTTP/1.1 400 ")
+
+
+def test_miss_heavy_mix_bypasses_the_cache(state):
+    async def scenario(server):
+        summary = await load_generator.run_load(
+            server.host, server.port, concurrency=2, requests=40, mix=load_generator.MISS_HEAVY_MIX
+        )
+        return summary, server.cache.hits
+
+    summary, hits = run_with_server(state, scenario)
+    assert summary["requests"] == 40
+    assert summary["errors"] == 0
+    assert hits < 5
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from similarity_index import SimilarityIndex
+
+FRAME = pd.DataFrame({
+    "CCA3": ["AAA", "BBB", "CCC", "DDD", "EEE"],
+    "x": [0.0, 1.0, 2.0, 10.0, np.nan],
+    "y": [0.0, 0.0, 0.0, 0.0, 1.0],
+})
+
+
+def test_rows_missing_a_feature_are_left_out():
+    index = SimilarityIndex(FRAME, ["x", "y"], key="CCA3")
+    assert index.positions_of(np.array(["EEE", "BBB"], dtype=object)).tolist() == [-1, 1]
+
+
+@pytest.mark.parametrize("algorithm", ["brute", "kd_tree", "ball_tree"])
+def test_algorithms_agree_on_the_nearest_rows(algorithm):
+    index = SimilarityIndex(FRAME, ["x", "y"], key="CCA3", algorithm=algorithm)
+    assert index.algorithm == algorithm
+    brute = SimilarityIndex(FRAME, ["x", "y"], key="CCA3", algorithm="brute")
+    assert [row.tolist() for row in index.kneighbors(brute.points[:1], 3)[1]] == [[0, 1, 2]]
+
+
+def test_bad_arguments_raise_value_errors():
+    with pytest.raises(ValueError, match="Unknown algorithm"):
+        SimilarityIndex(FRAME, ["x"], algorithm="annoy")
+    with pytest.raises(ValueError, match="Missing similarity features"):
+        SimilarityIndex(FRAME, ["x", "z"])
+
+
+def test_similar_markets_resolve_names_and_codes(analyzer):
+    by_name = analyzer.similar_markets("Germany", k=5)
+    by_code = analyzer.similar_markets("DEU", k=5)
+    assert by_name == by_code
+    assert "Germany" not in [market["country"] for market in by_name]
+    distances = [market["distance"] for market in by_name]
+    assert distances == sorted(distances)
+
+    with pytest.raises(ValueError, match="Atlantis"):
+        analyzer.similar_markets(["Germany", "Atlantis"])